@@ -4,6 +4,7 @@ SIBERINDO BTS GUI - Modular GSM Network Management Interface
 Main application file - ENHANCED VERSION
 """
 
+import atexit
 import logging
 import sys
 import os
@@ -24,34 +25,50 @@ app.config.from_object(Config)
 app.secret_key = app.config.get('SECRET_KEY', 'siberindo-bts-secret-key-2024-enhanced')
 app.config.setdefault('JSON_SORT_KEYS', False)
 
-# Configure logging
-log_file = app.config.get('LOG_FILE', 'logs/bts_system.log')
-log_level = getattr(logging, app.config.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
-logging.basicConfig(
-    level=log_level,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+# JSON responses: orjson when available, stdlib otherwise
+from modules.json_provider import FastJSONProvider
+app.json = FastJSONProvider(app, encoder=app.config['JSON_ENCODER'])
+
+# Negotiated brotli/gzip for large responses (registered first, so it runs after the other after_request hooks)
+from modules.compression import compress_response
+app.after_request(compress_response)
 
 # Import middleware
-from modules.middleware import init_request_context, cleanup_request_context
+from modules.middleware import init_request_context, cleanup_request_context, get_request_context
+
+# Configure logging: callers only enqueue records, a listener thread does the file/console I/O
+from modules.log_pipeline import setup_logging
+log_pipeline = setup_logging(app.config)
+logger = logging.getLogger(__name__)
+from modules.health import in_flight
+from modules.metrics import observe_request
+from modules.sampling_profiler import tag_request, untag_request
 
 # Register before/after request hooks
 @app.before_request
 def before_request():
     """Initialize request context"""
-    init_request_context()
+    in_flight.enter()
+    tag_request(request.url_rule.rule if request.url_rule is not None else 'unmatched')
+    init_request_context(request.headers.get('X-Request-ID'))
 
 @app.after_request
 def after_request(response):
-    """Cleanup request context"""
+    """Record request metrics and cleanup request context"""
+    context = get_request_context()
+    if context is not None:
+        observe_request(request.endpoint or 'unmatched', request.method, response.status_code,
+                        context.get_duration())
+        response.headers['X-Request-ID'] = context.request_id
     cleanup_request_context()
     return response
 
+@app.teardown_request
+def teardown_request(error=None):
+    """Runs even when the view raised, so the in-flight count never leaks"""
+    untag_request()
+    in_flight.exit()
+
 # Import and register blueprints with comprehensive error handling
 def register_blueprints():
     """Dynamically register all blueprints with proper error handling"""
@@ -80,6 +97,26 @@ def register_blueprints():
             'module': 'modules.bts_scanner',
             'blueprint': 'scanner_bp',
             'url_prefix': '/scanner'
+        },
+        {
+            'module': 'modules.network_events',
+            'blueprint': 'network_bp',
+            'url_prefix': '/network'
+        },
+        {
+            'module': 'modules.health',
+            'blueprint': 'health_bp',
+            'url_prefix': None
+        },
+        {
+            'module': 'modules.metrics',
+            'blueprint': 'metrics_bp',
+            'url_prefix': None
+        },
+        {
+            'module': 'modules.debug',
+            'blueprint': 'debug_bp',
+            'url_prefix': '/debug'
         }
     ]
     
@@ -105,6 +142,98 @@ def register_blueprints():
 registered_bps = register_blueprints()
 logger.info(f"Registered {registered_bps} blueprints successfully")
 
+# Background maintenance tasks
+from modules.scheduler import PeriodicTask
+from modules.database import db, reconcile_subscriber_counters
+from modules.presence import presence_tracker
+from modules.retention import RetentionManager, RetentionPolicy
+from modules.coordinator import coordinator
+from modules.startup import StartupSequence
+
+retention_manager = RetentionManager(db, policies={
+    'system_logs': RetentionPolicy('system_logs', app.config.get('RETENTION_SYSTEM_LOGS_DAYS', 30),
+                                   ('level', 'module')),
+    'network_events': RetentionPolicy('network_events', app.config.get('RETENTION_NETWORK_EVENTS_DAYS', 14),
+                                      ('event_type', 'cell_id')),
+    'sms_messages': RetentionPolicy('sms_messages', app.config.get('RETENTION_SMS_DAYS', 90),
+                                    ('direction', 'status')),
+})
+
+# Every process flushes its own in-memory presence
+background_tasks = [
+    PeriodicTask('presence-flush',
+                 app.config.get('PRESENCE_FLUSH_INTERVAL', 5),
+                 presence_tracker.flush),
+]
+for task in background_tasks:
+    task.start()
+
+# Database-wide maintenance runs once per deployment, in the owner process
+coordinator.register_task(PeriodicTask('subscriber-counter-reconcile',
+                                       app.config.get('COUNTER_RECONCILE_INTERVAL', 3600),
+                                       reconcile_subscriber_counters))
+coordinator.register_task(PeriodicTask('event-retention',
+                                       app.config.get('RETENTION_INTERVAL', 3600),
+                                       retention_manager.run_once))
+coordinator.start()
+
+# Deferred initialization: run now (eager), in the background (warmup) or on first use (lazy)
+startup = StartupSequence(app.config.get('STARTUP_MODE', 'eager'))
+startup.add('database-schema', db.ensure_schema)
+startup.add('subscriber-presence', presence_tracker.ensure_loaded)
+startup.add('templates', lambda: [app.jinja_env.get_template(name) for name in app.jinja_env.list_templates()])
+startup.start()
+
+# Probes: cached subsystem checks behind /readyz, thread liveness behind /livez
+from modules import health
+from modules.network_events import aggregator
+
+health.health_monitor.register('startup', lambda: health.startup_check(startup), ttl=1)
+health.health_monitor.register('database', lambda: health.database_check(db),
+                               ttl=app.config.get('HEALTH_DB_TTL', 5))
+health.health_monitor.register('queues', lambda: health.queue_check(
+    [db.system_log_buffer, db.network_event_buffer], app.config.get('HEALTH_QUEUE_HIGH_WATER', 0.8)), ttl=1)
+health.health_monitor.register('requests', lambda: health.requests_check(
+    health.in_flight, app.config.get('SERVER_THREADS', 8) if app.config.get('SERVER_MODE') != 'dev' else 0), ttl=0)
+health.health_monitor.register('cache', lambda: {'status': health.OK, **aggregator.cache.stats()},
+                               readiness=False)
+health.health_monitor.register('sampler', lambda: health.sampler_check(coordinator), readiness=False)
+health.health_monitor.register('scan_engine', lambda: health.scan_engine_check(coordinator), readiness=False)
+health.health_monitor.register_liveness('coordinator', lambda: coordinator.alive)
+health.health_monitor.register_liveness('presence-flush', lambda: all(task.is_running() for task in background_tasks))
+
+# Scrape-time gauges for state owned by other modules
+from modules.metrics import registry as metrics_registry
+
+metrics_registry.gauge('http_requests_in_flight', 'Requests currently being handled',
+                       lambda: health.in_flight.value)
+metrics_registry.gauge('write_buffer_pending', 'Rows waiting in write-behind buffers',
+                       lambda: {b.name: b.pending() for b in (db.system_log_buffer, db.network_event_buffer) if b},
+                       ('buffer',))
+metrics_registry.gauge('write_buffer_dropped', 'Rows dropped by write-behind buffers since start',
+                       lambda: {b.name: b.dropped for b in (db.system_log_buffer, db.network_event_buffer) if b},
+                       ('buffer',))
+metrics_registry.gauge('presence_tracked_subscribers', 'Subscribers in the in-memory presence index',
+                       lambda: presence_tracker.stats()['tracked_subscribers'])
+metrics_registry.gauge('coordinator_is_owner', '1 if this process owns the singletons',
+                       lambda: int(coordinator.is_owner))
+metrics_registry.gauge('log_queue_pending', 'Log records waiting for the log listener thread',
+                       lambda: log_pipeline.stats()['queued'])
+metrics_registry.gauge('log_records_dropped', 'Log records dropped because the log queue was full',
+                       lambda: log_pipeline.stats()['dropped'])
+metrics_registry.gauge('log_records_suppressed', 'Repeated log records suppressed by the duplicate filter',
+                       lambda: log_pipeline.stats()['suppressed'])
+
+def shutdown_background_tasks():
+    """Stop periodic tasks and flush write-behind state"""
+    for task in background_tasks:
+        task.stop()
+    coordinator.stop()
+    presence_tracker.close()
+    db.close()
+
+atexit.register(shutdown_background_tasks)
+
 @app.route('/')
 def index():
     """Main entry point"""
@@ -123,6 +252,7 @@ def health_check():
         'service': 'SIBERINDO BTS GUI',
         'version': '2.0.0',
         'registered_blueprints': registered_bps,
+        'startup': startup.status(),
         'timestamp': __import__('datetime').datetime.now().isoformat()
     }
     return health_status
@@ -142,7 +272,7 @@ if __name__ == '__main__':
     print("Version: 2.0.0 - Enhanced")
     print(f"Access URL: http://{app.config.get('HOST','0.0.0.0')}:{app.config.get('PORT',5000)}")
     print(f"Health check: http://{app.config.get('HOST','0.0.0.0')}:{app.config.get('PORT',5000)}/health")
-    print("Default login: admin / admin")
+    print("Default login: admin / password123")
     print("=" * 50)
     
     host = app.config.get('HOST', '0.0.0.0')
@@ -8,11 +8,95 @@ class Config:
     PORT = int(os.environ.get('PORT') or 5000)
     DEBUG = os.environ.get('FLASK_ENV') == 'development'
     
+    # Startup: 'eager' (everything at import), 'lazy' (schema checks and caches on
+    # first use) or 'warmup' (lazy, plus a background warm-up right after start)
+    STARTUP_MODE = os.environ.get('STARTUP_MODE') or 'eager'
+    
+    # Serving (serve.py): 'threaded' (waitress thread pool), 'prefork' (N waitress
+    # worker processes on one socket) or 'dev' (Werkzeug)
+    SERVER_MODE = os.environ.get('SERVER_MODE') or 'threaded'
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS') or 2)
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS') or 8)
+    SERVER_CONNECTION_LIMIT = int(os.environ.get('SERVER_CONNECTION_LIMIT') or 100)
+    SERVER_CHANNEL_TIMEOUT = int(os.environ.get('SERVER_CHANNEL_TIMEOUT') or 120)
+    SERVER_BACKLOG = int(os.environ.get('SERVER_BACKLOG') or 1024)
+    
+    # Multi-process coordination: owner election lock, shared state and command socket
+    RUN_DIR = os.environ.get('RUN_DIR') or 'data/run'
+    OWNER_POLL_INTERVAL = float(os.environ.get('OWNER_POLL_INTERVAL') or 2)
+    SAMPLER_INTERVAL = float(os.environ.get('SAMPLER_INTERVAL') or 5)
+    SCAN_STATE_INTERVAL = float(os.environ.get('SCAN_STATE_INTERVAL') or 1)
+    
+    # Health probes: database check cache (seconds) and the write-buffer fill
+    # ratio at which /readyz reports not ready
+    HEALTH_DB_TTL = float(os.environ.get('HEALTH_DB_TTL') or 5)
+    HEALTH_QUEUE_HIGH_WATER = float(os.environ.get('HEALTH_QUEUE_HIGH_WATER') or 0.8)
+    
+    # SQL query profiler (off by default; can be switched on at runtime from /debug/queries)
+    QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'False').lower() == 'true'
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS') or 100)
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'True').lower() == 'true'
+    
     # Session config
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     
-    # Rate limiting
-    RATELIMIT_STORAGE_URL = "memory://"
+    # Users table: PBKDF2-SHA256 cost, lookup cache and the password-check pool
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS') or 600000)
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL') or 30)
+    LOGIN_WORKERS = int(os.environ.get('LOGIN_WORKERS') or 2)
+    LOGIN_QUEUE_SIZE = int(os.environ.get('LOGIN_QUEUE_SIZE') or 16)
+    
+    # Verified JWT payloads kept per process (0 disables the cache)
+    JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE') or 10000)
+    
+    # Rate limiting ("memory://" counts per process, "owner://" in the owner process for all workers)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True').lower() == 'true'
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL') or "memory://"
+    RATELIMIT_MAX_KEYS = int(os.environ.get('RATELIMIT_MAX_KEYS') or 100000)
+    RATELIMIT_TRUSTED_PROXIES = (os.environ.get('RATELIMIT_TRUSTED_PROXIES') or '127.0.0.1,::1').split(',')
+    LOGIN_RATE_LIMIT = int(os.environ.get('LOGIN_RATE_LIMIT') or 10)
+    LOGIN_RATE_WINDOW = int(os.environ.get('LOGIN_RATE_WINDOW') or 60)
+    SMS_RATE_LIMIT = int(os.environ.get('SMS_RATE_LIMIT') or 60)
+    SMS_RATE_WINDOW = int(os.environ.get('SMS_RATE_WINDOW') or 60)
+    
+    # API response encoder: auto (orjson when installed), orjson or stdlib
+    JSON_ENCODER = os.environ.get('JSON_ENCODER') or 'auto'
+    
+    # Seconds nginx may micro-cache polled endpoints (X-Accel-Expires; 0 = no proxy caching)
+    HTTP_MICROCACHE_SECONDS = int(os.environ.get('HTTP_MICROCACHE_SECONDS') or 1)
+    
+    # Response compression: brotli (when installed) or gzip for JSON/text bodies of at least COMPRESS_MIN_SIZE bytes
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'True').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 1024)
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL') or 6)
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY') or 4)
+    
+    # Application log pipeline ({pid} in LOG_FILE gives each worker its own file, and prefork adds it when missing; empty = console only)
+    LOG_FILE = os.environ.get('LOG_FILE', 'logs/bts_system.log')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    LOG_FORMAT = os.environ.get('LOG_FORMAT') or 'text'
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES') or 10 * 1024 * 1024)
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT') or 10)
+    LOG_ROTATE_INTERVAL = int(os.environ.get('LOG_ROTATE_INTERVAL') or 86400)
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE') or 10000)
+    LOG_DUPLICATE_WINDOW = float(os.environ.get('LOG_DUPLICATE_WINDOW') or 60)
+    LOG_DUPLICATE_BURST = int(os.environ.get('LOG_DUPLICATE_BURST') or 5)
+    
+    # Write-behind buffering for system_logs / network_events
+    LOG_BUFFER_ENABLED = os.environ.get('LOG_BUFFER_ENABLED', 'True').lower() == 'true'
+    LOG_BUFFER_BATCH = int(os.environ.get('LOG_BUFFER_BATCH') or 500)
+    LOG_BUFFER_FLUSH_INTERVAL = float(os.environ.get('LOG_BUFFER_FLUSH_INTERVAL') or 1.0)
+    LOG_BUFFER_MAX_PENDING = int(os.environ.get('LOG_BUFFER_MAX_PENDING') or 10000)
+    
+    # Background maintenance (seconds)
+    COUNTER_RECONCILE_INTERVAL = int(os.environ.get('COUNTER_RECONCILE_INTERVAL') or 3600)
+    PRESENCE_FLUSH_INTERVAL = float(os.environ.get('PRESENCE_FLUSH_INTERVAL') or 5)
+    RETENTION_INTERVAL = int(os.environ.get('RETENTION_INTERVAL') or 3600)
+    
+    # Raw-row retention windows (days) before rollup + archival
+    RETENTION_SYSTEM_LOGS_DAYS = int(os.environ.get('RETENTION_SYSTEM_LOGS_DAYS') or 30)
+    RETENTION_NETWORK_EVENTS_DAYS = int(os.environ.get('RETENTION_NETWORK_EVENTS_DAYS') or 14)
+    RETENTION_SMS_DAYS = int(os.environ.get('RETENTION_SMS_DAYS') or 90)
     
     # BTS Scanner config
     BTS_SCANNER_MOCK = os.environ.get('BTS_SCANNER_MOCK', 'True').lower() == 'true'
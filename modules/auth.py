@@ -1,106 +1,208 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, g
+from functools import wraps
 import hashlib
+import heapq
 import os
+import threading
+import time
 import jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import secrets
+from config import Config
+from modules.metrics import cache_requests
+from modules.rate_limit import rate_limit
+from modules.users import user_store, login_verifier, LoginBusy
+from modules import rbac
 
 auth_bp = Blueprint('auth', __name__)
 
-# Enhanced user database with roles and permissions
-users_db = {
-    'admin': {
-        'password': '8c6976e5b5410415bde908bd4dee15dfb167a9c873fc4bb8a81f6f2ab448a918',  # sha256('admin')
-        'role': 'administrator',
-        'full_name': 'System Administrator',
-        'email': 'admin@siberindo.com',
-        'created_at': '2024-01-01 00:00:00',
-        'last_login': None,
-        'is_active': True,
-        'permissions': ['all']
-    },
-    'operator': {
-        'password': '8c6976e5b5410415bde908bd4dee15dfb167a9c873fc4bb8a81f6f2ab448a918',  # sha256('admin')
-        'role': 'operator', 
-        'full_name': 'System Operator',
-        'email': 'operator@siberindo.com',
-        'created_at': '2024-01-01 00:00:00',
-        'last_login': None,
-        'is_active': True,
-        'permissions': ['dashboard', 'subscribers', 'sms_manager']
-    }
-}
-
 # JWT secret key
 JWT_SECRET = 'siberindo-bts-jwt-secret-2024-enhanced'
 JWT_ALGORITHM = 'HS256'
 
-def hash_password(password):
-    """Hash password using SHA-256 with salt"""
-    salt = "siberindo-salt-2024"
-    return hashlib.sha256((password + salt).encode()).hexdigest()
-
 def generate_token(username):
     """Generate JWT token for authenticated user"""
     payload = {
         'username': username,
-        'role': users_db[username]['role'],
+        'role': user_store.get(username)['role'],
         'exp': datetime.utcnow() + timedelta(hours=24)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+class TokenCache:
+    """Bounded cache of verified JWT payloads keyed by the token's SHA-256 digest.
+
+    An entry never outlives the token's `exp` claim: expired entries are
+    dropped on lookup and swept in expiry order on insert. When the cache is
+    full the least recently used entry goes. Raw tokens are never stored.
+    """
+    
+    def __init__(self, max_size=10000, clock=time.time):
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._expiries = []
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+    
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def put(self, token, payload):
+        expires = payload.get('exp')
+        if not self.max_size or expires is None:
+            return
+        key = self._key(token)
+        now = self.clock()
+        with self._lock:
+            while self._expiries and self._expiries[0][0] <= now:
+                _, expired_key = heapq.heappop(self._expiries)
+                entry = self._entries.get(expired_key)
+                if entry is not None and entry[1] <= now:
+                    del self._entries[expired_key]
+            if key not in self._entries:
+                heapq.heappush(self._expiries, (expires, key))
+            self._entries[key] = (payload, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if len(self._expiries) > 2 * self.max_size:
+                # LRU evictions leave stale heap entries behind; rebuild from live entries
+                self._expiries = [(entry[1], k) for k, entry in self._entries.items()]
+                heapq.heapify(self._expiries)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiries = []
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+# Verified tokens shared by every request in this process
+token_cache = TokenCache(max_size=Config.JWT_CACHE_SIZE)
+
 def verify_token(token):
-    """Verify JWT token"""
+    """Verify JWT token (cached until it expires)"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        cache_requests.inc(('jwt', 'hit'))
+        return payload
+    cache_requests.inc(('jwt', 'miss'))
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    token_cache.put(token, payload)
+    return payload
+
+def bearer_token():
+    """Token from an `Authorization: Bearer` header, or None"""
+    header = request.headers.get('Authorization')
+    if header and header.startswith('Bearer '):
+        return header[7:]
+    return None
+
+def authenticate_bearer():
+    """Verify the request's Bearer token; the payload goes on g.api_user, never into the session"""
+    token = bearer_token()
+    if token is None:
+        return None
+    payload = verify_token(token)
+    if payload:
+        g.api_user = payload
+    return payload
+
+def current_user():
+    """(username, role) of the session user or of the verified Bearer token"""
+    if session.get('logged_in'):
+        return session.get('username'), session.get('role')
+    api_user = g.get('api_user')
+    if api_user:
+        return api_user['username'], api_user['role']
+    return None, None
 
 def login_required(f):
     """Enhanced login required decorator with JWT verification"""
-    from functools import wraps
-    
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Check session first
-        if not session.get('logged_in'):
-            # Check for JWT token
-            token = request.headers.get('Authorization')
-            if token and token.startswith('Bearer '):
-                token = token[7:]
-                payload = verify_token(token)
-                if payload:
-                    session['logged_in'] = True
-                    session['username'] = payload['username']
-                    session['role'] = payload['role']
-                    return f(*args, **kwargs)
-            
-            flash('Please log in to access this page', 'warning')
-            return redirect(url_for('auth.login', next=request.url))
+        # Check session first, then a stateless Bearer token
+        if session.get('logged_in') or authenticate_bearer():
+            return f(*args, **kwargs)
+        if bearer_token() is not None:
+            return jsonify({'success': False, 'message': 'Invalid or expired token'}), 401
         
-        return f(*args, **kwargs)
+        flash('Please log in to access this page', 'warning')
+        return redirect(url_for('auth.login', next=request.url))
     return decorated_function
 
-def role_required(roles):
-    """Role-based access control decorator"""
+def current_mask():
+    """Compiled RBAC mask of the session user or Bearer token (0 when anonymous), once per request"""
+    mask = g.get('perm_mask')
+    if mask is not None:
+        return mask
+    if session.get('logged_in'):
+        mask = session.get('perm_mask')
+        if mask is None:
+            mask = rbac.user_mask(session.get('role'), session.get('permissions'))
+    elif g.get('api_user') or authenticate_bearer():
+        user = user_store.get(g.api_user['username'])
+        mask = rbac.user_mask(user['role'], user['permissions']) if user and user['is_active'] else 0
+    else:
+        mask = 0
+    g.perm_mask = mask
+    return mask
+
+def _access_denied():
+    """401/403 JSON for API paths; login redirect or flash + dashboard redirect for pages"""
+    authenticated = session.get('logged_in') or g.get('api_user') is not None
+    if '/api/' in request.path:
+        if authenticated:
+            return jsonify({'success': False, 'message': 'Insufficient permissions'}), 403
+        return jsonify({'success': False, 'message': 'Authentication required'}), 401
+    if not authenticated:
+        return redirect(url_for('auth.login'))
+    flash('Access denied: Insufficient permissions', 'danger')
+    return redirect(url_for('dashboard.dashboard'))
+
+def _mask_required(allowed):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if not session.get('logged_in'):
-                return redirect(url_for('auth.login'))
-            
-            if session.get('role') not in roles and 'all' not in users_db.get(session['username'], {}).get('permissions', []):
-                flash('Access denied: Insufficient permissions', 'danger')
-                return redirect(url_for('dashboard.dashboard'))
-            
-            return f(*args, **kwargs)
+            if allowed(current_mask()):
+                return f(*args, **kwargs)
+            return _access_denied()
         return decorated_function
     return decorator
 
+def permission_required(*permissions):
+    """Permission-based access control decorator (all listed permissions needed)"""
+    required = rbac.permission_mask(permissions)
+    return _mask_required(lambda mask: rbac.has_permissions(mask, required))
+
+def role_required(roles):
+    """Role-based access control decorator (any listed role, or the 'all' permission)"""
+    required = rbac.role_mask(roles)
+    return _mask_required(lambda mask: rbac.has_role(mask, required))
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@rate_limit('login', Config.LOGIN_RATE_LIMIT, Config.LOGIN_RATE_WINDOW)
 def login():
     """Enhanced login page with security features"""
     # Redirect if already logged in
@@ -118,11 +220,15 @@ def login():
             flash('Username and password are required', 'danger')
             return render_template('login.html', username=username, next=next_page)
         
-        # Check user credentials
-        user = users_db.get(username)
-        if user and user['is_active'] and user['password'] == hash_password(password):
+        # Check user credentials (on the login pool)
+        try:
+            user = login_verifier.verify(username, password)
+        except LoginBusy:
+            flash('Login service is busy, please try again in a moment', 'warning')
+            return render_template('login.html', username=username, next=next_page), 503, {'Retry-After': '1'}
+        if user:
             # Update last login
-            user['last_login'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            user_store.record_login(username)
             
             # Set session
             session['logged_in'] = True
@@ -130,6 +236,7 @@ def login():
             session['role'] = user['role']
             session['full_name'] = user['full_name']
             session['permissions'] = user.get('permissions', [])
+            session['perm_mask'] = rbac.user_mask(user['role'], user.get('permissions'))
             
             # Generate JWT token
             session['token'] = generate_token(username)
@@ -170,15 +277,15 @@ def logout():
 @login_required
 def profile():
     """User profile page"""
-    username = session.get('username')
-    user = users_db.get(username, {})
+    username, _ = current_user()
+    user = user_store.get(username) or {}
     
     profile_data = {
         'username': username,
         'full_name': user.get('full_name', ''),
         'email': user.get('email', ''),
         'role': user.get('role', ''),
-        'last_login': user.get('last_login', 'Never'),
+        'last_login': user.get('last_login') or 'Never',
         'created_at': user.get('created_at', 'Unknown')
     }
     
@@ -188,7 +295,7 @@ def profile():
 @login_required
 def change_password():
     """API endpoint for password change"""
-    username = session.get('username')
+    username, _ = current_user()
     data = request.get_json()
     
     current_password = data.get('current_password')
@@ -206,12 +313,15 @@ def change_password():
         return jsonify({'success': False, 'message': 'Password must be at least 6 characters'})
     
     # Verify current password
-    user = users_db.get(username)
-    if not user or user['password'] != hash_password(current_password):
+    try:
+        user = login_verifier.verify(username, current_password)
+    except LoginBusy:
+        return jsonify({'success': False, 'message': 'Service busy, please retry'}), 503, {'Retry-After': '1'}
+    if not user:
         return jsonify({'success': False, 'message': 'Current password is incorrect'})
     
     # Update password
-    user['password'] = hash_password(new_password)
+    user_store.set_password(username, new_password)
     
     # Log password change
     log_security_event('password_change', username, 'Password changed successfully')
@@ -238,18 +348,24 @@ def log_security_event(event_type, username, description):
 
 # API Authentication endpoints
 @auth_bp.route('/api/auth/login', methods=['POST'])
+@rate_limit('login', Config.LOGIN_RATE_LIMIT, Config.LOGIN_RATE_WINDOW)
 def api_login():
     """API endpoint for programmatic login"""
     data = request.get_json()
     username = data.get('username', '').strip()
     password = data.get('password', '')
     
-    user = users_db.get(username)
-    if user and user['is_active'] and user['password'] == hash_password(password):
+    try:
+        user = login_verifier.verify(username, password)
+    except LoginBusy:
+        response = jsonify({'success': False, 'message': 'Login service busy, retry shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    if user:
         token = generate_token(username)
         
         # Update last login
-        user['last_login'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        user_store.record_login(username)
         
         log_security_event('api_login_success', username, 'API login successful')
         
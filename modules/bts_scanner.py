@@ -1,10 +1,17 @@
 from flask import Blueprint, render_template, jsonify, request, Response
 from modules.helpers import login_required
+from modules.auth import permission_required
 from functools import wraps
 import logging
 import csv
 from io import StringIO
 from datetime import datetime
+from config import Config
+from modules.coordinator import coordinator
+from modules.hackrf_manager import scan_engine
+from modules.http_cache import conditional
+from modules.json_provider import encoded_cache
+from modules.result_set import project_rows, requested_fields
 
 logger = logging.getLogger(__name__)
 scanner_bp = Blueprint('scanner', __name__)
@@ -38,7 +45,11 @@ def cache_with_timeout(timeout):
 
 
 class OptimizedHackRFManager:
-    """HackRF manager with caching for scanner operations."""
+    """HackRF manager with caching for scanner operations.
+    
+    The scan engine lives in the owner process; reads come from its published
+    state and start/stop are sent to it as commands.
+    """
     
     _instance = None
     _scan_cache = {}
@@ -48,11 +59,15 @@ class OptimizedHackRFManager:
             cls._instance = super().__new__(cls)
         return cls._instance
     
+    def _scan_state(self):
+        """Latest scan state published by the owner (asks it directly before the first sample)"""
+        state = coordinator.get_state('scan')
+        return state if state is not None else coordinator.call('scan_state')
+    
     @cache_with_timeout(CACHE_TIMEOUT_SCAN)
     def get_detection_status(self):
         """Get cached HackRF detection status."""
-        from modules.hackrf_manager import HackRFManager
-        return HackRFManager().get_detection_status()
+        return self._scan_state()['detection']
     
     @cache_with_timeout(CACHE_TIMEOUT_SCAN)
     def get_available_bands(self):
@@ -66,32 +81,52 @@ class OptimizedHackRFManager:
     
     def get_scan_status(self):
         """Get current scan status."""
-        from modules.hackrf_manager import HackRFManager
-        return HackRFManager().get_scan_status()
+        return self._scan_state()['status']
     
     def get_scan_results(self):
         """Get scan results (no cache - always fresh)."""
-        from modules.hackrf_manager import HackRFManager
-        return HackRFManager().get_scan_results()
+        return self._scan_state()['results']
     
     @cache_with_timeout(CACHE_TIMEOUT_SCAN)
     def get_scan_stats(self):
         """Get scan statistics with caching."""
-        from modules.hackrf_manager import HackRFManager
-        return HackRFManager().get_scan_stats()
+        return self._scan_state()['stats']
     
     def start_scan(self, band, sample_rate, gain):
         """Start a new scan."""
-        from modules.hackrf_manager import HackRFManager
-        return HackRFManager().start_scan(band, sample_rate, gain)
+        return tuple(coordinator.call('scan_start', band=band, sample_rate=sample_rate, gain=gain))
     
     def stop_scan(self):
         """Stop current scan."""
-        from modules.hackrf_manager import HackRFManager
-        return HackRFManager().stop_scan()
+        return tuple(coordinator.call('scan_stop'))
+
+
+def get_scan_engine_state():
+    """Snapshot of the owner's scan engine"""
+    return {
+        'detection': scan_engine.get_detection_status(),
+        'status': scan_engine.get_scan_status(),
+        'results': scan_engine.get_scan_results(),
+        'stats': scan_engine.get_scan_stats()
+    }
+
+
+def _scan_command(method):
+    def command(**kwargs):
+        result = method(**kwargs)
+        coordinator.invalidate('scan')
+        return result
+    return command
+
+
+coordinator.register_state('scan', get_scan_engine_state, Config.SCAN_STATE_INTERVAL)
+coordinator.register_command('scan_state', get_scan_engine_state)
+coordinator.register_command('scan_start', _scan_command(scan_engine.start_scan))
+coordinator.register_command('scan_stop', _scan_command(scan_engine.stop_scan))
 
 @scanner_bp.route('/bts_scanner')
 @login_required
+@permission_required('scanner')
 def bts_scanner():
     """BTS scanner view with lazy loading."""
     try:
@@ -116,6 +151,7 @@ def bts_scanner():
 
 @scanner_bp.route('/api/bts_scan/start', methods=['POST'])
 @login_required
+@permission_required('scanner')
 def start_bts_scan():
     """Start BTS scan with parameter validation."""
     try:
@@ -142,6 +178,7 @@ def start_bts_scan():
 
 @scanner_bp.route('/api/bts_scan/stop', methods=['POST'])
 @login_required
+@permission_required('scanner')
 def stop_bts_scan():
     """Stop BTS scan."""
     try:
@@ -157,8 +194,16 @@ def stop_bts_scan():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+def scan_version():
+    """Conditional-request version of /api/bts_scan/status: content version of the published scan state"""
+    version = coordinator.state_version('scan')
+    return None if version is None else (version,)
+
+
 @scanner_bp.route('/api/bts_scan/status', methods=['GET'])
 @login_required
+@permission_required('scanner')
+@conditional(scan_version)
 def get_bts_scan_status():
     """Get BTS scan status and results."""
     try:
@@ -169,7 +214,7 @@ def get_bts_scan_status():
         
         return jsonify({
             'scan_status': scan_status,
-            'scan_results': scan_results,
+            'scan_results': encoded_cache.get('scan_results', scan_results),
             'timestamp': datetime.now().strftime('%H:%M:%S')
         })
     except Exception as e:
@@ -179,16 +224,18 @@ def get_bts_scan_status():
 
 @scanner_bp.route('/api/bts_scan/results', methods=['GET'])
 @login_required
+@permission_required('scanner')
 def get_bts_scan_results():
-    """Get BTS scan results and statistics."""
+    """Get BTS scan results and statistics (?fields=arfcn,frequency,signal)."""
     try:
         hackrf = OptimizedHackRFManager()
         
         results = hackrf.get_scan_results()
         stats = hackrf.get_scan_stats()
+        fields = requested_fields()
         
         return jsonify({
-            'results': results,
+            'results': project_rows(results or [], fields) if fields else encoded_cache.get('scan_results', results),
             'stats': stats,
             'count': len(results) if results else 0,
             'timestamp': datetime.now().strftime('%H:%M:%S')
@@ -200,6 +247,7 @@ def get_bts_scan_results():
 
 @scanner_bp.route('/api/bts_scan/bands', methods=['GET'])
 @login_required
+@permission_required('scanner')
 def get_available_bands():
     """Get available frequency bands."""
     try:
@@ -217,6 +265,7 @@ def get_available_bands():
 
 @scanner_bp.route('/api/bts_scan/analyze', methods=['POST'])
 @login_required
+@permission_required('scanner')
 def analyze_bts_results():
     """Analyze BTS scan results with signal quality assessment."""
     try:
@@ -284,6 +333,7 @@ def analyze_bts_results():
 
 @scanner_bp.route('/api/bts_scan/export', methods=['GET'])
 @login_required
+@permission_required('scanner')
 def export_scan_results():
     """Export BTS scan results as CSV."""
     try:
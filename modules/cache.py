@@ -6,16 +6,19 @@ Provides common decorators and cache management
 from functools import wraps
 import time
 import logging
+from modules.metrics import cache_requests
 
 logger = logging.getLogger(__name__)
 
 
-def cache_with_timeout(timeout):
+def cache_with_timeout(timeout, version=None):
     """
     Decorator to cache function results with timeout.
     
     Args:
         timeout (int): Cache timeout in seconds
+        version (callable): Optional data version (e.g. a database change
+            counter); a cached result is only reused while it is unchanged
         
     Returns:
         decorator: Function decorator for caching
@@ -28,24 +31,39 @@ def cache_with_timeout(timeout):
     def decorator(f):
         cache = {}
         cache_time = {}
+        cache_version = {}
+        hit_labels = (f.__qualname__, 'hit')
+        miss_labels = (f.__qualname__, 'miss')
         
         @wraps(f)
         def decorated(*args, **kwargs):
             # Create cache key from function arguments
             cache_key = (args, tuple(sorted(kwargs.items())))
             now = time.time()
+            current = version() if version is not None else None
             
-            # Return cached result if not expired
-            if cache_key in cache and (now - cache_time[cache_key]) < timeout:
+            # Return cached result if not expired and the data has not changed since
+            if (cache_key in cache and (now - cache_time[cache_key]) < timeout
+                    and cache_version[cache_key] == current):
+                cache_requests.inc(hit_labels)
                 return cache[cache_key]
             
             # Compute new result and cache it
+            cache_requests.inc(miss_labels)
             result = f(*args, **kwargs)
             cache[cache_key] = result
             cache_time[cache_key] = now
+            cache_version[cache_key] = current
             
             return result
         
+        def invalidate():
+            """Drop every cached result (after a local write)"""
+            cache.clear()
+            cache_time.clear()
+            cache_version.clear()
+        
+        decorated.invalidate = invalidate
         return decorated
     return decorator
 
@@ -58,6 +76,7 @@ class CacheManager:
     TIMEOUT_SUBSCRIBERS = 30       # 30 seconds for subscriber list
     TIMEOUT_SYSTEM_STATS = 10      # 10 seconds for system statistics
     TIMEOUT_SERVICE_STATUS = 5     # 5 seconds for service status
+    TIMEOUT_SUBSCRIBER_STATS = 5   # 5 seconds for subscriber counters
     
     @staticmethod
     def get_timeout(cache_type):
@@ -67,6 +86,7 @@ class CacheManager:
             'subscribers': CacheManager.TIMEOUT_SUBSCRIBERS,
             'system_stats': CacheManager.TIMEOUT_SYSTEM_STATS,
             'service_status': CacheManager.TIMEOUT_SERVICE_STATUS,
+            'subscriber_stats': CacheManager.TIMEOUT_SUBSCRIBER_STATS,
         }
         return timeouts.get(cache_type, 30)
     
@@ -0,0 +1,74 @@
+"""
+Response compression for SIBERINDO BTS GUI
+Compresses JSON and text responses above COMPRESS_MIN_SIZE with brotli (when
+the brotli package is installed) or gzip, whichever the client accepts
+"""
+
+import gzip
+import logging
+from flask import current_app, request
+from modules.metrics import registry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Mimetypes worth compressing (images, archives and exports streamed from disk are left alone)
+COMPRESSIBLE_TYPES = frozenset((
+    'application/json', 'application/javascript', 'text/html', 'text/css',
+    'text/plain', 'text/csv', 'text/javascript', 'image/svg+xml'
+))
+
+
+def available_encodings():
+    """Content-Encodings this process can produce, preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body, encoding, config):
+    """body encoded with `encoding` ('br' or 'gzip')"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=config.get('COMPRESS_BROTLI_QUALITY', 4))
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=config.get('COMPRESS_LEVEL', 6), mtime=0)
+
+
+def compress_response(response):
+    """after_request hook: compress the body when the client accepts it and it is large enough"""
+    config = current_app.config
+    if (not config.get('COMPRESS_RESPONSES', True)
+            or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    data = compress(body, encoding, config)
+    if len(data) >= len(body):
+        return response
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # A strong validator names exact bytes, so each encoding needs its own
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    compressed_responses.inc((encoding,))
+    compression_saved_bytes.inc((encoding,), len(body) - len(data))
+    return response
+
+
+compressed_responses = registry.counter('http_compressed_responses_total', 'Responses sent compressed',
+                                        ('encoding',))
+compression_saved_bytes = registry.counter('http_compression_saved_bytes_total',
+                                           'Body bytes saved by response compression', ('encoding',))
@@ -0,0 +1,243 @@
+"""
+Process coordination for SIBERINDO BTS GUI
+Elects one process to own the singletons (metrics sampler, scan engine,
+maintenance tasks); the other workers read its published state and send it commands
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from config import Config
+from modules.shared_state import OwnerLock, SharedSnapshot, CommandServer, send_command
+from modules.middleware import get_request_id, request_context
+
+logger = logging.getLogger(__name__)
+
+
+def _content_version(value):
+    """Digest of a sampled value as it is published; equal values give equal versions in every process"""
+    encoded = json.dumps(value, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class StateSource:
+    """A function whose result the owner publishes every `interval` seconds"""
+
+    __slots__ = ('key', 'func', 'interval', 'next_due')
+
+    def __init__(self, key, func, interval):
+        self.key = key
+        self.func = func
+        self.interval = interval
+        self.next_due = 0.0
+
+
+class Coordinator:
+    """Owner election plus state publishing and command routing between processes.
+
+    Every process calls start(). The first one to take the owner lock runs the
+    registered tasks, samples the registered state sources into a shared
+    snapshot and serves commands; the others poll the lock so one of them takes
+    over if the owner dies. In a single-process server the only process is the
+    owner, so callers use the same API either way.
+    """
+
+    def __init__(self, run_dir, poll_interval=2.0, stale_after=60):
+        self.run_dir = run_dir
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._lock = OwnerLock(os.path.join(run_dir, 'owner.lock'))
+        self._snapshot = SharedSnapshot(os.path.join(run_dir, 'state.mmap'))
+        self._socket_path = os.path.join(run_dir, 'owner.sock')
+        self._sources = {}
+        self._commands = {}
+        self._tasks = []
+        self._state = {}
+        self._state_lock = threading.Lock()
+        self._published_at = None
+        self._command_server = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+        self._started = False
+
+    @property
+    def is_owner(self):
+        return self._lock.held
+
+    @property
+    def alive(self):
+        """False once start() was called but the election thread has died"""
+        return not self._started or (self._thread is not None and self._thread.is_alive())
+
+    # Registration (any process, before or after start)
+
+    def register_state(self, key, func, interval=5.0):
+        """Publish func() under `key` every `interval` seconds from the owner"""
+        self._sources[key] = StateSource(key, func, interval)
+
+    def register_command(self, name, func):
+        """Expose func(**kwargs) to workers through call(name, ...)"""
+        self._commands[name] = func
+
+    def invalidate(self, key):
+        """Ask the owner to re-sample `key` now (e.g. after a command changed it)"""
+        source = self._sources.get(key)
+        if source is not None:
+            source.next_due = 0.0
+            self._wake.set()
+
+    def register_task(self, task):
+        """Run a PeriodicTask only in the owner process"""
+        self._tasks.append(task)
+        if self.is_owner:
+            task.start()
+
+    # Lifecycle
+
+    def start(self):
+        """Join the election; safe to call more than once"""
+        if self._started:
+            return self
+        self._started = True
+        os.makedirs(self.run_dir, exist_ok=True)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='coordinator', daemon=True)
+        if self._lock.try_acquire():
+            self._become_owner()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        for task in self._tasks:
+            task.stop()
+        if self._command_server is not None:
+            self._command_server.stop()
+            self._command_server = None
+        self._snapshot.close()
+        self._lock.release()
+        self._started = False
+
+    def _become_owner(self):
+        logger.info(f"Process {os.getpid()} is the owner process")
+        self._snapshot.close()
+        self._snapshot.open_writer()
+        self._command_server = CommandServer(self._socket_path, self._dispatch).start()
+        for task in self._tasks:
+            task.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self.is_owner:
+                self._sample_due()
+                self._wake.wait(self._next_wait())
+                self._wake.clear()
+            else:
+                if self._lock.try_acquire():
+                    self._become_owner()
+                    continue
+                self._stop_event.wait(self.poll_interval)
+
+    def _next_wait(self):
+        now = time.monotonic()
+        due = [source.next_due for source in self._sources.values()]
+        return max(0.05, min(due) - now) if due else self.poll_interval
+
+    def _sample_due(self):
+        now = time.monotonic()
+        changed = False
+        for source in list(self._sources.values()):
+            if source.next_due > now:
+                continue
+            source.next_due = now + source.interval
+            try:
+                value = source.func()
+            except Exception:
+                logger.exception(f"State source {source.key} failed")
+                continue
+            version = _content_version(value)
+            with self._state_lock:
+                previous = self._state.get(source.key)
+                if previous is not None and previous['version'] == version:
+                    # Same content: keep the old object so pre-encoded copies of it stay valid
+                    value = previous['value']
+                self._state[source.key] = {'value': value, 'version': version, 'updated_at': time.time()}
+            changed = True
+        if changed:
+            self._publish()
+
+    def _publish(self):
+        with self._state_lock:
+            self._published_at = time.time()
+            document = {'owner_pid': os.getpid(), 'published_at': self._published_at, 'state': dict(self._state)}
+            try:
+                self._snapshot.write(document)
+            except Exception:
+                logger.exception("Error publishing shared state")
+
+    # Reading state and sending commands (any process)
+
+    def _entry(self, key):
+        if self.is_owner:
+            with self._state_lock:
+                return self._state.get(key)
+        document = self._snapshot.read()
+        return document['state'].get(key) if document else None
+
+    def get_state(self, key, default=None):
+        """Latest published value for `key`, or `default` if not sampled yet or stale"""
+        entry = self._entry(key)
+        if entry is None or time.time() - entry['updated_at'] > self.stale_after:
+            return default
+        return entry['value']
+
+    def state_version(self, key):
+        """Content version of `key` (changes only when its value does), or None if not sampled yet or stale"""
+        entry = self._entry(key)
+        if entry is None or time.time() - entry['updated_at'] > self.stale_after:
+            return None
+        return entry.get('version')
+
+    def state_age(self, key):
+        """Seconds since `key` was last sampled, or None if it never was"""
+        entry = self._entry(key)
+        return time.time() - entry['updated_at'] if entry else None
+
+    def call(self, name, timeout=10, **kwargs):
+        """Run a registered command in the owner process (under the caller's request id)"""
+        if self.is_owner or not self._started:
+            return self._dispatch(name, kwargs)
+        return send_command(self._socket_path, name, kwargs, timeout=timeout, request_id=get_request_id())
+
+    def _dispatch(self, name, kwargs, request_id=None):
+        if name not in self._commands:
+            raise KeyError(f"Unknown command: {name}")
+        if request_id is None:
+            return self._commands[name](**kwargs)
+        with request_context(request_id):
+            return self._commands[name](**kwargs)
+
+    def status(self):
+        """Role and snapshot freshness for monitoring"""
+        document = None if self.is_owner else self._snapshot.read()
+        published_at = self._published_at if self.is_owner else (document or {}).get('published_at')
+        return {
+            'pid': os.getpid(),
+            'role': 'owner' if self.is_owner else 'worker',
+            'owner_pid': os.getpid() if self.is_owner else (document or {}).get('owner_pid'),
+            'state_keys': sorted(self._state if self.is_owner else (document or {}).get('state', {})),
+            'snapshot_age': round(time.time() - published_at, 3) if published_at else None,
+            'checked_at': datetime.now().isoformat()
+        }
+
+
+# Global coordinator shared by all blueprints
+coordinator = Coordinator(Config.RUN_DIR, poll_interval=Config.OWNER_POLL_INTERVAL)
@@ -1,11 +1,11 @@
 from flask import Blueprint, render_template, session, jsonify, request
-import psutil
 import time
 import logging
 from datetime import datetime, timedelta
 import subprocess
 import os
 import json
+import platform
 
 logger = logging.getLogger(__name__)
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -24,6 +24,7 @@ class AdvancedSystemMonitor:
     
     def get_comprehensive_system_stats(self):
         """Get comprehensive system statistics with enhanced metrics"""
+        import psutil  # deferred: only the sampling process needs it
         try:
             # CPU information with detailed metrics
             cpu_times = psutil.cpu_times_percent(interval=0.5)
@@ -136,6 +137,7 @@ class EnhancedBTSMonitor:
     
     def get_detailed_bts_status(self):
         """Get detailed BTS system status with process information"""
+        import psutil
         try:
             running_processes = []
             total_memory_usage = 0
@@ -346,26 +348,53 @@ def calculate_advanced_health_score(services_running, hackrf_connected, memory_u
 
 # Import proper login_required decorator from helpers (DRY principle)
 from modules.helpers import login_required
+from modules.auth import permission_required
+from modules.json_provider import encoded_cache
+from modules.http_cache import conditional
+from modules.subscribers import SubscriberManager, subscribers_data_version
 
 # Initialize managers
 system_monitor = AdvancedSystemMonitor()
 bts_monitor = EnhancedBTSMonitor()
 hackrf_manager = AdvancedHackRFManager(simulation_mode=True)
 
+# Sampling runs once, in the owner process; requests read the published snapshot
+from config import Config
+from modules.coordinator import coordinator
+from modules.service_manager import ServiceManager
+
+def get_services_status():
+    """Service refresher sampled by the owner process"""
+    return ServiceManager().get_all_services_status()
+
+def run_hackrf_detection():
+    """Force a HackRF detection in the owner process"""
+    detected, message = hackrf_manager.detect_hackrf()
+    return {'detected': detected, 'message': message,
+            'hackrf_status': hackrf_manager.get_enhanced_detection_status()}
+
+coordinator.register_state('system_stats', system_monitor.get_comprehensive_system_stats, Config.SAMPLER_INTERVAL)
+coordinator.register_state('bts_status', bts_monitor.get_detailed_bts_status, Config.SAMPLER_INTERVAL)
+coordinator.register_state('hackrf_status', hackrf_manager.get_enhanced_detection_status, Config.SAMPLER_INTERVAL)
+coordinator.register_state('services', get_services_status, Config.SAMPLER_INTERVAL)
+coordinator.register_command('hackrf_detect', run_hackrf_detection)
+
+def shared_state(key, fallback):
+    """Owner-published state, computed locally until the first sample lands"""
+    value = coordinator.get_state(key)
+    return value if value is not None else fallback()
+
 @dashboard_bp.route('/dashboard')
 @login_required
+@permission_required('dashboard')
 def dashboard():
     """Enhanced main dashboard endpoint"""
     try:
-        # Get service manager (simulated for now)
-        from modules.service_manager import ServiceManager
-        service_manager = ServiceManager()
-        
         # Get all status information
-        services_status = service_manager.get_all_services_status()
-        hackrf_status = hackrf_manager.get_enhanced_detection_status()
-        system_stats = system_monitor.get_comprehensive_system_stats()
-        bts_status = bts_monitor.get_detailed_bts_status()
+        services_status = shared_state('services', get_services_status)
+        hackrf_status = shared_state('hackrf_status', hackrf_manager.get_enhanced_detection_status)
+        system_stats = shared_state('system_stats', system_monitor.get_comprehensive_system_stats)
+        bts_status = shared_state('bts_status', bts_monitor.get_detailed_bts_status)
         
         # Get additional data
         subscribers_count = get_subscribers_count()
@@ -414,21 +443,28 @@ def dashboard():
                              company='SIBERINDO',
                              timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
 
+DASHBOARD_STATE_KEYS = ('services', 'hackrf_status', 'system_stats', 'bts_status')
+
+def refresh_version():
+    """Conditional-request version of /api/dashboard/refresh: content versions of its state plus the subscribers counter"""
+    versions = tuple(coordinator.state_version(key) for key in DASHBOARD_STATE_KEYS)
+    versions += (subscribers_data_version(),)
+    return None if None in versions else versions
+
 @dashboard_bp.route('/api/dashboard/refresh')
 @login_required
+@permission_required('dashboard')
+@conditional(refresh_version)
 def refresh_dashboard():
     """Enhanced API endpoint for real-time dashboard updates"""
     try:
-        from modules.service_manager import ServiceManager
-        service_manager = ServiceManager()
-        
         # Get updated status
-        services_status = service_manager.get_all_services_status()
-        hackrf_status = hackrf_manager.get_enhanced_detection_status()
-        system_stats = system_monitor.get_comprehensive_system_stats()
-        bts_status = bts_monitor.get_detailed_bts_status()
+        services_status = shared_state('services', get_services_status)
+        hackrf_status = shared_state('hackrf_status', hackrf_manager.get_enhanced_detection_status)
+        system_stats = shared_state('system_stats', system_monitor.get_comprehensive_system_stats)
+        bts_status = shared_state('bts_status', bts_monitor.get_detailed_bts_status)
         
-        subscribers_count = get_subscribers_count()
+        subscribers_count = SubscriberManager.get_subscribers_count()
         services_running = sum(1 for s in services_status.values() if s.get('status') == 'running')
         
         # Calculate health score
@@ -440,14 +476,15 @@ def refresh_dashboard():
             system_stats.get('disk', {}).get('percent', 0)
         )
         
+        # Sampled state is re-encoded only when the owner publishes a new sample
         return jsonify({
             'success': True,
-            'services': services_status,
-            'hackrf_status': hackrf_status,
+            'services': encoded_cache.get('services', services_status),
+            'hackrf_status': encoded_cache.get('hackrf_status', hackrf_status),
             'subscribers_count': subscribers_count,
             'services_running': services_running,
-            'system_stats': system_stats,
-            'bts_status': bts_status,
+            'system_stats': encoded_cache.get('system_stats', system_stats),
+            'bts_status': encoded_cache.get('bts_status', bts_status),
             'health_score': health_score,
             'timestamp': datetime.now().strftime('%H:%M:%S'),
             'server_time': datetime.now().isoformat()
@@ -463,18 +500,18 @@ def refresh_dashboard():
 
 @dashboard_bp.route('/api/hackrf/detect', methods=['POST'])
 @login_required
+@permission_required('dashboard')
 def detect_hackrf():
     """Enhanced API endpoint for manual HackRF detection"""
     try:
         # Force new detection
-        detected, message = hackrf_manager.detect_hackrf()
-        status_info = hackrf_manager.get_enhanced_detection_status()
+        detection = coordinator.call('hackrf_detect')
         
         return jsonify({
             'success': True,
-            'detected': detected,
-            'message': message,
-            'hackrf_status': status_info,
+            'detected': detection['detected'],
+            'message': detection['message'],
+            'hackrf_status': detection['hackrf_status'],
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -487,6 +524,7 @@ def detect_hackrf():
 
 @dashboard_bp.route('/api/system/restart-service', methods=['POST'])
 @login_required
+@permission_required('services')
 def restart_service():
     """API endpoint to restart BTS services"""
     try:
@@ -511,6 +549,7 @@ def restart_service():
 
 @dashboard_bp.route('/api/system/shutdown', methods=['POST'])
 @login_required
+@permission_required('services')
 def system_shutdown():
     """API endpoint for system shutdown (simulated)"""
     try:
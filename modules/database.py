@@ -1,28 +1,221 @@
 import sqlite3
 import os
 import json
+import time
+import threading
 from datetime import datetime
 import logging
 
+from config import Config
+from modules.write_buffer import WriteBehindBuffer
+from modules.metrics import db_query_duration
+from modules.query_profiler import query_profiler
+from modules.result_set import ResultSet
+
 logger = logging.getLogger(__name__)
 
+SUBSCRIBER_COUNTER_DIMENSIONS = ('status', 'network', 'location')
+
+
+def _subscriber_counter_triggers():
+    """CREATE TRIGGER statements that keep subscriber_counters in sync"""
+    def bump(dimension, source, delta):
+        value = f"COALESCE({source}.{dimension}, '')"
+        return (f"INSERT INTO subscriber_counters (dimension, value, count) "
+                f"VALUES ('{dimension}', {value}, {delta}) "
+                f"ON CONFLICT(dimension, value) DO UPDATE SET count = count + {delta};")
+    
+    # The grand total is the sum of the status counters, so it needs no row of its own
+    dimensions = SUBSCRIBER_COUNTER_DIMENSIONS
+    statements = [
+        'CREATE TRIGGER IF NOT EXISTS trg_subscriber_counters_insert AFTER INSERT ON subscribers BEGIN '
+        + ' '.join(bump(d, 'NEW', 1) for d in dimensions) + ' END',
+        'CREATE TRIGGER IF NOT EXISTS trg_subscriber_counters_delete AFTER DELETE ON subscribers BEGIN '
+        + ' '.join(bump(d, 'OLD', -1) for d in dimensions) + ' END',
+    ]
+    for d in SUBSCRIBER_COUNTER_DIMENSIONS:
+        statements.append(
+            f'CREATE TRIGGER IF NOT EXISTS trg_subscriber_counters_update_{d} '
+            f'AFTER UPDATE OF {d} ON subscribers WHEN OLD.{d} IS NOT NEW.{d} BEGIN '
+            f'{bump(d, "OLD", -1)} {bump(d, "NEW", 1)} END'
+        )
+    return statements
+
+
+# Change counters in data_versions: one row per name, bumped by triggers on the
+# writes that change what polled endpoints show (subscribers.last_seen alone does not)
+DATA_VERSION_TRIGGERS = {
+    'subscribers': ('INSERT', 'DELETE', 'UPDATE OF status, network, location'),
+    'sms_messages': ('INSERT', 'DELETE', 'UPDATE'),
+}
+
+
+def _data_version_triggers():
+    """CREATE TRIGGER statements that bump data_versions on every relevant write"""
+    statements = []
+    for table, events in DATA_VERSION_TRIGGERS.items():
+        for event in events:
+            statements.append(
+                f'CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_{event.split()[0].lower()} '
+                f'AFTER {event} ON {table} BEGIN '
+                f"UPDATE data_versions SET version = version + 1 WHERE name = '{table}'; END"
+            )
+    return statements
+
+
+STATEMENT_KINDS = frozenset(('select', 'insert', 'update', 'delete', 'replace', 'with', 'create', 'pragma'))
+
+
+def _statement_kind(sql):
+    words = sql[:32].split(None, 1)
+    kind = words[0].lower() if words else ''
+    return kind if kind in STATEMENT_KINDS else 'other'
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that records execute time per statement kind (select/insert/...)"""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            db_query_duration.observe(time.perf_counter() - started, (_statement_kind(sql),))
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            db_query_duration.observe(time.perf_counter() - started, (_statement_kind(sql),))
+
+
+class ProfiledCursor(InstrumentedCursor):
+    """InstrumentedCursor that also feeds the query profiler, rows and fetch time included"""
+
+    _stats = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._stats = query_profiler.record(sql, time.perf_counter() - started, max(self.rowcount, 0),
+                                                self.connection, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._stats = query_profiler.record(sql, time.perf_counter() - started, max(self.rowcount, 0))
+
+    def _fetched(self, rows, started):
+        if self._stats is not None and rows:
+            query_profiler.add_fetch(self._stats, rows, time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(row is not None, started)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), started)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), started)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        row = super().__next__()
+        self._fetched(1, started)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, and execute shortcuts, feed the query metrics (and profiler)"""
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = ProfiledCursor if query_profiler.enabled else InstrumentedCursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _utc_timestamp():
+    """Current UTC time in the same format as SQLite's CURRENT_TIMESTAMP"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+
+
+def _prefix_range(prefix):
+    """Return the [lower, upper) bounds matching every string starting with prefix"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
 class BTSDatabase:
     """Enhanced database management for BTS system"""
     
-    def __init__(self, db_path='data/bts_database.db'):
+    def __init__(self, db_path='data/bts_database.db', buffered_logging=False, log_buffer_options=None,
+                 defer_schema=False):
         self.db_path = db_path
-        self.init_database()
+        self.archive_dir = os.path.join(os.path.dirname(db_path), 'archive')
+        self._network_event_listeners = []
+        self.system_log_buffer = None
+        self.network_event_buffer = None
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        if not defer_schema:
+            self.ensure_schema()
+        
+        if buffered_logging:
+            options = log_buffer_options or {}
+            self.system_log_buffer = WriteBehindBuffer('system_logs', self._insert_system_logs, **options)
+            self.network_event_buffer = WriteBehindBuffer('network_events', self._insert_network_events, **options)
     
     def get_connection(self):
-        """Create a database connection"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
+        """Create a database connection (creating the schema on first use)"""
+        if not self._schema_ready:
+            self.ensure_schema()
+        return self._connect()
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, factory=InstrumentedConnection)
         conn.row_factory = sqlite3.Row
         return conn
     
+    def ping(self):
+        """Open a connection and run a trivial query without touching the schema"""
+        conn = self._connect()
+        try:
+            conn.execute('SELECT 1').fetchone()
+        finally:
+            conn.close()
+        return self._schema_ready
+    
+    def ensure_schema(self):
+        """Run the schema checks once; concurrent first callers wait for the winner"""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                self.init_database()
+    
     def init_database(self):
         """Initialize the database with all required tables"""
-        conn = self.get_connection()
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = self._connect()
         
         try:
             # Subscribers table
@@ -93,6 +286,91 @@ class BTSDatabase:
                 )
             ''')
             
+            # Subscriber lookup indexes (IMSI is covered by its UNIQUE constraint)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_subscribers_msisdn ON subscribers(msisdn)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_subscribers_last_seen ON subscribers(last_seen)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_subscribers_status_last_seen ON subscribers(status, last_seen)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_subscribers_network_last_seen ON subscribers(network, last_seen)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_subscribers_location_last_seen ON subscribers(location, last_seen)')
+            
+            # Time indexes for newest-first listings and retention range scans
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_system_logs_timestamp ON system_logs(timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_network_events_timestamp ON network_events(timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sms_messages_timestamp ON sms_messages(timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_network_events_imsi_timestamp ON network_events(imsi, timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_network_events_cell_timestamp ON network_events(cell_id, timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_network_events_type_timestamp ON network_events(event_type, timestamp)')
+            
+            # Hourly counts of rows removed by the retention job
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS event_rollups_hourly (
+                    table_name TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    dimensions TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (table_name, bucket, dimensions)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Last known subscriber location, written behind by the presence tracker
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS subscriber_presence (
+                    imsi TEXT PRIMARY KEY,
+                    cell_id TEXT,
+                    lac TEXT,
+                    attached INTEGER NOT NULL DEFAULT 1,
+                    last_seen DATETIME NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_subscriber_presence_last_seen ON subscriber_presence(last_seen)')
+            
+            # Materialized subscriber counters, maintained by triggers so every
+            # write path (single insert, bulk upsert, status update) stays in sync
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS subscriber_counters (
+                    dimension TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (dimension, value)
+                ) WITHOUT ROWID
+            ''')
+            counters_created = conn.execute('SELECT 1 FROM subscriber_counters LIMIT 1').fetchone() is None
+            
+            # Change counters for ETags and version-checked caches (see DATA_VERSION_TRIGGERS);
+            # they start at the creation time so a recreated database never reuses old versions
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            conn.executemany('INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, ?)',
+                             [(name, int(time.time())) for name in DATA_VERSION_TRIGGERS])
+            
+            # Application users (same layout as scripts/init_db.py plus permissions/last_login)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    email TEXT UNIQUE,
+                    full_name TEXT,
+                    role TEXT DEFAULT 'operator' CHECK(role IN ('administrator', 'operator', 'viewer')),
+                    enabled BOOLEAN DEFAULT 1,
+                    permissions TEXT NOT NULL DEFAULT '[]',
+                    last_login DATETIME,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            user_columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+            if 'permissions' not in user_columns:
+                conn.execute("ALTER TABLE users ADD COLUMN permissions TEXT NOT NULL DEFAULT '[]'")
+            if 'last_login' not in user_columns:
+                conn.execute('ALTER TABLE users ADD COLUMN last_login DATETIME')
+            for statement in _subscriber_counter_triggers() + _data_version_triggers():
+                conn.execute(statement)
+            
             # Insert default BTS configuration if not exists
             conn.execute('''
                 INSERT OR IGNORE INTO bts_config (mcc, mnc, lac, cell_id, arfcn, power, band)
@@ -107,6 +385,10 @@ class BTSDatabase:
             raise
         finally:
             conn.close()
+        
+        self._schema_ready = True
+        if counters_created:
+            self.reconcile_subscriber_counters()
     
     # Subscribers management
     def add_subscriber(self, imsi, msisdn=None, name=None, location=None, network='GSM'):
@@ -124,6 +406,46 @@ class BTSDatabase:
         finally:
             conn.close()
     
+    def upsert_subscribers(self, rows, chunk_size=5000):
+        """Insert or update subscribers in chunked transactions.
+        
+        rows is an iterable of (imsi, msisdn, name, location, status, network)
+        tuples; None fields keep the stored value on update and fall back to
+        the column default on insert. Returns the number of rows written.
+        """
+        sql = '''
+            INSERT INTO subscribers (imsi, msisdn, name, location, status, network, last_seen)
+            VALUES (?1, ?2, ?3, ?4, COALESCE(?5, 'active'), COALESCE(?6, 'GSM'), ?7)
+            ON CONFLICT(imsi) DO UPDATE SET
+                msisdn = COALESCE(?2, msisdn),
+                name = COALESCE(?3, name),
+                location = COALESCE(?4, location),
+                status = COALESCE(?5, status),
+                network = COALESCE(?6, network)
+        '''
+        now = datetime.now()
+        written = 0
+        chunk = []
+        conn = self.get_connection()
+        try:
+            for row in rows:
+                chunk.append((*row, now))
+                if len(chunk) >= chunk_size:
+                    conn.executemany(sql, chunk)
+                    conn.commit()
+                    written += len(chunk)
+                    chunk = []
+            if chunk:
+                conn.executemany(sql, chunk)
+                conn.commit()
+                written += len(chunk)
+            return written
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
     def get_subscribers(self, status=None, network=None, limit=100):
         """Get subscribers with filtering"""
         conn = self.get_connection()
@@ -142,8 +464,65 @@ class BTSDatabase:
             query += ' ORDER BY last_seen DESC LIMIT ?'
             params.append(limit)
             
-            subscribers = conn.execute(query, params).fetchall()
-            return [dict(sub) for sub in subscribers]
+            return ResultSet.from_cursor(conn.execute(query, params))
+        finally:
+            conn.close()
+    
+    def search_subscribers(self, imsi=None, imsi_prefix=None, msisdn=None, msisdn_prefix=None,
+                           status=None, network=None, location=None,
+                           seen_after=None, seen_before=None, limit=100, offset=0):
+        """Search subscribers using indexed exact/prefix lookups and filters"""
+        conn = self.get_connection()
+        try:
+            query = 'SELECT * FROM subscribers WHERE 1=1'
+            params = []
+            
+            if imsi:
+                query += ' AND imsi = ?'
+                params.append(imsi)
+            elif imsi_prefix:
+                # Range scan instead of LIKE so the UNIQUE(imsi) index is used
+                query += ' AND imsi >= ? AND imsi < ?'
+                params.extend(_prefix_range(imsi_prefix))
+            
+            if msisdn:
+                query += ' AND msisdn = ?'
+                params.append(msisdn)
+            elif msisdn_prefix:
+                query += ' AND msisdn >= ? AND msisdn < ?'
+                params.extend(_prefix_range(msisdn_prefix))
+            
+            if status and status != 'all':
+                query += ' AND status = ?'
+                params.append(status)
+            
+            if network and network != 'all':
+                query += ' AND network = ?'
+                params.append(network)
+            
+            if location:
+                query += ' AND location = ?'
+                params.append(location)
+            
+            if seen_after:
+                query += ' AND last_seen >= ?'
+                params.append(seen_after)
+            
+            if seen_before:
+                query += ' AND last_seen < ?'
+                params.append(seen_before)
+            
+            # Identifier lookups stay on their own index; everything else is newest first
+            if imsi or imsi_prefix:
+                query += ' ORDER BY imsi'
+            elif msisdn or msisdn_prefix:
+                query += ' ORDER BY msisdn'
+            else:
+                query += ' ORDER BY last_seen DESC'
+            query += ' LIMIT ? OFFSET ?'
+            params.extend([limit, offset])
+            
+            return ResultSet.from_cursor(conn.execute(query, params))
         finally:
             conn.close()
     
@@ -156,6 +535,63 @@ class BTSDatabase:
         finally:
             conn.close()
     
+    def get_subscriber_counters(self):
+        """Read materialized subscriber totals by status, network and location"""
+        conn = self.get_connection()
+        try:
+            counters = {d: {} for d in SUBSCRIBER_COUNTER_DIMENSIONS}
+            rows = conn.execute('SELECT dimension, value, count FROM subscriber_counters WHERE count != 0')
+            for dimension, value, count in rows:
+                if dimension in counters:
+                    counters[dimension][value or 'unknown'] = count
+            counters['total'] = sum(counters['status'].values())
+            return counters
+        finally:
+            conn.close()
+    
+    def get_data_version(self, name):
+        """Change counter for `name` in data_versions (moves on every write that matters), or None"""
+        conn = self.get_connection()
+        try:
+            row = conn.execute('SELECT version FROM data_versions WHERE name = ?', (name,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+    
+    def reconcile_subscriber_counters(self):
+        """Recompute subscriber counters from the base table and fix any drift.
+        
+        Returns a dict of corrected entries: {(dimension, value): (stored, actual)}.
+        """
+        conn = self.get_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            actual = {}
+            for dimension in SUBSCRIBER_COUNTER_DIMENSIONS:
+                rows = conn.execute(
+                    f"SELECT COALESCE({dimension}, ''), COUNT(*) FROM subscribers GROUP BY 1")
+                actual.update({(dimension, value): count for value, count in rows})
+            
+            stored = {(d, v): c for d, v, c in conn.execute(
+                'SELECT dimension, value, count FROM subscriber_counters')}
+            drift = {key: (stored.get(key, 0), actual.get(key, 0))
+                     for key in stored.keys() | actual.keys()
+                     if stored.get(key, 0) != actual.get(key, 0)}
+            
+            if drift:
+                conn.execute('DELETE FROM subscriber_counters')
+                conn.executemany(
+                    'INSERT INTO subscriber_counters (dimension, value, count) VALUES (?, ?, ?)',
+                    [(d, v, c) for (d, v), c in actual.items()])
+                logger.warning(f"Reconciled {len(drift)} drifted subscriber counters")
+            conn.commit()
+            return drift
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
     def update_subscriber_status(self, imsi, status):
         """Update subscriber status"""
         conn = self.get_connection()
@@ -170,6 +606,45 @@ class BTSDatabase:
         finally:
             conn.close()
     
+    # Subscriber presence
+    def save_presence(self, rows, batch_size=5000):
+        """Persist (imsi, cell_id, lac, last_seen, attached) rows and bump subscribers.last_seen"""
+        conn = self.get_connection()
+        try:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                conn.executemany('''
+                    INSERT INTO subscriber_presence (imsi, cell_id, lac, last_seen, attached)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(imsi) DO UPDATE SET
+                        cell_id = excluded.cell_id,
+                        lac = excluded.lac,
+                        last_seen = excluded.last_seen,
+                        attached = excluded.attached
+                ''', batch)
+                conn.executemany('UPDATE subscribers SET last_seen = ? WHERE imsi = ?',
+                                 [(row[3], row[0]) for row in batch])
+                conn.commit()
+            return len(rows)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def load_presence(self, since_hours=24):
+        """Load persisted presence rows seen in the last `since_hours`, oldest first"""
+        conn = self.get_connection()
+        try:
+            rows = conn.execute('''
+                SELECT * FROM subscriber_presence
+                WHERE last_seen >= datetime('now', 'localtime', ?)
+                ORDER BY last_seen
+            ''', (f'-{int(since_hours)} hours',)).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+    
     # SMS management
     def add_sms_message(self, imsi, message, direction, msisdn=None, status='sent'):
         """Add SMS message to database"""
@@ -184,24 +659,9 @@ class BTSDatabase:
         finally:
             conn.close()
     
-    def get_sms_history(self, direction=None, limit=100):
-        """Get SMS history with filtering"""
-        conn = self.get_connection()
-        try:
-            query = 'SELECT * FROM sms_messages WHERE 1=1'
-            params = []
-            
-            if direction and direction != 'all':
-                query += ' AND direction = ?'
-                params.append(direction)
-            
-            query += ' ORDER BY timestamp DESC LIMIT ?'
-            params.append(limit)
-            
-            messages = conn.execute(query, params).fetchall()
-            return [dict(msg) for msg in messages]
-        finally:
-            conn.close()
+    def get_sms_history(self, direction=None, limit=100, since=None, until=None, include_archive=False):
+        """Get SMS history with filtering (optionally including archived days)"""
+        return self._query_events('sms_messages', {'direction': direction}, limit, since, until, include_archive)
     
     def get_sms_count(self):
         """Get total SMS message count (efficient COUNT query)"""
@@ -212,44 +672,108 @@ class BTSDatabase:
         finally:
             conn.close()
     
-    # System logging
-    def log_system_event(self, level, module, message):
-        """Log system event to database"""
+    # Users
+    @staticmethod
+    def _user_dict(row):
+        user = dict(row)
+        user['permissions'] = json.loads(user['permissions'] or '[]')
+        user['is_active'] = bool(user.pop('enabled'))
+        return user
+    
+    def get_user(self, username):
+        """User row as a dict (permissions decoded, is_active), or None"""
         conn = self.get_connection()
         try:
-            conn.execute('''
-                INSERT INTO system_logs (level, module, message)
-                VALUES (?, ?, ?)
-            ''', (level, module, message))
+            row = conn.execute('''
+                SELECT username, password_hash, email, full_name, role, enabled, permissions,
+                       last_login, created_at
+                FROM users WHERE username = ?
+            ''', (username,)).fetchone()
+            return self._user_dict(row) if row else None
+        finally:
+            conn.close()
+    
+    def get_users_count(self):
+        conn = self.get_connection()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        finally:
+            conn.close()
+    
+    def add_users(self, users):
+        """Insert user dicts (username, password_hash, role, full_name, email, permissions); existing names are kept"""
+        conn = self.get_connection()
+        try:
+            conn.executemany('''
+                INSERT OR IGNORE INTO users (username, password_hash, role, full_name, email, permissions)
+                VALUES (:username, :password_hash, :role, :full_name, :email, :permissions)
+            ''', [{**user, 'permissions': json.dumps(user.get('permissions', []))} for user in users])
             conn.commit()
-        except Exception as e:
-            logger.error(f"Error logging system event: {e}")
         finally:
             conn.close()
     
-    def get_system_logs(self, level=None, module=None, limit=100):
-        """Get system logs with filtering"""
+    def update_user_password(self, username, password_hash):
         conn = self.get_connection()
         try:
-            query = 'SELECT * FROM system_logs WHERE 1=1'
-            params = []
-            
-            if level and level != 'all':
-                query += ' AND level = ?'
-                params.append(level)
-            
-            if module and module != 'all':
-                query += ' AND module = ?'
-                params.append(module)
-            
-            query += ' ORDER BY timestamp DESC LIMIT ?'
-            params.append(limit)
-            
-            logs = conn.execute(query, params).fetchall()
-            return [dict(log) for log in logs]
+            cursor = conn.execute('''
+                UPDATE users SET password_hash = ?, updated_at = CURRENT_TIMESTAMP WHERE username = ?
+            ''', (password_hash, username))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+    
+    def update_user_last_login(self, username, when):
+        conn = self.get_connection()
+        try:
+            conn.execute('UPDATE users SET last_login = ? WHERE username = ?', (when, username))
+            conn.commit()
         finally:
             conn.close()
     
+    # System logging
+    def log_system_event(self, level, module, message):
+        """Log system event to database (write-behind when buffered logging is on)"""
+        row = (level, module, message, _utc_timestamp())
+        if self.system_log_buffer is not None:
+            self.system_log_buffer.put(row)
+            return
+        try:
+            self._insert_system_logs([row])
+        except Exception as e:
+            logger.error(f"Error logging system event: {e}")
+    
+    def _insert_system_logs(self, rows):
+        """Insert (level, module, message, timestamp) rows in one transaction"""
+        conn = self.get_connection()
+        try:
+            conn.executemany('''
+                INSERT INTO system_logs (level, module, message, timestamp)
+                VALUES (?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def flush_logs(self):
+        """Write any buffered system logs and network events now"""
+        for buffer in (self.system_log_buffer, self.network_event_buffer):
+            if buffer is not None:
+                buffer.flush()
+    
+    def close(self):
+        """Stop write-behind buffers after draining them"""
+        for buffer in (self.system_log_buffer, self.network_event_buffer):
+            if buffer is not None:
+                buffer.close()
+    
+    def get_system_logs(self, level=None, module=None, limit=100, since=None, until=None, include_archive=False):
+        """Get system logs with filtering (optionally including archived days)"""
+        if self.system_log_buffer is not None:
+            self.system_log_buffer.flush()
+        return self._query_events('system_logs', {'level': level, 'module': module},
+                                  limit, since, until, include_archive)
+    
     # BTS Configuration
     def get_bts_config(self):
         """Get current BTS configuration"""
@@ -274,39 +798,172 @@ class BTSDatabase:
             conn.close()
     
     # Network events
+    def add_network_event_listener(self, listener):
+        """Register listener(event_type, imsi, cell_id, lac, details) called for every network event"""
+        if listener not in self._network_event_listeners:
+            self._network_event_listeners.append(listener)
+    
     def log_network_event(self, event_type, imsi=None, cell_id=None, lac=None, details=None):
-        """Log network event"""
+        """Log network event (write-behind when buffered logging is on)"""
+        row = (event_type, imsi, cell_id, lac, json.dumps(details) if details else None, _utc_timestamp())
+        if self.network_event_buffer is not None:
+            self.network_event_buffer.put(row)
+        else:
+            self._insert_network_events([row])
+        
+        for listener in self._network_event_listeners:
+            try:
+                listener(event_type, imsi, cell_id, lac, details)
+            except Exception as e:
+                logger.error(f"Network event listener error: {e}")
+    
+    def _insert_network_events(self, rows):
+        """Insert (event_type, imsi, cell_id, lac, details, timestamp) rows in one transaction"""
         conn = self.get_connection()
         try:
-            conn.execute('''
-                INSERT INTO network_events (event_type, imsi, cell_id, lac, details)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (event_type, imsi, cell_id, lac, json.dumps(details) if details else None))
+            conn.executemany('''
+                INSERT INTO network_events (event_type, imsi, cell_id, lac, details, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
             conn.commit()
         finally:
             conn.close()
     
-    def get_network_events(self, event_type=None, limit=100):
-        """Get network events with filtering"""
+    def get_network_events(self, event_type=None, limit=100, since=None, until=None, include_archive=False):
+        """Get network events with filtering (optionally including archived days)"""
+        if self.network_event_buffer is not None:
+            self.network_event_buffer.flush()
+        return self._query_events('network_events', {'event_type': event_type},
+                                  limit, since, until, include_archive)
+    
+    def query_network_events(self, since=None, until=None, imsi=None, cell_id=None, event_type=None,
+                             before=None, limit=100):
+        """Newest-first network events with keyset pagination.
+        
+        `before` is the (timestamp, id) of the last row of the previous page.
+        """
+        if self.network_event_buffer is not None:
+            self.network_event_buffer.flush()
         conn = self.get_connection()
         try:
             query = 'SELECT * FROM network_events WHERE 1=1'
             params = []
             
-            if event_type and event_type != 'all':
-                query += ' AND event_type = ?'
-                params.append(event_type)
+            for column, value in (('imsi', imsi), ('cell_id', cell_id), ('event_type', event_type)):
+                if value:
+                    query += f' AND {column} = ?'
+                    params.append(value)
+            
+            if since:
+                query += ' AND timestamp >= ?'
+                params.append(str(since))
+            
+            if until:
+                query += ' AND timestamp < ?'
+                params.append(str(until))
+            
+            if before:
+                query += ' AND (timestamp < ? OR (timestamp = ? AND id < ?))'
+                params.extend([before[0], before[0], before[1]])
+            
+            query += ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+            params.append(limit)
+            
+            return ResultSet.from_cursor(conn.execute(query, params))
+        finally:
+            conn.close()
+    
+    def aggregate_network_events(self, bucket_chars, key_column, since, until, event_types=None):
+        """Count network events grouped by time bucket and one key column.
+        
+        bucket_chars is the timestamp prefix length defining the bucket
+        (16 = minute, 13 = hour). Returns {bucket: {key: count}}.
+        """
+        if self.network_event_buffer is not None:
+            self.network_event_buffer.flush()
+        conn = self.get_connection()
+        try:
+            query = (f'SELECT substr(timestamp, 1, {int(bucket_chars)}) AS bucket, {key_column}, COUNT(*) '
+                     'FROM network_events WHERE timestamp >= ? AND timestamp < ?')
+            params = [str(since), str(until)]
+            if event_types:
+                query += f" AND event_type IN ({', '.join('?' * len(event_types))})"
+                params.extend(event_types)
+            query += f' GROUP BY bucket, {key_column}'
+            
+            result = {}
+            for bucket, key, count in conn.execute(query, params):
+                result.setdefault(bucket, {})[key] = count
+            return result
+        finally:
+            conn.close()
+    
+    # Event tables: shared query path and retention rollups
+    def _query_events(self, table, filters, limit, since=None, until=None, include_archive=False):
+        """Newest-first rows of an event table, merged with the archive when asked"""
+        conn = self.get_connection()
+        try:
+            query = f'SELECT * FROM {table} WHERE 1=1'
+            params = []
+            
+            for column, value in filters.items():
+                if value and value != 'all':
+                    query += f' AND {column} = ?'
+                    params.append(value)
+            
+            if since:
+                query += ' AND timestamp >= ?'
+                params.append(str(since))
+            
+            if until:
+                query += ' AND timestamp < ?'
+                params.append(str(until))
             
             query += ' ORDER BY timestamp DESC LIMIT ?'
             params.append(limit)
             
-            events = conn.execute(query, params).fetchall()
-            return [dict(event) for event in events]
+            rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+        finally:
+            conn.close()
+        
+        if include_archive and len(rows) < limit:
+            from modules.retention import read_archive
+            # Rows of a retention batch whose delete failed are both live and archived
+            live_ids = {row['id'] for row in rows}
+            archived = read_archive(self, table, since, until, filters, limit)
+            rows.extend(row for row in archived if row.get('id') not in live_ids)
+            rows.sort(key=lambda row: str(row['timestamp']), reverse=True)
+            del rows[limit:]
+        return rows
+    
+    def get_event_rollups(self, table, since=None, until=None):
+        """Hourly counts for rows the retention job has rolled up"""
+        conn = self.get_connection()
+        try:
+            query = 'SELECT bucket, dimensions, count FROM event_rollups_hourly WHERE table_name = ?'
+            params = [table]
+            if since:
+                query += ' AND bucket >= ?'
+                params.append(str(since))
+            if until:
+                query += ' AND bucket < ?'
+                params.append(str(until))
+            query += ' ORDER BY bucket'
+            return [{'bucket': bucket, 'dimensions': json.loads(dims), 'count': count}
+                    for bucket, dims, count in conn.execute(query, params)]
         finally:
             conn.close()
 
 # Global database instance
-db = BTSDatabase()
+db = BTSDatabase(
+    defer_schema=Config.STARTUP_MODE != 'eager',
+    buffered_logging=Config.LOG_BUFFER_ENABLED,
+    log_buffer_options={
+        'max_batch': Config.LOG_BUFFER_BATCH,
+        'flush_interval': Config.LOG_BUFFER_FLUSH_INTERVAL,
+        'max_pending': Config.LOG_BUFFER_MAX_PENDING,
+    }
+)
 
 # Convenience functions for backward compatibility & new API
 def init_db():
@@ -326,11 +983,30 @@ def get_subscribers(limit=100, offset=0):
     conn = db.get_connection()
     try:
         query = 'SELECT * FROM subscribers ORDER BY last_seen DESC LIMIT ? OFFSET ?'
-        rows = conn.execute(query, (limit, offset)).fetchall()
-        return [dict(row) for row in rows]
+        return ResultSet.from_cursor(conn.execute(query, (limit, offset)))
     finally:
         conn.close()
 
+def search_subscribers(**filters):
+    """Search subscribers by IMSI/MSISDN (exact or prefix) and attribute filters"""
+    return db.search_subscribers(**filters)
+
+def upsert_subscribers(rows, chunk_size=5000):
+    """Bulk insert/update subscribers"""
+    return db.upsert_subscribers(rows, chunk_size=chunk_size)
+
+def get_subscriber_counters():
+    """Get materialized subscriber totals"""
+    return db.get_subscriber_counters()
+
+def get_data_version(name):
+    """Get the change counter of a versioned table"""
+    return db.get_data_version(name)
+
+def reconcile_subscriber_counters():
+    """Fix drift between subscriber counters and the subscribers table"""
+    return db.reconcile_subscriber_counters()
+
 def save_sms(sender, receiver, message, sms_type, status='sent'):
     """Save single SMS message"""
     return db.add_sms_message(sender, receiver, message, 'sent', sms_type)
@@ -353,14 +1029,22 @@ def save_sms_batch(sms_list):
     finally:
         conn.close()
 
-def get_sms_history(limit=50, offset=0):
+def get_sms_count():
+    """Get total number of SMS messages"""
+    return db.get_sms_count()
+
+def get_sms_history(limit=50, offset=0, since=None, until=None, include_archive=False):
     """Get SMS history with pagination"""
-    return db.get_sms_history(limit=limit)
+    return db.get_sms_history(limit=limit, since=since, until=until, include_archive=include_archive)
 
 def log_system_event(level, module, message):
     """Log system event"""
     db.log_system_event(level, module, message)
 
+def log_network_event(event_type, imsi=None, cell_id=None, lac=None, details=None):
+    """Log network event"""
+    db.log_network_event(event_type, imsi, cell_id, lac, details)
+
 def get_bts_config():
     """Get BTS configuration"""
     return db.get_bts_config()
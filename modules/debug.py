@@ -0,0 +1,78 @@
+"""
+Debug endpoints for SIBERINDO BTS GUI
+Administrator-only runtime diagnostics: the SQL query profiler report and its
+switches, and on-demand sampling profiles of request threads
+"""
+
+import logging
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify
+from modules.auth import role_required
+from modules.query_profiler import query_profiler
+from modules.sampling_profiler import sampling_profiler, collapsed, flamegraph_svg, routes_summary
+
+logger = logging.getLogger(__name__)
+debug_bp = Blueprint('debug', __name__)
+
+
+@debug_bp.route('/queries', methods=['GET'])
+@role_required(['administrator'])
+def query_report():
+    """Statements aggregated by fingerprint, plus the recent slow-query log"""
+    try:
+        report = query_profiler.report(sort=request.args.get('sort', 'total'),
+                                       limit=max(1, min(request.args.get('limit', 50, type=int), 1000)))
+        return jsonify({'success': True, **report, 'timestamp': datetime.now().strftime('%H:%M:%S')})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error building query report")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@debug_bp.route('/queries', methods=['POST'])
+@role_required(['administrator'])
+def configure_query_profiler():
+    """Switch profiling on/off, change the slow threshold or reset the counters"""
+    try:
+        data = request.get_json(silent=True) or {}
+        query_profiler.configure(enabled=data.get('enabled'), slow_ms=data.get('slow_ms'),
+                                 explain=data.get('explain'))
+        if data.get('reset'):
+            query_profiler.reset()
+        logger.info(f"Query profiler: enabled={query_profiler.enabled}, slow_ms={query_profiler.slow_ms}")
+        return jsonify({'success': True, 'enabled': query_profiler.enabled, 'slow_ms': query_profiler.slow_ms,
+                        'explain': query_profiler.explain, 'timestamp': datetime.now().strftime('%H:%M:%S')})
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@debug_bp.route('/profile', methods=['GET'])
+@role_required(['administrator'])
+def profile():
+    """Sample request threads for N seconds; returns a flame graph SVG, collapsed stacks or JSON"""
+    output = request.args.get('format', 'svg')
+    if output not in ('svg', 'collapsed', 'json'):
+        return jsonify({'success': False, 'message': f"Unknown format: {output}"}), 400
+    try:
+        stacks, info = sampling_profiler.capture(
+            seconds=request.args.get('seconds', 5, type=float),
+            interval=request.args.get('interval_ms', 5, type=float) / 1000,
+            route=request.args.get('route') or None,
+            all_threads=request.args.get('threads') == 'all')
+    except RuntimeError as e:
+        return jsonify({'success': False, 'message': str(e)}), 409
+    except Exception as e:
+        logger.exception("Error capturing profile")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+    logger.info(f"Captured profile: {info}")
+    if output == 'collapsed':
+        return Response(collapsed(stacks), mimetype='text/plain')
+    if output == 'json':
+        return jsonify({'success': True, **info, 'routes': routes_summary(stacks),
+                        'stacks': dict(stacks.most_common()),
+                        'timestamp': datetime.now().strftime('%H:%M:%S')})
+    title = (f"{info['route'] or 'all request threads'}: {info['samples']} samples "
+             f"over {info['seconds']}s every {info['interval_ms']}ms")
+    return Response(flamegraph_svg(stacks, title=title), mimetype='image/svg+xml')
@@ -2,9 +2,9 @@ import subprocess
 import logging
 import re
 import json
-import threading
 import time
 from datetime import datetime
+from modules.middleware import spawn_thread
 
 logger = logging.getLogger(__name__)
 
@@ -196,7 +196,7 @@ class HackRFManager:
                     break
                 if line:
                     output_lines.append(line.strip())
-                    logger.debug(f"kalibrate output: {line.strip()}")
+                    logger.debug("kalibrate output: %s", output_lines[-1])
                     
                     # Parse kalibrate output
                     bts_data = self._parse_kalibrate_output(line)
@@ -380,9 +380,8 @@ class HackRFManager:
                     self.scan_progress = 0
                     self.current_operation = f"Scan error: {str(e)}"
             
-            self.scan_thread = threading.Thread(target=scan_thread)
-            self.scan_thread.daemon = True
-            self.scan_thread.start()
+            # Inherits the request context, so the scan's log lines carry the starting request's id
+            self.scan_thread = spawn_thread(scan_thread, name=f'scan-{band}')
             
             return True, f"Started {band} band scan. Please wait..."
             
@@ -448,4 +447,8 @@ class HackRFManager:
             'real_bts_found': total_bts,
             'simulated_bts_found': simulated_bts,
             'strongest_signal': max([r['signal'] for r in self.scan_results]) if self.scan_results else -100
-        }
\ No newline at end of file
+        }
+
+
+# Single scan engine per deployment; in multi-process mode only the owner process drives it
+scan_engine = HackRFManager()
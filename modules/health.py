@@ -0,0 +1,220 @@
+"""
+Health probes for SIBERINDO BTS GUI
+Liveness and readiness endpoints built from cached, cheap subsystem checks;
+probes never run psutil scans, hackrf_info or schema work themselves
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from flask import Blueprint, jsonify
+
+logger = logging.getLogger(__name__)
+health_bp = Blueprint('health', __name__)
+
+OK = 'ok'
+DEGRADED = 'degraded'
+FAIL = 'fail'
+
+
+class HealthCheck:
+    """One named check whose result is reused for `ttl` seconds"""
+
+    __slots__ = ('name', 'func', 'ttl', 'readiness', 'result', 'checked_at', 'lock')
+
+    def __init__(self, name, func, ttl, readiness):
+        self.name = name
+        self.func = func
+        self.ttl = ttl
+        self.readiness = readiness
+        self.result = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+class HealthMonitor:
+    """Registry of subsystem checks behind /livez and /readyz.
+
+    Each check returns a dict with a 'status' of ok, degraded or fail plus
+    whatever details it wants to show. Results are cached for the check's ttl
+    and only one thread recomputes an expired result; concurrent probes get the
+    previous one. Checks registered with readiness=True turn /readyz false when
+    they fail; the others are reported only.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._checks = {}
+        self._liveness = {}
+
+    def register(self, name, func, ttl=2.0, readiness=True):
+        self._checks[name] = HealthCheck(name, func, ttl, readiness)
+
+    def register_liveness(self, name, func):
+        """func() -> bool, evaluated on every /livez; must be trivially cheap"""
+        self._liveness[name] = func
+
+    def check(self, name):
+        check = self._checks[name]
+        now = time.monotonic()
+        if check.result is not None and now - check.checked_at < check.ttl:
+            return check.result
+        if not check.lock.acquire(blocking=check.result is None):
+            return check.result
+        try:
+            if check.result is None or time.monotonic() - check.checked_at >= check.ttl:
+                try:
+                    result = dict(check.func())
+                except Exception as e:
+                    logger.exception(f"Health check {name} failed")
+                    result = {'status': FAIL, 'error': str(e)}
+                result['checked_at'] = datetime.now().isoformat()
+                check.result = result
+                check.checked_at = time.monotonic()
+            return check.result
+        finally:
+            check.lock.release()
+
+    def readiness(self):
+        """(ready, {name: result}) over every registered check"""
+        results = {name: self.check(name) for name in self._checks}
+        ready = all(results[name]['status'] != FAIL
+                    for name, check in self._checks.items() if check.readiness)
+        return ready, results
+
+    def liveness(self):
+        """Names of the liveness checks that are currently failing"""
+        failed = []
+        for name, func in self._liveness.items():
+            try:
+                if not func():
+                    failed.append(name)
+            except Exception:
+                logger.exception(f"Liveness check {name} failed")
+                failed.append(name)
+        return failed
+
+    def uptime(self):
+        return round(time.time() - self.started_at, 3)
+
+
+class InFlightCounter:
+    """Requests currently inside the application, maintained by request hooks"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self._value += 1
+
+    def exit(self):
+        with self._lock:
+            self._value -= 1
+
+    @property
+    def value(self):
+        return self._value
+
+
+def database_check(database):
+    """A fresh connection answers SELECT 1; degraded until the schema has been checked"""
+    started = time.perf_counter()
+    schema_ready = database.ping()
+    return {'status': OK if schema_ready else DEGRADED,
+            'schema_ready': schema_ready,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+def queue_check(buffers, high_water=0.8):
+    """Fail when any write-behind buffer is at least `high_water` full"""
+    queues = {buffer.name: buffer.stats() for buffer in buffers if buffer is not None}
+    status = OK
+    for stats in queues.values():
+        fill = stats['pending'] / stats['max_pending'] if stats['max_pending'] else 0
+        stats['fill'] = round(fill, 3)
+        if fill >= high_water:
+            status = FAIL
+        elif stats['last_error'] and status == OK:
+            status = DEGRADED
+    return {'status': status, 'high_water': high_water, 'queues': queues}
+
+
+def requests_check(counter, capacity):
+    """Fail when every worker thread but the one answering this probe is busy"""
+    busy = max(counter.value - 1, 0)
+    saturated = capacity > 0 and busy >= capacity - 1
+    return {'status': FAIL if saturated else OK, 'in_flight': busy, 'capacity': capacity}
+
+
+def sampler_check(coordinator, key='system_stats'):
+    """Age of the owner's last published sample; fails once it is older than the stale limit"""
+    status = coordinator.status()
+    age = coordinator.state_age(key)
+    if age is None:
+        result = DEGRADED
+    elif age > coordinator.stale_after:
+        result = FAIL
+    else:
+        result = OK
+    return {'status': result,
+            'role': status['role'],
+            'owner_pid': status['owner_pid'],
+            'sample_age': round(age, 3) if age is not None else None,
+            'snapshot_age': status['snapshot_age']}
+
+
+def scan_engine_check(coordinator):
+    """Scan engine state as last published by the owner"""
+    state = coordinator.get_state('scan')
+    if state is None:
+        return {'status': DEGRADED, 'message': 'No scan state published yet'}
+    scan = state.get('status') or {}
+    return {'status': OK,
+            'is_scanning': scan.get('is_scanning', False),
+            'results_count': scan.get('results_count', 0),
+            'state_age': round(coordinator.state_age('scan') or 0, 3)}
+
+
+def startup_check(startup):
+    """Ready once the startup sequence has finished"""
+    status = startup.status()
+    return {'status': OK if status['complete'] else FAIL,
+            'mode': status['mode'],
+            'errors': status['errors']}
+
+
+# Global monitor and request counter, wired up in app.py
+health_monitor = HealthMonitor()
+in_flight = InFlightCounter()
+
+
+@health_bp.route('/livez')
+def livez():
+    """Liveness: the process answers and its core threads are running"""
+    failed = health_monitor.liveness()
+    body = {'status': FAIL if failed else OK,
+            'failed': failed,
+            'pid': os.getpid(),
+            'uptime': health_monitor.uptime(),
+            'timestamp': datetime.now().isoformat()}
+    return jsonify(body), 503 if failed else 200
+
+
+@health_bp.route('/readyz')
+def readyz():
+    """Readiness: every gating subsystem check is passing"""
+    ready, checks = health_monitor.readiness()
+    body = {'status': OK if ready else FAIL,
+            'ready': ready,
+            'checks': checks,
+            'pid': os.getpid(),
+            'timestamp': datetime.now().isoformat()}
+    response = jsonify(body)
+    response.headers['Cache-Control'] = 'no-store'
+    if not ready:
+        response.headers['Retry-After'] = '5'
+    return response, 200 if ready else 503
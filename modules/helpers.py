@@ -1,11 +1,16 @@
 from functools import wraps
-from flask import session, redirect, url_for
+from flask import session, redirect, url_for, jsonify
 
 
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not session.get('logged_in'):
-            return redirect(url_for('auth.login'))
+            # API clients authenticate statelessly with a Bearer token
+            from modules.auth import authenticate_bearer, bearer_token
+            if not authenticate_bearer():
+                if bearer_token() is not None:
+                    return jsonify({'success': False, 'message': 'Invalid or expired token'}), 401
+                return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return decorated_function
@@ -0,0 +1,65 @@
+"""
+HTTP conditional requests for SIBERINDO BTS GUI
+Polled endpoints tag responses with a weak ETag built from the version of the
+data behind them, so an unchanged poll is answered 304 before any query runs
+or any JSON is encoded
+"""
+
+import hashlib
+import logging
+from functools import wraps
+from flask import current_app, make_response, request
+from modules.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+def make_etag(version):
+    """Weak validator for this path + query string at `version`"""
+    raw = repr((request.path, request.query_string, version)).encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=10).hexdigest()
+
+
+def _tag(response, etag, micro_cache):
+    response.set_etag(etag, weak=True)
+    # Browsers revalidate every poll; nginx may serve the response for `micro_cache` seconds
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if micro_cache:
+        response.headers['X-Accel-Expires'] = str(micro_cache)
+    return response
+
+
+def conditional(version):
+    """Decorator: ETag from version() and 304 for clients that already have it.
+
+    version() returns a tuple of content versions for the data the response
+    is built from (change counters, digests of published state) that move
+    only when that data changes, or None when any of it is unknown. No
+    Last-Modified is sent: versions are not times, and If-Modified-Since is
+    too coarse for data that changes within a second. Apply it after the
+    access decorators so a 304 is only ever sent to allowed clients.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            micro_cache = current_app.config.get('HTTP_MICROCACHE_SECONDS', 1)
+            current = version()
+            if current is None:
+                return f(*args, **kwargs)
+            etag = make_etag(current)
+            if request.if_none_match.contains_weak(etag):
+                not_modified_responses.inc((request.endpoint,))
+                return _tag(current_app.response_class(status=304), etag, micro_cache)
+
+            # Tag with the version read before rendering: if the data changes meanwhile,
+            # the next poll gets a 200 again instead of keeping a stale body under a newer tag
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                _tag(response, etag, micro_cache)
+            return response
+        return decorated
+    return decorator
+
+
+not_modified_responses = registry.counter('http_not_modified_total', 'Polls answered 304 Not Modified',
+                                          ('endpoint',))
@@ -0,0 +1,144 @@
+"""
+JSON responses for SIBERINDO BTS GUI
+Flask JSON provider that encodes with orjson when it is installed (stdlib json
+otherwise) and serves pre-encoded fragments of rarely changing state as-is
+"""
+
+import json
+import logging
+import threading
+
+from flask.json.provider import DefaultJSONProvider
+
+from modules.metrics import cache_requests
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class RawJSON:
+    """Already-encoded JSON value; as a top-level value of a response dict it is spliced in unchanged"""
+
+    __slots__ = ('encoded',)
+
+    def __init__(self, encoded):
+        self.encoded = encoded
+
+    def __repr__(self):
+        return f"RawJSON({self.encoded[:40]!r}...)"
+
+
+def _fallback(o):
+    """Types neither encoder handles natively: record tuples, then Flask's own (dates, dataclasses, ...)"""
+    if isinstance(o, tuple):
+        return list(o)
+    if isinstance(o, RawJSON):
+        return json.loads(o.encoded)
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with an orjson fast path and RawJSON splicing.
+
+    Output matches the stdlib provider except that non-ASCII text is sent as
+    UTF-8 instead of \\u escapes and NaN/Infinity become null. Values orjson
+    rejects (e.g. integers beyond 64 bits) fall back to the stdlib encoder.
+    """
+
+    def __init__(self, app, encoder='auto'):
+        super().__init__(app)
+        self.sort_keys = app.config.get('JSON_SORT_KEYS', self.sort_keys)
+        if encoder == 'orjson' and orjson is None:
+            logger.warning("JSON_ENCODER=orjson but orjson is not installed; using the stdlib encoder")
+        self.use_orjson = orjson is not None and encoder != 'stdlib'
+        self.encoder = 'orjson' if self.use_orjson else 'stdlib'
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, indent=False):
+        """UTF-8 JSON for obj"""
+        if self.use_orjson:
+            try:
+                return orjson.dumps(obj, default=_fallback, option=self._options(indent))
+            except TypeError:
+                pass
+        separators = None if indent else (',', ':')
+        return json.dumps(obj, default=_fallback, sort_keys=self.sort_keys, ensure_ascii=False,
+                          indent=2 if indent else None, separators=separators).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
+        kwargs.setdefault('default', _fallback)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.encode_response(obj, indent) + b'\n', mimetype=self.mimetype)
+
+    def encode_response(self, obj, indent=False):
+        """Response body bytes; RawJSON at the top level or as top-level dict values is not re-encoded"""
+        if isinstance(obj, RawJSON):
+            return obj.encoded
+        if not indent and isinstance(obj, dict) and any(type(value) is RawJSON for value in obj.values()):
+            parts = []
+            for key, value in obj.items():
+                encoded = value.encoded if type(value) is RawJSON else self.dumps_bytes(value)
+                parts.append(self.dumps_bytes(str(key)) + b':' + encoded)
+            return b'{' + b','.join(parts) + b'}'
+        return self.dumps_bytes(obj, indent)
+
+
+class EncodedCache:
+    """Encoded JSON of rarely changing values, keyed by name.
+
+    A value is re-encoded only when a different object is passed for its key
+    (owner-published state and cached lookups hand out the same object until
+    they resample), so it must not be mutated in place after being cached.
+    """
+
+    def __init__(self, provider=None):
+        self.provider = provider
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, value):
+        """RawJSON for value"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is value:
+            cache_requests.inc(('json', 'hit'))
+            return entry[1]
+        cache_requests.inc(('json', 'miss'))
+        provider = self.provider
+        if provider is None:
+            from flask import current_app
+            provider = current_app.json
+        encoded = RawJSON(provider.dumps_bytes(value) if isinstance(provider, FastJSONProvider)
+                          else provider.dumps(value).encode('utf-8'))
+        with self._lock:
+            self._entries[key] = (value, encoded)
+        return encoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Global cache of pre-encoded dashboard and scanner state
+encoded_cache = EncodedCache()
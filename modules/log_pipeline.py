@@ -0,0 +1,227 @@
+"""
+Logging pipeline for SIBERINDO BTS GUI
+Request and scan threads only enqueue records; one listener thread filters
+duplicates, formats (text or JSON) and writes to rotating files and the console
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from datetime import datetime
+
+from modules.middleware import RequestIdFilter
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full.
+
+    The record is reduced to plain data on the calling thread: the message is
+    interpolated and any traceback rendered to text, so the listener never
+    touches objects the caller may still be mutating.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DuplicateFilter:
+    """Let at most `burst` identical records through per `window` seconds.
+
+    Records are identical when they have the same logger, level and rendered
+    message, so distinct messages from one call site (per-request access lines,
+    per-client warnings) are never capped together. When a suppressed key's
+    window ends, the next record for it is annotated with how many were
+    dropped. Runs on the listener thread only, so needs no lock.
+    """
+
+    def __init__(self, window=60.0, burst=5, max_keys=10000):
+        self.window = window
+        self.burst = burst
+        self.max_keys = max_keys
+        self._seen = {}
+        self.suppressed = 0
+
+    def filter(self, record):
+        if self.window <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        entry = self._seen.get(key)
+        if entry is None or now - entry[0] >= self.window:
+            if entry is not None and entry[2]:
+                record.msg = f"{record.msg} (suppressed {entry[2]} identical messages in the last {self.window:g}s)"
+                record.message = record.msg
+            if len(self._seen) >= self.max_keys:
+                self._seen.clear()
+            self._seen[key] = [now, 1, 0]
+            return True
+        entry[1] += 1
+        if entry[1] <= self.burst:
+            return True
+        entry[2] += 1
+        self.suppressed += 1
+        return False
+
+
+class FilteringQueueListener(logging.handlers.QueueListener):
+    """QueueListener that applies a DuplicateFilter once, before fanning out to handlers"""
+
+    def __init__(self, log_queue, *handlers, duplicate_filter=None):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.duplicate_filter = duplicate_filter
+
+    def handle(self, record):
+        if self.duplicate_filter is not None and not self.duplicate_filter.filter(record):
+            return
+        super().handle(record)
+
+
+class SizedTimedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Numbered rotation (file.1 ... file.N) when the file exceeds max_bytes or every `interval` seconds"""
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=10, interval=86400, encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True)
+        self.interval = interval
+        self.rollover_at = self._next_rollover(time.time())
+
+    def _next_rollover(self, now):
+        if not self.interval:
+            return float('inf')
+        if self.interval == 86400:
+            # Daily rotation happens at local midnight
+            midnight = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+            return midnight.timestamp() + 86400
+        return now + self.interval
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover(time.time())
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'process': record.process,
+            'thread': record.threadName
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        elif record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LogPipeline:
+    """Root-logger setup: producer-side queue handler plus the listener thread that does the I/O"""
+
+    def __init__(self, handlers, queue_size=10000, duplicate_filter=None):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.queue_handler = NonBlockingQueueHandler(self.queue)
+        # The request id lives in the producer's context, so it must be captured before enqueueing
+        self.queue_handler.addFilter(RequestIdFilter())
+        self.handlers = handlers
+        self.listener = FilteringQueueListener(self.queue, *handlers, duplicate_filter=duplicate_filter)
+        self._started = False
+
+    def start(self, level=logging.INFO, logger=None):
+        """Route `logger` (the root logger by default) through the queue and start the listener"""
+        self.logger = logger or logging.getLogger()
+        for handler in list(self.logger.handlers):
+            if isinstance(handler, NonBlockingQueueHandler):
+                self.logger.removeHandler(handler)
+        self.logger.addHandler(self.queue_handler)
+        self.logger.setLevel(level)
+        self.listener.start()
+        self._started = True
+        return self
+
+    def stop(self):
+        """Drain the queue and close the handlers"""
+        if not self._started:
+            return
+        self._started = False
+        self.logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+    def stats(self):
+        duplicate_filter = self.listener.duplicate_filter
+        return {
+            'queued': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'dropped': self.queue_handler.dropped,
+            'suppressed': duplicate_filter.suppressed if duplicate_filter else 0
+        }
+
+
+def per_process_log_file(path):
+    """`path` with a {pid} placeholder before its extension (logs/bts.log -> logs/bts_{pid}.log)"""
+    if not path or '{pid}' in path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{{pid}}{ext}"
+
+
+def setup_logging(config):
+    """Build and start the pipeline from app config; returns the LogPipeline"""
+    formatter = JsonFormatter() if config.get('LOG_FORMAT', 'text') == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    log_file = config.get('LOG_FILE', 'logs/bts_system.log')
+    if log_file:
+        log_file = log_file.replace('{pid}', str(os.getpid()))
+        handlers.append(SizedTimedRotatingFileHandler(
+            log_file,
+            max_bytes=config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backup_count=config.get('LOG_BACKUP_COUNT', 10),
+            interval=config.get('LOG_ROTATE_INTERVAL', 86400)))
+    handlers.append(logging.StreamHandler(sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    pipeline = LogPipeline(
+        handlers,
+        queue_size=config.get('LOG_QUEUE_SIZE', 10000),
+        duplicate_filter=DuplicateFilter(window=config.get('LOG_DUPLICATE_WINDOW', 60),
+                                         burst=config.get('LOG_DUPLICATE_BURST', 5)))
+    level = getattr(logging, str(config.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO)
+    pipeline.start(level)
+    # Registered first so it runs last: shutdown hooks registered later still get logged
+    atexit.register(pipeline.stop)
+    return pipeline
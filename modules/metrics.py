@@ -0,0 +1,236 @@
+"""
+Metrics for SIBERINDO BTS GUI
+Lock-free counters, gauges and histograms rendered in Prometheus text format at /metrics
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from threading import get_ident
+from flask import Blueprint, Response
+
+logger = logging.getLogger(__name__)
+metrics_bp = Blueprint('metrics', __name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Per-thread shards of {label values: value}.
+
+    Each thread only ever writes its own shard, so updates need no lock: the
+    shard for a thread id is created once under a lock and reused by any later
+    thread that gets the same id (the previous owner has exited by then). A
+    scrape sums all shards; it may miss an update in flight, never double-count.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = {}
+        self._shards_lock = threading.Lock()
+
+    def _new_shard(self):
+        with self._shards_lock:
+            return self._shards.setdefault(get_ident(), {})
+
+    def samples(self):
+        """[(suffix, label values, extra labels, value)] for rendering"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, values, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} '
+                         f'{_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        shard = self._shards.get(get_ident()) or self._new_shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return sum(shard.get(labels, 0) for shard in list(self._shards.values()))
+
+    def values(self):
+        """{label values: total} summed over all threads"""
+        return self._merged()
+
+    def _merged(self):
+        totals = {}
+        for shard in list(self._shards.values()):
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self):
+        return [('_total' if not self.name.endswith('_total') else '', labels, (), value)
+                for labels, value in sorted(self._merged().items())]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; a shard cell is [count per bucket..., count above, sum]"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, labels=()):
+        shard = self._shards.get(get_ident()) or self._new_shard()
+        cells = shard.get(labels)
+        if cells is None:
+            cells = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        cells[bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    def _merged(self):
+        totals = {}
+        for shard in list(self._shards.values()):
+            for labels, cells in list(shard.items()):
+                merged = totals.get(labels)
+                if merged is None:
+                    totals[labels] = list(cells)
+                else:
+                    for i, value in enumerate(cells):
+                        merged[i] += value
+        return totals
+
+    def count(self, labels=()):
+        cells = self._merged().get(labels)
+        return sum(cells[:-1]) if cells else 0
+
+    def samples(self):
+        samples = []
+        for labels, cells in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), cells[:-1]):
+                cumulative += count
+                samples.append(('_bucket', labels, (('le', _format_value(float(bound))),), cumulative))
+            samples.append(('_sum', labels, (), round(cells[-1], 9)))
+            samples.append(('_count', labels, (), cumulative))
+        return samples
+
+
+class Gauge(_Metric):
+    """Value computed at scrape time by `func`: a number, or {label values: number}"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, func, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+
+    def samples(self):
+        value = self.func()
+        if not isinstance(value, dict):
+            return [('', (), (), value)]
+        return [('', labels if isinstance(labels, tuple) else (labels,), (), v)
+                for labels, v in sorted(value.items(), key=lambda item: str(item[0]))]
+
+
+class MetricsRegistry:
+    """Named metrics of one process, rendered together for a scrape"""
+
+    def __init__(self, prefix='bts_'):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, func, labelnames=()):
+        return self._add(Gauge(self.prefix + name, documentation, func, labelnames))
+
+    def render(self):
+        blocks = []
+        for metric in list(self._metrics.values()):
+            try:
+                blocks.append(metric.render())
+            except Exception:
+                logger.exception(f"Error rendering metric {metric.name}")
+        return '\n'.join(blocks) + '\n'
+
+
+# Global registry shared by all modules
+registry = MetricsRegistry()
+
+# Request counts per status are this histogram's _count series: one update per request
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint and status code', ('endpoint', 'method', 'status'))
+db_query_duration = registry.histogram(
+    'db_query_duration_seconds', 'SQLite statement execute time by statement kind', ('kind',), QUERY_BUCKETS)
+cache_requests = registry.counter(
+    'cache_requests_total', 'Cache lookups by cache and result (hit/miss)', ('cache', 'result'))
+
+_process_start = time.time()
+registry.gauge('process_start_time_seconds', 'Unix time this process started', lambda: _process_start)
+
+
+def observe_request(endpoint, method, status, duration):
+    """Record one finished request (called from the after_request hook)"""
+    http_request_duration.observe(duration, (endpoint, method, status))
+
+
+def cache_hit_ratios():
+    """{cache: hits / lookups} for every function cache seen so far"""
+    lookups = {}
+    for (cache, result), value in cache_requests.values().items():
+        hits, total = lookups.get(cache, (0, 0))
+        lookups[cache] = (hits + (value if result == 'hit' else 0), total + value)
+    return {cache: round(hits / total, 4) for cache, (hits, total) in lookups.items() if total}
+
+
+registry.gauge('cache_hit_ratio', 'Hits over lookups since start, per cache', cache_hit_ratios, ('cache',))
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this process's metrics"""
+    response = Response(registry.render(), mimetype='text/plain')
+    response.headers['Content-Type'] = CONTENT_TYPE
+    response.headers['X-Metrics-Pid'] = str(os.getpid())
+    return response
@@ -1,7 +1,12 @@
 """API middleware dan utilities"""
 from flask import request, jsonify
+from contextlib import contextmanager
 from functools import wraps
+import contextvars
 import logging
+import os
+import re
+import threading
 import time
 from datetime import datetime
 
@@ -120,8 +125,8 @@ def require_content_type(content_type):
 class RequestContext:
     """Context for tracking request metadata"""
     
-    def __init__(self):
-        self.request_id = None
+    def __init__(self, request_id=None):
+        self.request_id = request_id or new_request_id()
         self.user_id = None
         self.start_time = None
         self.data = {}
@@ -141,31 +146,81 @@ class RequestContext:
     def get_duration(self):
         """Get request duration"""
         if self.start_time:
-            return time.time() - self.start_time
+            return time.perf_counter() - self.start_time
         return None
 
 
-# Thread-local context
-_request_context = None
+# Per-request (and per-task) context: every thread and every copied context sees its own value
+_request_context = contextvars.ContextVar('request_context', default=None)
+
+# Accepted incoming X-Request-ID values (e.g. nginx $request_id)
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+def new_request_id():
+    """Random 16-hex-digit request id"""
+    return os.urandom(8).hex()
+
 
 def get_request_context():
     """Get current request context"""
-    global _request_context
-    return _request_context
+    return _request_context.get()
 
 def set_request_context(context):
-    """Set request context"""
-    global _request_context
-    _request_context = context
+    """Set request context; returns a token for reset_request_context"""
+    return _request_context.set(context)
+
+def reset_request_context(token):
+    """Restore the context that was current before set_request_context"""
+    _request_context.reset(token)
+
+
+def get_request_id():
+    """Request id of the current context, or None outside a request"""
+    context = _request_context.get()
+    return context.request_id if context is not None else None
 
 
-def init_request_context():
+def init_request_context(request_id=None):
     """Initialize request context before request"""
-    context = RequestContext()
-    context.start_time = time.time()
+    if request_id is None or not _REQUEST_ID_PATTERN.match(request_id):
+        request_id = None
+    context = RequestContext(request_id)
+    context.start_time = time.perf_counter()
     set_request_context(context)
+    return context
 
 
 def cleanup_request_context():
     """Cleanup request context after request"""
     set_request_context(None)
+
+
+@contextmanager
+def request_context(request_id=None):
+    """Run a block (e.g. an owner-side command) under a request context with `request_id`"""
+    context = RequestContext(request_id)
+    context.start_time = time.perf_counter()
+    token = _request_context.set(context)
+    try:
+        yield context
+    finally:
+        _request_context.reset(token)
+
+
+def spawn_thread(target, *args, name=None, daemon=True, **kwargs):
+    """Start a thread that inherits the caller's context (request id included)"""
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(target,) + args, kwargs=kwargs,
+                              name=name, daemon=daemon)
+    thread.start()
+    return thread
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds `request_id` to every log record ('-' outside a request)"""
+    
+    def filter(self, record):
+        context = _request_context.get()
+        record.request_id = context.request_id if context is not None else '-'
+        return True
@@ -0,0 +1,313 @@
+"""
+Network events API for SIBERINDO BTS GUI
+Filtered, cursor-paginated event listing and time-bucketed aggregations
+whose closed buckets are cached so dashboards never recompute them
+"""
+
+import base64
+import json
+import logging
+import re
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, request, jsonify
+from modules.helpers import login_required
+from modules.auth import permission_required
+from modules.database import db
+from modules.presence import DETACH_EVENTS
+from modules.metrics import cache_requests
+from modules.result_set import requested_fields, requested_format
+
+logger = logging.getLogger(__name__)
+network_bp = Blueprint('network', __name__)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Bucket width -> (timestamp prefix length, timedelta, strftime format of the prefix)
+BUCKETS = {
+    'minute': (16, timedelta(minutes=1), '%Y-%m-%d %H:%M'),
+    'hour': (13, timedelta(hours=1), '%Y-%m-%d %H'),
+}
+
+ATTACH_EVENTS = ('attach', 'imsi_attach', 'location_update')
+
+# Upper bound on buckets per aggregation request (one day of minutes)
+MAX_BUCKETS = 1440
+
+_SPACED_OFFSET = re.compile(r'(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?) (\d{2}:?\d{2})$')
+
+
+def parse_time(value):
+    """Parse an ISO-8601 / 'YYYY-MM-DD HH:MM[:SS]' time as naive UTC (offsets are converted); None if empty"""
+    if not value:
+        return None
+    value = value.strip().replace('T', ' ').rstrip('Z')
+    # An unescaped '+' in a query string arrives as a space: '10:00:00 07:00' means '10:00:00+07:00'
+    value = _SPACED_OFFSET.sub(r'\1+\2', value)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid time: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def encode_cursor(row):
+    """Opaque cursor pointing after `row` in newest-first order"""
+    raw = json.dumps([str(row['timestamp']), row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; returns (timestamp, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, event_id = json.loads(raw)
+        return str(timestamp), int(event_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+class BucketCache:
+    """Bounded LRU of per-bucket aggregation results keyed by (metric, bucket)"""
+
+    def __init__(self, max_entries=20000, name='network_event_buckets'):
+        self.max_entries = max_entries
+        self._hit_labels = (name, 'hit')
+        self._miss_labels = (name, 'miss')
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                cache_requests.inc(self._miss_labels)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            cache_requests.inc(self._hit_labels)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class NetworkEventAggregator:
+    """Compute bucketed network event counts in SQL, caching buckets once they close.
+
+    A bucket is closed when its end is older than `grace` seconds, which covers
+    events still sitting in the write-behind buffer. Open buckets are always
+    recomputed; closed ones are read once and served from the cache afterwards.
+    """
+
+    def __init__(self, database=None, cache=None, grace=5):
+        self.database = database or db
+        self.cache = cache or BucketCache()
+        self.grace = timedelta(seconds=grace)
+
+    def bucket_range(self, width, since, until):
+        """Bucket-aligned [start, end) covering [since, until)"""
+        _, step, _ = BUCKETS[width]
+        start = self._floor(since, width)
+        end = self._floor(until, width)
+        if end < until:
+            end += step
+        if (end - start) // step > MAX_BUCKETS:
+            raise ValueError(f"Range too large: at most {MAX_BUCKETS} {width} buckets")
+        return start, end
+
+    @staticmethod
+    def _floor(moment, width):
+        if width == 'hour':
+            return moment.replace(minute=0, second=0, microsecond=0)
+        return moment.replace(second=0, microsecond=0)
+
+    def counts(self, metric, width, key_column, since, until, event_types=None, now=None):
+        """Return (start, end, {bucket: {key: count}}) for every bucket in the range"""
+        chars, step, fmt = BUCKETS[width]
+        start, end = self.bucket_range(width, since, until)
+        closed_before = (now or datetime.utcnow()) - self.grace
+
+        result = {}
+        missing = []
+        bucket = start
+        while bucket < end:
+            label = bucket.strftime(fmt)
+            cached = self.cache.get((metric, label)) if bucket + step <= closed_before else None
+            if cached is not None:
+                result[label] = cached
+            else:
+                missing.append(bucket)
+            bucket += step
+
+        if missing:
+            # One grouped query over the span of everything not served from cache
+            rows = self.database.aggregate_network_events(
+                chars, key_column,
+                missing[0].strftime(TIMESTAMP_FORMAT),
+                (missing[-1] + step).strftime(TIMESTAMP_FORMAT),
+                event_types)
+            for bucket in missing:
+                label = bucket.strftime(fmt)
+                counts = rows.get(label, {})
+                result[label] = counts
+                if bucket + step <= closed_before:
+                    self.cache.put((metric, label), counts)
+
+        return start, end, result
+
+    def events_per_minute(self, since, until, cell_id=None):
+        """Per-minute event counts for each cell"""
+        start, end, buckets = self.counts('per_minute_cell', 'minute', 'cell_id', since, until)
+        series = []
+        for label in sorted(buckets):
+            for cell, count in sorted(buckets[label].items(), key=lambda item: str(item[0])):
+                if cell_id is None or str(cell) == str(cell_id):
+                    series.append({'minute': label, 'cell_id': cell, 'count': count})
+        return {'since': start.strftime(TIMESTAMP_FORMAT), 'until': end.strftime(TIMESTAMP_FORMAT),
+                'series': series}
+
+    def top_imsis(self, since, until, limit=10):
+        """IMSIs with the most events, summed over hourly buckets"""
+        start, end, buckets = self.counts('imsi_hourly', 'hour', 'imsi', since, until)
+        totals = Counter()
+        for counts in buckets.values():
+            totals.update(counts)
+        totals.pop(None, None)
+        return {'since': start.strftime(TIMESTAMP_FORMAT), 'until': end.strftime(TIMESTAMP_FORMAT),
+                'top': [{'imsi': imsi, 'count': count} for imsi, count in totals.most_common(limit)]}
+
+    def attach_detach_rates(self, since, until):
+        """Per-minute attach and detach counts plus averages per minute"""
+        start, end, buckets = self.counts('attach_detach', 'minute', 'event_type', since, until,
+                                          ATTACH_EVENTS + tuple(sorted(DETACH_EVENTS)))
+        series = []
+        totals = {'attach': 0, 'detach': 0}
+        for label in sorted(buckets):
+            counts = buckets[label]
+            attach = sum(counts.get(event, 0) for event in ATTACH_EVENTS)
+            detach = sum(counts.get(event, 0) for event in DETACH_EVENTS)
+            totals['attach'] += attach
+            totals['detach'] += detach
+            series.append({'minute': label, 'attach': attach, 'detach': detach})
+        minutes = max(len(series), 1)
+        return {'since': start.strftime(TIMESTAMP_FORMAT), 'until': end.strftime(TIMESTAMP_FORMAT),
+                'series': series,
+                'totals': totals,
+                'attach_per_minute': round(totals['attach'] / minutes, 3),
+                'detach_per_minute': round(totals['detach'] / minutes, 3)}
+
+
+# Global aggregator shared by all requests
+aggregator = NetworkEventAggregator()
+
+
+def _time_range(default_span):
+    """Read since/until (UTC) from the query string, defaulting to the last `default_span`"""
+    until = parse_time(request.args.get('until')) or datetime.utcnow()
+    since = parse_time(request.args.get('since')) or until - default_span
+    if since >= until:
+        raise ValueError("'since' must be before 'until'")
+    return since, until
+
+
+@network_bp.route('/api/network/events', methods=['GET'])
+@login_required
+@permission_required('network')
+def api_network_events():
+    """List network events newest first with cursor pagination (?format=objects|rows|columnar, ?fields=)"""
+    try:
+        fmt = requested_format()
+        fields = requested_fields()
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        cursor = request.args.get('cursor')
+        events = db.query_network_events(
+            since=parse_time(request.args.get('since')),
+            until=parse_time(request.args.get('until')),
+            imsi=request.args.get('imsi') or None,
+            cell_id=request.args.get('cell_id') or None,
+            event_type=request.args.get('event_type') or None,
+            before=decode_cursor(cursor) if cursor else None,
+            limit=limit + 1)
+        has_more = len(events) > limit
+        events = events[:limit]
+        return jsonify({
+            'success': True,
+            'events': events.project(fields).to_json(fmt),
+            'format': fmt,
+            'count': len(events),
+            'next_cursor': encode_cursor(events[-1]) if has_more else None,
+            'timestamp': datetime.now().strftime('%H:%M:%S')
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error listing network events")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@network_bp.route('/api/network/events/per_minute', methods=['GET'])
+@login_required
+@permission_required('network')
+def api_events_per_minute():
+    """Events per minute per cell"""
+    try:
+        since, until = _time_range(timedelta(hours=1))
+        data = aggregator.events_per_minute(since, until, request.args.get('cell_id') or None)
+        return jsonify({'success': True, **data, 'timestamp': datetime.now().strftime('%H:%M:%S')})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error aggregating events per minute")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@network_bp.route('/api/network/events/top_imsis', methods=['GET'])
+@login_required
+@permission_required('network')
+def api_top_imsis():
+    """Top IMSIs by event count"""
+    try:
+        since, until = _time_range(timedelta(hours=24))
+        limit = max(1, min(request.args.get('limit', 10, type=int), 1000))
+        data = aggregator.top_imsis(since, until, limit)
+        return jsonify({'success': True, **data, 'timestamp': datetime.now().strftime('%H:%M:%S')})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error aggregating top IMSIs")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@network_bp.route('/api/network/events/attach_rates', methods=['GET'])
+@login_required
+@permission_required('network')
+def api_attach_rates():
+    """Attach/detach rates per minute"""
+    try:
+        since, until = _time_range(timedelta(hours=1))
+        data = aggregator.attach_detach_rates(since, until)
+        return jsonify({'success': True, **data, 'timestamp': datetime.now().strftime('%H:%M:%S')})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error aggregating attach/detach rates")
+        return jsonify({'success': False, 'message': str(e)}), 500
@@ -0,0 +1,204 @@
+"""
+Subscriber presence tracking for SIBERINDO BTS GUI
+In-memory IMSI -> last cell/LAC/time index fed by network events,
+persisted to SQLite with batched write-behind flushes
+"""
+
+import threading
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Network event types that end a subscriber's attachment to its cell
+DETACH_EVENTS = frozenset({'detach', 'imsi_detach', 'power_off'})
+
+
+class PresenceEntry:
+    """Last known location of one subscriber"""
+
+    __slots__ = ('imsi', 'cell_id', 'lac', 'seen_at', 'attached')
+
+    def __init__(self, imsi, cell_id, lac, seen_at, attached=True):
+        self.imsi = imsi
+        self.cell_id = cell_id
+        self.lac = lac
+        self.seen_at = seen_at
+        self.attached = attached
+
+    def to_dict(self):
+        return {
+            'imsi': self.imsi,
+            'cell_id': self.cell_id,
+            'lac': self.lac,
+            'attached': self.attached,
+            'last_seen': datetime.fromtimestamp(self.seen_at).strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+
+class PresenceTracker:
+    """Track subscriber presence in memory and flush it to the database in batches"""
+
+    def __init__(self, database=None, batch_size=5000):
+        self._database = database
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        # Ordered by last update so "seen in the last N minutes" walks only recent entries
+        self._entries = OrderedDict()
+        self._cells = {}
+        self._dirty = {}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self.flushed_rows = 0
+
+    @property
+    def database(self):
+        if self._database is None:
+            from modules.database import db
+            self._database = db
+        return self._database
+
+    def record(self, imsi, cell_id=None, lac=None, seen_at=None, attached=True):
+        """Record a sighting of `imsi` (hot path: memory only)"""
+        if not imsi:
+            return
+        seen_at = seen_at if seen_at is not None else time.time()
+        self._record(imsi, cell_id, lac, seen_at, attached, persist=True)
+
+    def _record(self, imsi, cell_id, lac, seen_at, attached, persist):
+        cell_id = str(cell_id) if cell_id is not None else None
+        lac = str(lac) if lac is not None else None
+
+        with self._lock:
+            entry = self._entries.get(imsi)
+            if not persist and entry is not None and entry.seen_at >= seen_at:
+                # Loading persisted rows never overrides a newer live sighting
+                return
+            if entry is None:
+                entry = PresenceEntry(imsi, cell_id, lac, seen_at, attached)
+                self._entries[imsi] = entry
+            else:
+                self._detach_from_cell(entry)
+                if cell_id is not None:
+                    entry.cell_id = cell_id
+                    entry.lac = lac
+                entry.seen_at = seen_at
+                entry.attached = attached
+                self._entries.move_to_end(imsi)
+            if attached and entry.cell_id is not None:
+                self._cells.setdefault(entry.cell_id, set()).add(imsi)
+            if persist:
+                self._dirty[imsi] = entry
+
+    def on_network_event(self, event_type, imsi=None, cell_id=None, lac=None, details=None):
+        """Network event listener registered with BTSDatabase"""
+        if imsi:
+            self.record(imsi, cell_id, lac, attached=event_type not in DETACH_EVENTS)
+
+    def _detach_from_cell(self, entry):
+        members = self._cells.get(entry.cell_id)
+        if members is not None:
+            members.discard(entry.imsi)
+            if not members:
+                del self._cells[entry.cell_id]
+
+    def get(self, imsi):
+        """Get the last known presence of one subscriber"""
+        self.ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(imsi)
+            return entry.to_dict() if entry else None
+
+    def attached_to(self, cell_id, lac=None, limit=None):
+        """List subscribers currently attached to a cell (optionally within a LAC)"""
+        self.ensure_loaded()
+        with self._lock:
+            members = self._cells.get(str(cell_id), ())
+            entries = [self._entries[imsi] for imsi in members]
+        if lac is not None:
+            entries = [e for e in entries if e.lac == str(lac)]
+        entries.sort(key=lambda e: e.seen_at, reverse=True)
+        return [e.to_dict() for e in entries[:limit]]
+
+    def seen_within(self, minutes, limit=None):
+        """List subscribers seen in the last `minutes`, newest first"""
+        self.ensure_loaded()
+        cutoff = time.time() - minutes * 60
+        results = []
+        with self._lock:
+            for entry in reversed(self._entries.values()):
+                if entry.seen_at < cutoff or (limit is not None and len(results) >= limit):
+                    break
+                results.append(entry.to_dict())
+        return results
+
+    def stats(self):
+        """Summary counters for monitoring"""
+        with self._lock:
+            return {
+                'tracked_subscribers': len(self._entries),
+                'active_cells': len(self._cells),
+                'pending_flush': len(self._dirty),
+                'flushed_rows': self.flushed_rows
+            }
+
+    def flush(self):
+        """Write pending presence updates to SQLite in batched transactions"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            pending, self._dirty = self._dirty, {}
+            rows = [(e.imsi, e.cell_id, e.lac, datetime.fromtimestamp(e.seen_at), int(e.attached))
+                    for e in pending.values()]
+
+        try:
+            written = self.database.save_presence(rows, batch_size=self.batch_size)
+            self.flushed_rows += written
+            return written
+        except Exception:
+            # Requeue so the next flush retries, unless newer sightings superseded them
+            with self._lock:
+                for imsi, entry in pending.items():
+                    self._dirty.setdefault(imsi, entry)
+            logger.exception("Error flushing subscriber presence")
+            return 0
+
+    def load(self, since_hours=24):
+        """Warm the in-memory index from persisted presence"""
+        rows = self.database.load_presence(since_hours=since_hours)
+        for row in rows:
+            seen_at = datetime.fromisoformat(str(row['last_seen'])).timestamp()
+            self._record(row['imsi'], row['cell_id'], row['lac'], seen_at, bool(row['attached']), persist=False)
+        self._loaded = True
+        logger.info(f"Loaded presence for {len(rows)} subscribers")
+        return len(rows)
+
+    def ensure_loaded(self):
+        """Load persisted presence once, on first read when startup deferred it"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                try:
+                    self.load()
+                except Exception:
+                    # Serve live sightings only rather than failing every read
+                    self._loaded = True
+                    logger.exception("Error loading subscriber presence")
+
+    def close(self):
+        """Flush everything still pending (call on shutdown)"""
+        return self.flush()
+
+
+def _create_tracker():
+    from modules.database import db
+    tracker = PresenceTracker(db)
+    db.add_network_event_listener(tracker.on_network_event)
+    return tracker
+
+
+# Global presence tracker, fed by BTSDatabase.log_network_event
+presence_tracker = _create_tracker()
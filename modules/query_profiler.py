@@ -0,0 +1,206 @@
+"""
+SQL query profiler for SIBERINDO BTS GUI
+Opt-in per-statement timing aggregated by normalized fingerprint, with a
+slow-query log that captures EXPLAIN QUERY PLAN above a threshold
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import has_request_context, request
+from config import Config
+from modules.middleware import get_request_id
+
+logger = logging.getLogger(__name__)
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_IN_LISTS = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_VALUE_ROWS = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_SPACES = re.compile(r'\s+')
+
+_fingerprints = {}
+_FINGERPRINT_CACHE_SIZE = 4096
+
+
+def fingerprint(sql):
+    """Statement with literals replaced by ? and lists collapsed, so variants group together"""
+    cached = _fingerprints.get(sql)
+    if cached is not None:
+        return cached
+    text = _COMMENTS.sub(' ', sql)
+    text = _STRINGS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _SPACES.sub(' ', text).strip()
+    text = _IN_LISTS.sub('IN (...)', text)
+    text = _VALUE_ROWS.sub(r'\1, ...', text)
+    if len(_fingerprints) >= _FINGERPRINT_CACHE_SIZE:
+        _fingerprints.clear()
+    _fingerprints[sql] = text
+    return text
+
+
+class QueryStats:
+    """Running totals for one fingerprint"""
+
+    __slots__ = ('fingerprint', 'count', 'total', 'max', 'rows', 'slow', 'plan', 'last_seen')
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.plan = None
+        self.last_seen = None
+
+    def to_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'avg_ms': round(self.total * 1000 / self.count, 3) if self.count else 0,
+            'max_ms': round(self.max * 1000, 3),
+            'rows': self.rows,
+            'avg_rows': round(self.rows / self.count, 1) if self.count else 0,
+            'slow': self.slow,
+            'plan': self.plan,
+            'last_seen': self.last_seen
+        }
+
+
+class QueryProfiler:
+    """Aggregate statement timings by fingerprint and keep a bounded slow-query log.
+
+    Disabled by default: the database cursors check `enabled` once per
+    statement and skip everything else when it is off. Statement time is the
+    execute call plus any fetches on the same cursor. A statement slower than
+    `slow_ms` is logged with its query plan; the plan is captured at most once
+    per fingerprint every `explain_interval` seconds and never includes the
+    bound parameters in the log.
+    """
+
+    def __init__(self, enabled=False, slow_ms=100, explain=True, max_slow=200,
+                 max_fingerprints=1000, explain_interval=60):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.max_fingerprints = max_fingerprints
+        self.explain_interval = explain_interval
+        self.started_at = datetime.now().isoformat()
+        self._stats = {}
+        self._slow_log = deque(maxlen=max_slow)
+        self._explained_at = {}
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=None, slow_ms=None, explain=None):
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if slow_ms is not None:
+            self.slow_ms = float(slow_ms)
+        if explain is not None:
+            self.explain = bool(explain)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow_log.clear()
+            self._explained_at.clear()
+            self.started_at = datetime.now().isoformat()
+
+    def record(self, sql, duration, rows=0, connection=None, parameters=()):
+        """Add one execution; returns its QueryStats so fetches can add rows and time later"""
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    key = '<other>'
+                    stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = QueryStats(key)
+            stats.count += 1
+            stats.total += duration
+            stats.rows += max(rows, 0)
+            if duration > stats.max:
+                stats.max = duration
+            stats.last_seen = datetime.now().isoformat()
+        if duration * 1000 >= self.slow_ms:
+            self._slow(stats, sql, duration, connection, parameters)
+        return stats
+
+    def add_fetch(self, stats, rows, duration):
+        with self._lock:
+            stats.rows += rows
+            stats.total += duration
+
+    def _slow(self, stats, sql, duration, connection, parameters):
+        plan = stats.plan
+        now = time.monotonic()
+        if self.explain and connection is not None and \
+                now - self._explained_at.get(stats.fingerprint, -self.explain_interval) >= self.explain_interval:
+            self._explained_at[stats.fingerprint] = now
+            plan = self.explain_plan(connection, sql, parameters)
+        entry = {
+            'fingerprint': stats.fingerprint,
+            'duration_ms': round(duration * 1000, 3),
+            'plan': plan,
+            'endpoint': _current_endpoint(),
+            'request_id': get_request_id(),
+            'at': datetime.now().isoformat()
+        }
+        with self._lock:
+            stats.slow += 1
+            if plan is not None:
+                stats.plan = plan
+            self._slow_log.append(entry)
+        logger.warning(f"Slow query ({entry['duration_ms']} ms, {entry['endpoint'] or 'background'}): "
+                       f"{stats.fingerprint} | plan: {'; '.join(plan or [])}")
+
+    @staticmethod
+    def explain_plan(connection, sql, parameters=()):
+        """EXPLAIN QUERY PLAN detail lines, or None if the statement can't be explained"""
+        try:
+            # A plain cursor, so the EXPLAIN itself is not recorded
+            cursor = sqlite3.Cursor(connection)
+            try:
+                return [row[-1] for row in cursor.execute('EXPLAIN QUERY PLAN ' + sql, parameters)]
+            finally:
+                cursor.close()
+        except sqlite3.Error as e:
+            logger.debug(f"Could not explain query: {e}")
+            return None
+
+    def report(self, sort='total', limit=50):
+        """Fingerprints ordered by total time (or count/max/avg) plus the recent slow log"""
+        with self._lock:
+            rows = [stats.to_dict() for stats in self._stats.values()]
+            slow = list(self._slow_log)
+        key = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms', 'avg': 'avg_ms', 'rows': 'rows'}.get(sort)
+        if key is None:
+            raise ValueError(f"Unknown sort: {sort}")
+        rows.sort(key=lambda row: row[key], reverse=True)
+        return {
+            'enabled': self.enabled,
+            'slow_ms': self.slow_ms,
+            'since': self.started_at,
+            'statements': sum(row['count'] for row in rows),
+            'total_ms': round(sum(row['total_ms'] for row in rows), 3),
+            'fingerprints': rows[:limit],
+            'slow_queries': slow[::-1][:limit]
+        }
+
+
+def _current_endpoint():
+    return request.endpoint if has_request_context() else None
+
+
+# Global profiler used by every BTSDatabase connection
+query_profiler = QueryProfiler(enabled=Config.QUERY_PROFILER_ENABLED, slow_ms=Config.SLOW_QUERY_MS,
+                               explain=Config.SLOW_QUERY_EXPLAIN)
@@ -0,0 +1,187 @@
+"""
+Rate limiting for SIBERINDO BTS GUI
+Sliding-window counters with constant state per key, idle-key eviction and an
+optional shared mode where the owner process keeps the counts for all workers
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from flask import current_app, flash, g, jsonify, redirect, request, session
+from config import Config
+from modules.coordinator import coordinator
+from modules.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SHARED_STORAGE = 'owner://'
+
+
+class SlidingWindowLimiter:
+    """At most `limit` hits per `window` seconds per key, approximated with two counters.
+
+    A key keeps [window start, previous window count, current window count,
+    expiry]. The hits counted against the limit are the current count plus
+    the previous count weighted by how much of the previous window still
+    overlaps the sliding window, which is exact at window boundaries and
+    never under-counts by more than the previous window's share. Keys are kept
+    in least-recently-hit order, so expired ones are evicted from the front
+    as a side effect of later hits, and `max_keys` caps memory.
+    """
+
+    def __init__(self, max_keys=100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.evicted = 0
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared = False
+
+    def share_via_owner(self, enabled=True):
+        """Count hits in the owner process so limits hold across prefork workers"""
+        self._shared = enabled
+
+    def hit(self, key, limit, window, cost=1):
+        """Count `cost` hits for key if they fit; returns (allowed, seconds until they would fit)"""
+        if self._shared:
+            try:
+                allowed, retry_after = coordinator.call('rate_limit_hit', timeout=1, key=key, limit=limit,
+                                                        window=window, cost=cost)
+                return allowed, retry_after
+            except Exception as e:
+                # Owner unreachable (e.g. mid-failover): keep limiting, per process
+                logger.warning(f"Shared rate limit unavailable, counting locally: {e}")
+        return self.hit_local(key, limit, window, cost)
+
+    def hit_local(self, key, limit, window, cost=1):
+        now = self.clock()
+        start = now - now % window
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None:
+                state = self._windows[key] = [start, 0, 0, start + 2 * window]
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._windows.move_to_end(key)
+                if state[0] != start:
+                    state[1] = state[2] if start - state[0] == window else 0
+                    state[2] = 0
+                    state[0] = start
+                    state[3] = start + 2 * window
+            previous, current = state[1], state[2]
+            weight = 1 - (now - start) / window
+            allowed = previous * weight + current + cost <= limit
+            if allowed:
+                state[2] += cost
+            self._evict(now)
+        if allowed:
+            return True, 0
+        return False, self._retry_after(now, start, window, previous, current, limit, cost)
+
+    def _evict(self, now):
+        windows = self._windows
+        while windows:
+            key, state = next(iter(windows.items()))
+            if state[3] > now:
+                break
+            del windows[key]
+            self.evicted += 1
+
+    @staticmethod
+    def _retry_after(now, start, window, previous, current, limit, cost):
+        if cost > limit:
+            return window
+        if current + cost <= limit:
+            # Fits once enough of the previous window has slid out
+            at = start + window * (1 - (limit - current - cost) / previous)
+        else:
+            # Needs the next window, where this window's count becomes the weighted one
+            at = start + window + window * (1 - (limit - cost) / current)
+        return max(at - now, 0)
+
+    def remaining(self, key, limit, window):
+        """Hits left for key right now, without counting one (local counts only)"""
+        now = self.clock()
+        start = now - now % window
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None:
+                return limit
+            previous, current = state[1], state[2]
+            if state[0] != start:
+                previous, current = (current if start - state[0] == window else 0), 0
+        return max(int(limit - previous * (1 - (now - start) / window) - current), 0)
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._windows.clear()
+            else:
+                self._windows.pop(key, None)
+
+    def stats(self):
+        return {'keys': len(self._windows), 'evicted': self.evicted, 'shared': self._shared}
+
+
+def client_ip():
+    """Client address, taken from X-Real-IP only when the direct peer is a trusted proxy"""
+    peer = request.remote_addr
+    if peer in Config.RATELIMIT_TRUSTED_PROXIES:
+        return request.headers.get('X-Real-IP') or peer
+    return peer
+
+
+def user_or_ip():
+    """Logged-in (session or Bearer token) username, or the client address for anonymous requests"""
+    username = session.get('username') or (g.get('api_user') or {}).get('username')
+    return f"user:{username}" if username else f"ip:{client_ip()}"
+
+
+def rate_limit(scope, limit, window, key=client_ip, methods=('POST',)):
+    """Decorator: allow `limit` requests per `window` seconds per key within `scope`.
+
+    API paths get 429 JSON with Retry-After; form posts get a flash message and
+    are sent back to the form.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method not in methods or not current_app.config.get('RATELIMIT_ENABLED', True):
+                return f(*args, **kwargs)
+            client = key()
+            allowed, retry_after = rate_limiter.hit(f"{scope}:{client}", limit, window)
+            if allowed:
+                return f(*args, **kwargs)
+            retry_after = max(int(math.ceil(retry_after)), 1)
+            rate_limited_requests.inc((scope,))
+            logger.warning(f"Rate limit '{scope}' exceeded by {client}")
+            if '/api/' in request.path:
+                response = jsonify({
+                    'success': False,
+                    'message': f'Too many requests, retry in {retry_after}s',
+                    'retry_after': retry_after,
+                    'timestamp': datetime.now().strftime('%H:%M:%S')
+                })
+                response.status_code = 429
+            else:
+                flash(f'Too many attempts, please wait {retry_after} seconds', 'danger')
+                response = redirect(request.full_path.rstrip('?'), code=303)
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+        return decorated
+    return decorator
+
+
+# Global limiter shared by the decorators and validators.RateLimiter
+rate_limiter = SlidingWindowLimiter(max_keys=Config.RATELIMIT_MAX_KEYS)
+rate_limiter.share_via_owner(Config.RATELIMIT_STORAGE_URL == SHARED_STORAGE)
+coordinator.register_command('rate_limit_hit', rate_limiter.hit_local)
+
+rate_limited_requests = registry.counter('rate_limited_requests_total', 'Requests rejected by a rate limit', ('scope',))
+registry.gauge('rate_limit_keys', 'Keys tracked by this process\'s rate limiter', lambda: rate_limiter.stats()['keys'])
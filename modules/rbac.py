@@ -0,0 +1,78 @@
+"""
+Role-based access control for SIBERINDO BTS GUI
+Permissions and roles compile to bits of one integer mask, resolved once per
+user or session, so a route check is a single AND
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Module permissions, one bit each (append only: masks may be stored in sessions)
+PERMISSIONS = ('dashboard', 'subscribers', 'sms_manager', 'scanner', 'network', 'services')
+
+ROLES = ('administrator', 'operator', 'viewer')
+
+# Permissions every member of a role has, on top of the user's own list
+ROLE_PERMISSIONS = {
+    'administrator': ('all',),
+    'operator': ('dashboard', 'subscribers', 'sms_manager', 'scanner', 'network', 'services'),
+    'viewer': ('dashboard', 'network'),
+}
+
+PERMISSION_BITS = {name: 1 << i for i, name in enumerate(PERMISSIONS)}
+ROLE_BITS = {name: 1 << (len(PERMISSIONS) + i) for i, name in enumerate(ROLES)}
+SUPERUSER = 1 << (len(PERMISSIONS) + len(ROLES))
+ALL_PERMISSIONS = sum(PERMISSION_BITS.values())
+
+_masks = {}
+
+
+def permission_mask(names):
+    """Bits for permission names; 'all' grants every permission plus the superuser bit"""
+    mask = 0
+    for name in names:
+        if name == 'all':
+            mask |= ALL_PERMISSIONS | SUPERUSER
+        elif name in PERMISSION_BITS:
+            mask |= PERMISSION_BITS[name]
+        else:
+            logger.warning(f"Unknown permission ignored: {name}")
+    return mask
+
+
+def role_mask(roles):
+    """Bits for role names (any-of checks)"""
+    unknown = [role for role in roles if role not in ROLE_BITS]
+    if unknown:
+        raise ValueError(f"Unknown roles: {', '.join(unknown)}")
+    return sum(ROLE_BITS[role] for role in set(roles))
+
+
+def user_mask(role, permissions=()):
+    """Compiled mask for a role plus a user's own permissions (memoized)"""
+    key = (role, tuple(permissions or ()))
+    mask = _masks.get(key)
+    if mask is None:
+        mask = ROLE_BITS.get(role, 0) | permission_mask(ROLE_PERMISSIONS.get(role, ())) | permission_mask(key[1])
+        _masks[key] = mask
+    return mask
+
+
+def has_permissions(mask, required):
+    """All bits of `required` are granted"""
+    return mask & required == required
+
+
+def has_role(mask, roles_required):
+    """One of the roles in `roles_required`, or superuser"""
+    return bool(mask & (roles_required | SUPERUSER))
+
+
+def describe(mask):
+    """Role and permission names in a mask, for profiles and debugging"""
+    return {
+        'roles': [name for name, bit in ROLE_BITS.items() if mask & bit],
+        'permissions': [name for name, bit in PERMISSION_BITS.items() if mask & bit],
+        'superuser': bool(mask & SUPERUSER)
+    }
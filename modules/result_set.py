@@ -0,0 +1,151 @@
+"""
+Compact query results for SIBERINDO BTS GUI
+Rows stay tuples that share one column header and are readable by name;
+a result set serializes to JSON objects, row arrays or columns without
+building a dict per row first, optionally with only the requested columns
+"""
+
+from flask import request
+
+# JSON shapes accepted by ResultSet.to_json (and the `format` query parameter)
+FORMATS = ('objects', 'rows', 'columnar')
+
+_record_types = {}
+
+
+class Record(tuple):
+    """Row tuple whose values can also be read by column name, like a read-only dict"""
+
+    __slots__ = ()
+    _columns = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if type(key) is str:
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        position = self._index.get(key)
+        return default if position is None else tuple.__getitem__(self, position)
+
+    def keys(self):
+        return self._columns
+
+    def values(self):
+        return tuple(self)
+
+    def items(self):
+        return zip(self._columns, self)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def as_dict(self):
+        return dict(zip(self._columns, self))
+
+    def __repr__(self):
+        return f"Record({self.as_dict()!r})"
+
+
+def record_type(columns):
+    """Record subclass for one column header (cached, so rows of a query share it)"""
+    columns = tuple(columns)
+    cls = _record_types.get(columns)
+    if cls is None:
+        cls = type('Record', (Record,), {
+            '__slots__': (),
+            '_columns': columns,
+            '_index': {name: i for i, name in enumerate(columns)}
+        })
+        _record_types[columns] = cls
+    return cls
+
+
+class ResultSet(list):
+    """List of Records with their column header.
+
+    Works wherever a list of row dicts did (len, iteration, row['imsi'],
+    dict(row), templates). Slices stay result sets.
+    """
+
+    __slots__ = ('columns',)
+
+    def __init__(self, columns, rows=()):
+        self.columns = tuple(columns)
+        cls = record_type(self.columns)
+        super().__init__(row if type(row) is cls else cls(row) for row in rows)
+
+    @classmethod
+    def from_cursor(cls, cursor):
+        """Fetch all rows of an executed cursor as plain tuples"""
+        cursor.row_factory = None
+        return cls((column[0] for column in cursor.description or ()), cursor.fetchall())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ResultSet(self.columns, list.__getitem__(self, index))
+        return list.__getitem__(self, index)
+
+    def project(self, fields):
+        """Result set with only `fields`, in that order (ValueError for a name that is not a column)"""
+        if not fields or not self.columns:
+            return self
+        unknown = [name for name in fields if name not in self.columns]
+        if unknown:
+            raise ValueError(f"unknown field(s): {', '.join(unknown)}")
+        positions = [self.columns.index(name) for name in fields]
+        return ResultSet(fields, ([row[i] for i in positions] for row in self))
+
+    def column(self, name):
+        """All values of one column"""
+        position = self.columns.index(name)
+        return [row[position] for row in self]
+
+    def to_json(self, fmt='objects'):
+        """JSON-ready data in one of FORMATS.
+
+        objects:  [{"imsi": ..., "msisdn": ...}, ...]
+        rows:     {"columns": ["imsi", "msisdn"], "rows": [[...], ...]}
+        columnar: {"imsi": [...], "msisdn": [...]}
+        """
+        if fmt == 'objects':
+            columns = self.columns
+            return [dict(zip(columns, row)) for row in self]
+        if fmt == 'rows':
+            return {'columns': list(self.columns), 'rows': self}
+        if fmt == 'columnar':
+            if not self:
+                return {name: [] for name in self.columns}
+            return dict(zip(self.columns, zip(*self)))
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+
+def project_rows(rows, fields):
+    """Dict rows with only `fields`; a key a row lacks is left out rather than sent as null"""
+    if not fields:
+        return rows
+    return [{name: row[name] for name in fields if name in row} for row in rows]
+
+
+def requested_fields(allowed=None):
+    """Column names from the request's comma-separated `fields` query parameter, or None when absent.
+
+    Names keep the order given; with `allowed`, an unknown name is a ValueError.
+    """
+    fields = tuple(dict.fromkeys(name.strip() for name in request.args.get('fields', '').split(',') if name.strip()))
+    if not fields:
+        return None
+    if allowed is not None:
+        unknown = [name for name in fields if name not in allowed]
+        if unknown:
+            raise ValueError(f"unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def requested_format(default='objects'):
+    """Result format from the request's `format` query parameter (ValueError if unknown)"""
+    fmt = request.args.get('format', default)
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return fmt
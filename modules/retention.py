@@ -0,0 +1,177 @@
+"""
+Event table retention for SIBERINDO BTS GUI
+Rolls old rows up into hourly counts, archives them to compressed per-day
+files and deletes them from the live database in small batches
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionPolicy:
+    """How long to keep raw rows of one event table and how to summarize them"""
+
+    def __init__(self, table, raw_days, rollup_keys=(), archive=True):
+        self.table = table
+        self.raw_days = raw_days
+        self.rollup_keys = tuple(rollup_keys)
+        self.archive = archive
+
+    def __repr__(self):
+        return f"RetentionPolicy({self.table!r}, raw_days={self.raw_days})"
+
+
+DEFAULT_POLICIES = {
+    'system_logs': RetentionPolicy('system_logs', 30, ('level', 'module')),
+    'network_events': RetentionPolicy('network_events', 14, ('event_type', 'cell_id')),
+    'sms_messages': RetentionPolicy('sms_messages', 90, ('direction', 'status')),
+}
+
+
+class ArchiveStore:
+    """Gzip-compressed NDJSON archive partitioned as <root>/<table>/<YYYY-MM-DD>.ndjson.gz"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, table, day):
+        return os.path.join(self.root, table, f'{day}.ndjson.gz')
+
+    def append(self, table, rows):
+        """Append rows (dicts with an 'id' and a 'timestamp') to their day partitions.
+
+        This runs before the batch's DELETE commits, so a batch whose delete
+        fails is archived again by the next run; readers drop repeated ids.
+        """
+        by_day = defaultdict(list)
+        for row in rows:
+            by_day[str(row['timestamp'])[:10]].append(row)
+        os.makedirs(os.path.join(self.root, table), exist_ok=True)
+        for day, day_rows in by_day.items():
+            # Appending creates a new gzip member; readers see one continuous stream
+            with gzip.open(self._path(table, day), 'at', encoding='utf-8') as f:
+                for row in day_rows:
+                    f.write(json.dumps(row, default=str) + '\n')
+
+    def days(self, table):
+        """Archived days for a table, newest first"""
+        directory = os.path.join(self.root, table)
+        if not os.path.isdir(directory):
+            return []
+        return sorted((name[:10] for name in os.listdir(directory) if name.endswith('.ndjson.gz')), reverse=True)
+
+    def read(self, table, since=None, until=None, filters=None, limit=100):
+        """Read archived rows newest first, applying equality filters and a [since, until) range"""
+        since = str(since) if since else None
+        until = str(until) if until else None
+        filters = {k: v for k, v in (filters or {}).items() if v not in (None, 'all')}
+        results = []
+        # A row lands in the archive once per attempt to move it (see append); keep the first copy
+        seen = set()
+
+        for day in self.days(table):
+            if since and day < since[:10]:
+                break
+            if until and day > until[:10]:
+                continue
+            with gzip.open(self._path(table, day), 'rt', encoding='utf-8') as f:
+                day_rows = [json.loads(line) for line in f if line.strip()]
+            for row in day_rows:
+                ts = str(row.get('timestamp'))
+                if since and ts < since or until and ts >= until:
+                    continue
+                if any(row.get(k) != v for k, v in filters.items()):
+                    continue
+                row_id = row.get('id')
+                if row_id is not None:
+                    if row_id in seen:
+                        continue
+                    seen.add(row_id)
+                results.append(row)
+            # Day partitions are disjoint, so once a full day satisfies the limit we can stop
+            if len(results) >= limit:
+                break
+
+        results.sort(key=lambda r: str(r.get('timestamp')), reverse=True)
+        return results[:limit]
+
+
+class RetentionManager:
+    """Apply retention policies incrementally so the live database never locks for long"""
+
+    def __init__(self, database, policies=None, archive=None, batch_size=1000, pause=0.05):
+        self.database = database
+        self.policies = policies or DEFAULT_POLICIES
+        self.archive = archive or ArchiveStore(database.archive_dir)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.last_report = None
+
+    def run_once(self):
+        """Apply every policy once; returns {table: rows archived}"""
+        report = {}
+        for policy in self.policies.values():
+            try:
+                report[policy.table] = self.apply(policy)
+            except Exception:
+                logger.exception(f"Retention failed for {policy.table}")
+                report[policy.table] = None
+        self.last_report = {'finished_at': datetime.now().isoformat(), 'archived': report}
+        return report
+
+    def apply(self, policy):
+        """Roll up, archive and delete rows older than the policy window in small batches"""
+        cutoff = (datetime.utcnow() - timedelta(days=policy.raw_days)).strftime('%Y-%m-%d %H:%M:%S')
+        total = 0
+        while True:
+            moved = self._move_batch(policy, cutoff)
+            total += moved
+            if moved < self.batch_size:
+                break
+            # Let request traffic grab the write lock between batches
+            time.sleep(self.pause)
+        if total:
+            logger.info(f"Retention: archived {total} rows from {policy.table} older than {cutoff}")
+        return total
+
+    def _move_batch(self, policy, cutoff):
+        conn = self.database.get_connection()
+        try:
+            rows = [dict(row) for row in conn.execute(
+                f'SELECT * FROM {policy.table} WHERE timestamp < ? ORDER BY timestamp LIMIT ?',
+                (cutoff, self.batch_size))]
+            if not rows:
+                return 0
+
+            if policy.archive:
+                self.archive.append(policy.table, rows)
+
+            rollup = Counter(
+                (str(row['timestamp'])[:13] + ':00:00', json.dumps([row.get(k) for k in policy.rollup_keys]))
+                for row in rows
+            )
+            conn.executemany('''
+                INSERT INTO event_rollups_hourly (table_name, bucket, dimensions, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(table_name, bucket, dimensions) DO UPDATE SET count = count + excluded.count
+            ''', [(policy.table, bucket, dims, count) for (bucket, dims), count in rollup.items()])
+            conn.executemany(f'DELETE FROM {policy.table} WHERE id = ?', [(row['id'],) for row in rows])
+            conn.commit()
+            return len(rows)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def read_archive(database, table, since=None, until=None, filters=None, limit=100):
+    """Read archived rows of `table` for a BTSDatabase"""
+    return ArchiveStore(database.archive_dir).read(table, since, until, filters, limit)
@@ -0,0 +1,184 @@
+"""
+Sampling profiler for SIBERINDO BTS GUI
+Periodically snapshots the stacks of request threads, tags each sample with
+the route being served and renders collapsed stacks or a flame graph SVG
+"""
+
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from html import escape
+
+# Thread id -> route currently being served, maintained by request hooks
+active_routes = {}
+
+MAX_SECONDS = 60
+MIN_INTERVAL = 0.001
+
+
+def tag_request(route):
+    """Mark the calling thread as serving `route` (before_request)"""
+    active_routes[threading.get_ident()] = route
+
+
+def untag_request():
+    """Clear the calling thread's route tag (teardown_request)"""
+    active_routes.pop(threading.get_ident(), None)
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Sample every request thread's stack at a fixed interval for a bounded time.
+
+    Samples are stored as collapsed stacks (root first, ';'-separated) with
+    the thread's route as the root frame, so one route's hotspots can be
+    filtered out afterwards. Only one capture runs at a time per process.
+    """
+
+    def __init__(self):
+        self._busy = threading.Lock()
+
+    @property
+    def running(self):
+        return self._busy.locked()
+
+    def capture(self, seconds, interval=0.005, route=None, all_threads=False):
+        """Sample for `seconds`; returns (Counter of collapsed stacks, capture info)"""
+        seconds = min(max(float(seconds), 0.1), MAX_SECONDS)
+        interval = max(float(interval), MIN_INTERVAL)
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("A profile capture is already running")
+        try:
+            return self._sample(seconds, interval, route, all_threads)
+        finally:
+            self._busy.release()
+
+    def _sample(self, seconds, interval, route, all_threads):
+        stacks = Counter()
+        me = threading.get_ident()
+        names = {}
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        overhead = 0.0
+        while True:
+            tick = time.perf_counter()
+            if tick >= deadline:
+                break
+            routes = dict(active_routes)
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                tag = routes.get(ident)
+                if tag is None:
+                    if not all_threads:
+                        continue
+                    if ident not in names:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    tag = f"thread:{names.get(ident, ident)}"
+                if route is not None and tag != route:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(tag)
+                stacks[';'.join(reversed(labels))] += 1
+            samples += 1
+            spent = time.perf_counter() - tick
+            overhead += spent
+            time.sleep(max(interval - spent, 0))
+        elapsed = time.perf_counter() - started
+        return stacks, {
+            'seconds': round(elapsed, 3),
+            'interval_ms': round(interval * 1000, 3),
+            'ticks': samples,
+            'samples': sum(stacks.values()),
+            'route': route,
+            'sampler_cpu_share': round(overhead / elapsed, 4) if elapsed else 0
+        }
+
+
+def collapsed(stacks):
+    """Brendan Gregg's collapsed format: one 'frame;frame;frame count' line per stack"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def routes_summary(stacks):
+    """{route: samples} from the root frame of each stack"""
+    totals = Counter()
+    for stack, count in stacks.items():
+        totals[stack.split(';', 1)[0]] += count
+    return dict(totals.most_common())
+
+
+def _tree(stacks):
+    root = {'name': 'all', 'value': 0, 'children': {}}
+    for stack, count in stacks.items():
+        root['value'] += count
+        node = root
+        for frame in stack.split(';'):
+            child = node['children'].get(frame)
+            if child is None:
+                child = node['children'][frame] = {'name': frame, 'value': 0, 'children': {}}
+            child['value'] += count
+            node = child
+    return root
+
+
+def _color(name):
+    # Warm palette, stable per frame name
+    h = zlib.crc32(name.encode('utf-8'))
+    return f"rgb({205 + h % 50},{(h >> 8) % 180 + 40},{(h >> 16) % 55})"
+
+
+def flamegraph_svg(stacks, title='Flame graph', width=1200, row_height=16, min_width=0.5):
+    """Render stacks as a self-contained SVG flame graph (root at the bottom)"""
+    root = _tree(stacks)
+    total = root['value'] or 1
+    rects = []
+    depth_max = [0]
+
+    def layout(node, x, depth):
+        w = node['value'] / total * (width - 20)
+        if w < min_width:
+            return
+        depth_max[0] = max(depth_max[0], depth)
+        rects.append((node['name'], node['value'], x, depth, w))
+        child_x = x
+        for child in sorted(node['children'].values(), key=lambda c: c['name']):
+            layout(child, child_x, depth + 1)
+            child_x += child['value'] / total * (width - 20)
+
+    layout(root, 10, 0)
+    height = (depth_max[0] + 1) * row_height + 50
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="Verdana,sans-serif" font-size="11">',
+        f'<rect width="100%" height="100%" fill="#f8f8f8"/>',
+        f'<text x="{width / 2}" y="20" text-anchor="middle" font-size="15">{escape(title)}</text>',
+    ]
+    for name, value, x, depth, w in rects:
+        y = height - (depth + 1) * row_height - 10
+        label = escape(name)
+        share = value * 100 / total
+        parts.append(f'<g><title>{label} ({value} samples, {share:.2f}%)</title>'
+                     f'<rect x="{x:.2f}" y="{y}" width="{w:.2f}" height="{row_height - 1}" '
+                     f'fill="{_color(name)}" rx="2"/>')
+        chars = int(w / 7)
+        if chars >= 3:
+            text = name if len(name) <= chars else name[:chars - 2] + '..'
+            parts.append(f'<text x="{x + 3:.2f}" y="{y + row_height - 4}">{escape(text)}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+# Global profiler used by the debug endpoint
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,64 @@
+"""
+Background task scheduling for SIBERINDO BTS GUI
+Lightweight periodic jobs for maintenance work (reconciliation, flushing, cleanup)
+"""
+
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Run a callable every `interval` seconds on a daemon thread"""
+
+    def __init__(self, name, interval, func, run_immediately=False):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_immediately = run_immediately
+        self.last_run = None
+        self.last_error = None
+        self.run_count = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the task thread (no-op if already running)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            logger.info(f"Started periodic task {self.name} (every {self.interval}s)")
+        return self
+
+    def stop(self, timeout=5):
+        """Signal the task to stop and wait for the thread to exit"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        """Check whether the task thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def run_once(self):
+        """Execute the task body once, recording errors instead of raising"""
+        try:
+            result = self.func()
+            self.last_error = None
+            return result
+        except Exception as e:
+            self.last_error = str(e)
+            logger.exception(f"Periodic task {self.name} failed")
+            return None
+        finally:
+            self.run_count += 1
+            self.last_run = time.time()
+
+    def _run(self):
+        if self.run_immediately:
+            self.run_once()
+        while not self._stop_event.wait(self.interval):
+            self.run_once()
@@ -1,4 +1,3 @@
-import psutil
 import subprocess
 import time
 import threading
@@ -138,6 +137,7 @@ class ServiceManager:
 
     def _find_service_process(self, process_name):
         """Find process by name with detailed information"""
+        import psutil
         for proc in psutil.process_iter(['pid', 'name', 'memory_info', 'cpu_percent', 'create_time']):
             try:
                 if proc.info['name'] and process_name in proc.info['name'].lower():
@@ -311,11 +311,13 @@ class ServiceManager:
 # Service Manager Blueprint
 from flask import Blueprint
 from modules.helpers import login_required
+from modules.auth import permission_required
 
 service_bp = Blueprint('service', __name__)
 
 @service_bp.route('/services')
 @login_required
+@permission_required('services')
 def service_management():
     """Service management page"""
     service_manager = ServiceManager()
@@ -327,6 +329,7 @@ def service_management():
 
 @service_bp.route('/api/services/<service_name>/start', methods=['POST'])
 @login_required
+@permission_required('services')
 def api_start_service(service_name):
     """API endpoint to start a service"""
     service_manager = ServiceManager()
@@ -340,6 +343,7 @@ def api_start_service(service_name):
 
 @service_bp.route('/api/services/<service_name>/stop', methods=['POST'])
 @login_required
+@permission_required('services')
 def api_stop_service(service_name):
     """API endpoint to stop a service"""
     service_manager = ServiceManager()
@@ -353,6 +357,7 @@ def api_stop_service(service_name):
 
 @service_bp.route('/api/services/<service_name>/restart', methods=['POST'])
 @login_required
+@permission_required('services')
 def api_restart_service(service_name):
     """API endpoint to restart a service"""
     service_manager = ServiceManager()
@@ -366,6 +371,7 @@ def api_restart_service(service_name):
 
 @service_bp.route('/api/services/<service_name>/logs')
 @login_required
+@permission_required('services')
 def api_get_service_logs(service_name):
     """API endpoint to get service logs"""
     service_manager = ServiceManager()
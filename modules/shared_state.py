@@ -0,0 +1,186 @@
+"""
+Cross-process state sharing for SIBERINDO BTS GUI
+Owner election (file lock), a seqlock-protected shared-memory snapshot and a
+local command channel used when the app runs as several pre-forked workers
+"""
+
+import fcntl
+import json
+import logging
+import mmap
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Snapshot header: sequence number (odd while a write is in progress) + payload length
+_HEADER = struct.Struct('<QI')
+
+
+class OwnerLock:
+    """Exclusive, non-blocking flock on a file; released by the kernel when the holder dies"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        """Take the lock if nobody holds it; returns True if this process now owns it"""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode('ascii'))
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class SharedSnapshot:
+    """JSON document in a memory-mapped file, written by one process and read by many.
+
+    The single writer bumps the sequence number to an odd value, writes the
+    payload, then bumps it to the next even value. Readers retry while the
+    sequence is odd or changed during their copy, so they never see a torn
+    document and never take a lock.
+    """
+
+    def __init__(self, path, size=1 << 20):
+        self.path = path
+        self.size = size
+        self._map = None
+        self._writable = False
+        self._cached_seq = None
+        self._cached = None
+
+    def open_writer(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            self._map = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        self._writable = True
+        return self
+
+    def _open_reader(self):
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            if os.fstat(fd).st_size < _HEADER.size:
+                return False
+            self._map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            return True
+        finally:
+            os.close(fd)
+
+    def write(self, document):
+        """Publish a new document (owner only)"""
+        payload = json.dumps(document, default=str).encode('utf-8')
+        if len(payload) > self.size - _HEADER.size:
+            raise ValueError(f"Snapshot too large ({len(payload)} bytes)")
+        seq, _ = _HEADER.unpack_from(self._map, 0)
+        seq += 2 if seq % 2 == 0 else 1
+        _HEADER.pack_into(self._map, 0, seq - 1, 0)
+        self._map[_HEADER.size:_HEADER.size + len(payload)] = payload
+        _HEADER.pack_into(self._map, 0, seq, len(payload))
+
+    def read(self, retries=100):
+        """Latest consistent document, or None if nothing has been published yet"""
+        if self._map is None and not self._open_reader():
+            return None
+        for _ in range(retries):
+            seq, length = _HEADER.unpack_from(self._map, 0)
+            if seq == 0:
+                return None
+            if seq % 2:
+                time.sleep(0)
+                continue
+            if seq == self._cached_seq:
+                return self._cached
+            payload = self._map[_HEADER.size:_HEADER.size + length]
+            if _HEADER.unpack_from(self._map, 0)[0] != seq:
+                continue
+            self._cached_seq, self._cached = seq, json.loads(payload)
+            return self._cached
+        return self._cached
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            message = json.loads(line)
+            result = self.server.dispatch(message['command'], message.get('kwargs') or {},
+                                          message.get('request_id'))
+            response = {'ok': True, 'result': result}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+
+
+class CommandServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Owner side of the command channel: one JSON request/response line per connection"""
+
+    daemon_threads = True
+
+    def __init__(self, path, dispatch):
+        if os.path.exists(path):
+            # Left behind by a previous owner; safe to remove because we hold the owner lock
+            os.unlink(path)
+        self.dispatch = dispatch
+        super().__init__(path, _CommandHandler)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='owner-commands', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def send_command(path, command, kwargs=None, timeout=10, request_id=None):
+    """Worker side of the command channel; raises RuntimeError on owner errors"""
+    message = {'command': command, 'kwargs': kwargs or {}, 'request_id': request_id}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            response = json.loads(f.readline())
+    if not response['ok']:
+        raise RuntimeError(response['error'])
+    return response['result']
@@ -1,12 +1,53 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, g
 from modules.helpers import login_required
+from modules.auth import permission_required
 from modules.database import save_sms, save_sms_batch, get_sms_history as db_get_sms_history
+from modules.database import get_data_version as db_get_data_version
 from modules.cache import cache_with_timeout, CacheManager
+from modules.rate_limit import rate_limit, user_or_ip
+from modules.validators import Field, Schema, validate_request_json
+from modules.http_cache import conditional
+from modules.result_set import project_rows, requested_fields
+from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 sms_bp = Blueprint('sms', __name__)
 
+SMS_TYPES = ('STANDARD', 'SILENT', 'FLASH')
+
+# Items accepted by one /api/sms/batch request
+SMS_BATCH_MAX_ITEMS = 1000
+
+# One SMS, as sent by the forms, /api/sms/send and each /api/sms/batch item
+SMS_SCHEMA = Schema({
+    'sender': Field('string', max_length=20),
+    'receiver': Field('msisdn'),
+    'message': Field('string', max_length=1600),
+    'type': Field('string', required=False, default='STANDARD', choices=SMS_TYPES, upper=True)
+})
+
+# Columns of an sms_messages row that /api/sms/history?fields= may select
+SMS_HISTORY_FIELDS = ('id', 'imsi', 'msisdn', 'message', 'direction', 'status', 'timestamp', 'delivered_at')
+
+SMS_BATCH_SCHEMA = Schema({
+    'sms_list': Field('list', items=SMS_SCHEMA, max_items=SMS_BATCH_MAX_ITEMS)
+})
+
+
+def _form_error(errors):
+    """First schema error as a message for the form templates"""
+    return f"{errors[0]['field'].capitalize()}: {errors[0]['error']}"
+
+
+def sms_data_version():
+    """Change counter of the sms_messages table (None if it cannot be read)."""
+    try:
+        return db_get_data_version('sms_messages')
+    except Exception:
+        logger.exception("Error reading SMS data version")
+        return None
+
 
 class SMSManager:
     """Optimized SMS operations with caching and batch processing."""
@@ -19,6 +60,8 @@ class SMSManager:
         except Exception as e:
             logger.exception("Error sending SMS batch")
             return False
+        finally:
+            SMSManager.invalidate()
     
     @staticmethod
     def send_sms(sender, receiver, message, sms_type='STANDARD'):
@@ -28,18 +71,28 @@ class SMSManager:
         except Exception as e:
             logger.exception("Error sending SMS")
             return False
+        finally:
+            SMSManager.invalidate()
     
     @staticmethod
-    @cache_with_timeout(CacheManager.TIMEOUT_SMS_HISTORY)
-    def get_sms_history(limit=50, offset=0):
-        """Get cached SMS history with pagination."""
+    def invalidate():
+        """Drop cached history and count after a send from this process."""
+        SMSManager.get_sms_history.invalidate()
+        SMSManager.get_sms_count.invalidate()
+    
+    @staticmethod
+    @cache_with_timeout(CacheManager.TIMEOUT_SMS_HISTORY, version=sms_data_version)
+    def get_sms_history(limit=50, offset=0, since=None, until=None, include_archive=False):
+        """Get cached SMS history with pagination (archived days on request)."""
         try:
-            return db_get_sms_history(limit=limit, offset=offset)
+            return db_get_sms_history(limit=limit, offset=offset, since=since, until=until,
+                                      include_archive=include_archive)
         except Exception as e:
             logger.exception("Error fetching SMS history")
             return []
     
     @staticmethod
+    @cache_with_timeout(CacheManager.TIMEOUT_SMS_HISTORY, version=sms_data_version)
     def get_sms_count():
         """Get total SMS count (efficient database query)."""
         try:
@@ -53,21 +106,21 @@ class SMSManager:
 
 @sms_bp.route('/send_silent_sms', methods=['GET', 'POST'])
 @login_required
+@permission_required('sms_manager')
+@rate_limit('sms', Config.SMS_RATE_LIMIT, Config.SMS_RATE_WINDOW, key=user_or_ip)
 def send_silent_sms():
     """Send silent SMS form and handler."""
     if request.method == 'POST':
-        sender = request.form.get('sender', '').strip()
-        receiver = request.form.get('receiver', '').strip()
-        message = request.form.get('message', '').strip()
+        sms, errors = SMS_SCHEMA.validate(request.form)
         
-        if not all([sender, receiver, message]):
-            return render_template('send_silent_sms.html', 
-                                 error='Please fill all fields!',
+        if errors:
+            return render_template('send_silent_sms.html',
+                                 error=_form_error(errors),
                                  company='SIBERINDO')
         
         try:
             sms_manager = SMSManager()
-            success = sms_manager.send_sms(sender, receiver, message, 'SILENT')
+            success = sms_manager.send_sms(sms['sender'], sms['receiver'], sms['message'], 'SILENT')
             
             if success:
                 return render_template('send_silent_sms.html',
@@ -88,21 +141,21 @@ def send_silent_sms():
 
 @sms_bp.route('/send_sms', methods=['GET', 'POST'])
 @login_required
+@permission_required('sms_manager')
+@rate_limit('sms', Config.SMS_RATE_LIMIT, Config.SMS_RATE_WINDOW, key=user_or_ip)
 def send_sms():
     """Send standard SMS form."""
     if request.method == 'POST':
-        sender = request.form.get('sender', '').strip()
-        receiver = request.form.get('receiver', '').strip()
-        message = request.form.get('message', '').strip()
+        sms, errors = SMS_SCHEMA.validate(request.form)
         
-        if not all([sender, receiver, message]):
+        if errors:
             return render_template('send_sms.html',
-                                 error='Please fill all fields!',
+                                 error=_form_error(errors),
                                  company='SIBERINDO')
         
         try:
             sms_manager = SMSManager()
-            success = sms_manager.send_sms(sender, receiver, message, 'STANDARD')
+            success = sms_manager.send_sms(sms['sender'], sms['receiver'], sms['message'], 'STANDARD')
             
             if success:
                 return render_template('send_sms.html',
@@ -123,6 +176,7 @@ def send_sms():
 
 @sms_bp.route('/sms_history', methods=['GET'])
 @login_required
+@permission_required('sms_manager')
 def sms_history():
     """SMS history view with pagination."""
     try:
@@ -149,20 +203,15 @@ def sms_history():
 
 @sms_bp.route('/api/sms/send', methods=['POST'])
 @login_required
+@permission_required('sms_manager')
+@rate_limit('sms', Config.SMS_RATE_LIMIT, Config.SMS_RATE_WINDOW, key=user_or_ip)
+@validate_request_json(SMS_SCHEMA)
 def api_send_sms():
     """API endpoint for sending SMS."""
     try:
-        data = request.get_json() or {}
-        sender = data.get('sender', '').strip()
-        receiver = data.get('receiver', '').strip()
-        message = data.get('message', '').strip()
-        sms_type = data.get('type', 'STANDARD')
-        
-        if not all([sender, receiver, message]):
-            return jsonify({'success': False, 'message': 'Missing required fields'}), 400
-        
+        sms = g.validated
         sms_manager = SMSManager()
-        success = sms_manager.send_sms(sender, receiver, message, sms_type)
+        success = sms_manager.send_sms(sms['sender'], sms['receiver'], sms['message'], sms['type'])
         
         return jsonify({
             'success': success,
@@ -175,25 +224,15 @@ def api_send_sms():
 
 @sms_bp.route('/api/sms/batch', methods=['POST'])
 @login_required
+@permission_required('sms_manager')
+@rate_limit('sms', Config.SMS_RATE_LIMIT, Config.SMS_RATE_WINDOW, key=user_or_ip)
+@validate_request_json(SMS_BATCH_SCHEMA)
 def api_send_sms_batch():
-    """API endpoint for batch SMS sending."""
+    """API endpoint for batch SMS sending (every item is validated; any error rejects the batch)."""
     try:
-        data = request.get_json() or {}
-        sms_list = data.get('sms_list', [])
-        
-        if not sms_list or not isinstance(sms_list, list):
-            return jsonify({'success': False, 'message': 'Invalid SMS list'}), 400
-        
         # Prepare SMS data
-        prepared_sms = []
-        for sms in sms_list:
-            prepared_sms.append((
-                sms.get('sender', ''),
-                sms.get('receiver', ''),
-                sms.get('message', ''),
-                sms.get('type', 'STANDARD'),
-                'SENT'
-            ))
+        prepared_sms = [(sms['sender'], sms['receiver'], sms['message'], sms['type'], 'SENT')
+                        for sms in g.validated['sms_list']]
         
         sms_manager = SMSManager()
         success = sms_manager.send_sms_batch(prepared_sms)
@@ -208,23 +247,49 @@ def api_send_sms_batch():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+def _history_query():
+    """get_sms_history() arguments for the current /api/sms/history request."""
+    page = request.args.get('page', 1, type=int)
+    limit = request.args.get('limit', 50, type=int)
+    return {
+        'limit': limit,
+        'offset': (page - 1) * limit,
+        'since': request.args.get('since') or None,
+        'until': request.args.get('until') or None,
+        'include_archive': request.args.get('include_archive', '').lower() in ('1', 'true')
+    }
+
+
+def _history_version():
+    """Conditional-request version of /api/sms/history: the sms_messages change counter."""
+    version = sms_data_version()
+    return None if version is None else (version,)
+
+
 @sms_bp.route('/api/sms/history', methods=['GET'])
 @login_required
+@permission_required('sms_manager')
+@conditional(_history_version)
 def api_sms_history():
-    """API endpoint for SMS history with pagination."""
+    """API endpoint for SMS history with pagination (?fields=imsi,message,timestamp)."""
+    try:
+        fields = requested_fields(SMS_HISTORY_FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
     try:
         page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 50, type=int)
-        offset = (page - 1) * limit
+        query = _history_query()
+        limit = query['limit']
         
         sms_manager = SMSManager()
-        sms_list = sms_manager.get_sms_history(limit=limit, offset=offset)
+        sms_list = sms_manager.get_sms_history(**query)
         total_count = sms_manager.get_sms_count()
         
         from datetime import datetime
         return jsonify({
             'success': True,
-            'sms_list': [dict(sms) if hasattr(sms, 'keys') else sms for sms in sms_list],
+            'sms_list': project_rows([dict(sms) if hasattr(sms, 'keys') else sms for sms in sms_list], fields),
             'total_count': total_count,
             'page': page,
             'limit': limit,
@@ -0,0 +1,79 @@
+"""
+Startup sequencing for SIBERINDO BTS GUI
+Runs deferred initialization steps eagerly, on first use, or on a background warm-up thread
+"""
+
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+STARTUP_MODES = ('eager', 'lazy', 'warmup')
+
+
+class StartupSequence:
+    """Ordered, named startup steps with per-step timings.
+
+    eager runs every step before start() returns; warmup runs them on a
+    background thread so the server accepts connections immediately; lazy
+    runs nothing and leaves each subsystem to initialize itself on first use.
+    Steps must be idempotent because first-use paths may race the warm-up.
+    """
+
+    def __init__(self, mode='eager'):
+        if mode not in STARTUP_MODES:
+            raise ValueError(f"Unknown startup mode: {mode}")
+        self.mode = mode
+        self.steps = []
+        self.timings = {}
+        self.errors = {}
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def add(self, name, func):
+        self.steps.append((name, func))
+
+    def start(self):
+        self.started_at = time.time()
+        if self.mode == 'eager':
+            self.run()
+        elif self.mode == 'warmup':
+            threading.Thread(target=self.run, name='warm-up', daemon=True).start()
+        else:
+            self._finish()
+        return self
+
+    def run(self):
+        """Run every step, recording failures instead of raising"""
+        for name, func in self.steps:
+            step_start = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                self.errors[name] = str(e)
+                logger.exception(f"Startup step {name} failed")
+            self.timings[name] = round(time.perf_counter() - step_start, 4)
+        self._finish()
+        logger.info(f"Startup ({self.mode}) finished in {sum(self.timings.values()):.3f}s: {self.timings}")
+
+    def _finish(self):
+        self.finished_at = time.time()
+        self._done.set()
+
+    @property
+    def complete(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def status(self):
+        return {
+            'mode': self.mode,
+            'complete': self.complete,
+            'steps': dict(self.timings),
+            'errors': dict(self.errors),
+            'duration': round(self.finished_at - self.started_at, 4) if self.finished_at else None
+        }
@@ -0,0 +1,122 @@
+"""
+Bulk subscriber import for SIBERINDO BTS GUI
+Streams CSV/NDJSON records, validates them and upserts in chunked transactions
+"""
+
+import csv
+import io
+import json
+import logging
+
+from modules.validators import DataValidator, ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriberImporter:
+    """Validate and upsert subscriber records from a text stream"""
+
+    FORMATS = ('csv', 'ndjson')
+    FIELDS = ('imsi', 'msisdn', 'name', 'location', 'status', 'network')
+
+    def __init__(self, database=None, chunk_size=5000, max_errors=1000):
+        if database is None:
+            from modules.database import db as database
+        self.database = database
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+    @staticmethod
+    def detect_format(filename=None, content_type=None):
+        """Guess the import format from a filename or MIME type"""
+        name = (filename or '').lower()
+        mime = (content_type or '').lower()
+        if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in mime or 'jsonlines' in mime:
+            return 'ndjson'
+        return 'csv'
+
+    @staticmethod
+    def iter_csv(stream):
+        """Yield (row_number, record) pairs from a CSV stream with a header row"""
+        for number, record in enumerate(csv.DictReader(stream), start=1):
+            yield number, record
+
+    @staticmethod
+    def iter_ndjson(stream):
+        """Yield (row_number, record) pairs from a newline-delimited JSON stream"""
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = ValidationError(f"Invalid JSON: {e}")
+            yield number, record
+
+    @staticmethod
+    def _optional(record, field, max_len):
+        """Return a stripped optional string field, or None when absent"""
+        value = record.get(field)
+        if value is None:
+            return None
+        value = DataValidator.sanitize_string(value)
+        if not value:
+            return None
+        if len(value) > max_len:
+            raise ValidationError(f"{field} too long (maximum {max_len} characters)")
+        return value
+
+    def validate_record(self, record):
+        """Validate one record and return the upsert tuple"""
+        if isinstance(record, ValidationError):
+            raise record
+        if not isinstance(record, dict):
+            raise ValidationError("Record must be an object")
+
+        imsi = DataValidator.validate_imsi(DataValidator.sanitize_string(record.get('imsi') or ''))
+        msisdn = self._optional(record, 'msisdn', 15)
+        if msisdn is not None:
+            DataValidator.validate_msisdn(msisdn)
+
+        return (
+            imsi,
+            msisdn,
+            self._optional(record, 'name', 100),
+            self._optional(record, 'location', 100),
+            self._optional(record, 'status', 20),
+            self._optional(record, 'network', 10),
+        )
+
+    def import_stream(self, stream, fmt='csv'):
+        """Import records from a text stream and return a per-row report"""
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported import format: {fmt}")
+
+        records = self.iter_csv(stream) if fmt == 'csv' else self.iter_ndjson(stream)
+        report = {'processed': 0, 'upserted': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+
+        def valid_rows():
+            for number, record in records:
+                report['processed'] += 1
+                try:
+                    yield self.validate_record(record)
+                except ValidationError as e:
+                    report['failed'] += 1
+                    if len(report['errors']) < self.max_errors:
+                        imsi = record.get('imsi') if isinstance(record, dict) else None
+                        report['errors'].append({'row': number, 'imsi': imsi, 'error': str(e)})
+                    else:
+                        report['errors_truncated'] = True
+
+        report['upserted'] = self.database.upsert_subscribers(valid_rows(), chunk_size=self.chunk_size)
+        logger.info(f"Subscriber import: {report['upserted']} upserted, {report['failed']} rejected")
+        return report
+
+    def import_bytes(self, binary_stream, fmt='csv', encoding='utf-8'):
+        """Import from a binary stream such as a request body or uploaded file"""
+        text_stream = io.TextIOWrapper(binary_stream, encoding=encoding, newline='')
+        try:
+            return self.import_stream(text_stream, fmt)
+        finally:
+            text_stream.detach()
@@ -1,7 +1,17 @@
 from flask import Blueprint, render_template, request, jsonify
 from modules.helpers import login_required
+from modules.auth import permission_required
 from modules.database import get_subscribers as db_get_subscribers, get_subscribers_count as db_get_subscribers_count
+from modules.database import search_subscribers as db_search_subscribers
+from modules.database import get_subscriber_counters as db_get_subscriber_counters
+from modules.database import reconcile_subscriber_counters as db_reconcile_subscriber_counters
+from modules.database import get_data_version as db_get_data_version
 from modules.cache import cache_with_timeout, CacheManager
+from modules.validators import DataValidator, ValidationError
+from modules.subscriber_import import SubscriberImporter
+from modules.presence import presence_tracker
+from modules.result_set import ResultSet, requested_fields, requested_format
+from modules.http_cache import conditional
 import logging
 from datetime import datetime
 
@@ -9,6 +19,15 @@ logger = logging.getLogger(__name__)
 subscribers_bp = Blueprint('subscribers', __name__)
 
 
+def subscribers_data_version():
+    """Change counter of the subscribers table (None if it cannot be read)."""
+    try:
+        return db_get_data_version('subscribers')
+    except Exception:
+        logger.exception("Error reading subscribers data version")
+        return None
+
+
 class SubscriberManager:
     """Optimized subscriber operations with caching and pagination."""
     
@@ -20,10 +39,10 @@ class SubscriberManager:
             return db_get_subscribers(limit=limit, offset=offset)
         except Exception as e:
             logger.exception("Error fetching subscribers")
-            return []
+            return ResultSet(())
     
     @staticmethod
-    @cache_with_timeout(CacheManager.TIMEOUT_SUBSCRIBERS)
+    @cache_with_timeout(CacheManager.TIMEOUT_SUBSCRIBERS, version=subscribers_data_version)
     def get_subscribers_count():
         """Get total subscriber count with caching."""
         try:
@@ -33,14 +52,29 @@ class SubscriberManager:
             return 0
     
     @staticmethod
+    def search_subscribers(**filters):
+        """Search subscribers (uncached: lookups are index-backed and cheap)."""
+        try:
+            return db_search_subscribers(**filters)
+        except Exception:
+            logger.exception("Error searching subscribers")
+            return ResultSet(())
+    
+    @staticmethod
+    @cache_with_timeout(CacheManager.TIMEOUT_SUBSCRIBER_STATS, version=subscribers_data_version)
     def get_subscriber_stats():
-        """Get subscriber statistics."""
+        """Get subscriber statistics from the materialized counters (O(1) read)."""
         try:
-            count = SubscriberManager.get_subscribers_count()
+            counters = db_get_subscriber_counters()
+            total = counters['total']
+            active = counters['status'].get('active', 0)
             return {
-                'total_subscribers': count,
-                'active_subscribers': count,  # Simulated
-                'inactive_subscribers': 0,
+                'total_subscribers': total,
+                'active_subscribers': active,
+                'inactive_subscribers': total - active,
+                'by_status': counters['status'],
+                'by_network': counters['network'],
+                'by_location': counters['location'],
                 'last_sync': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
         except Exception:
@@ -49,12 +83,37 @@ class SubscriberManager:
                 'total_subscribers': 0,
                 'active_subscribers': 0,
                 'inactive_subscribers': 0,
+                'by_status': {},
+                'by_network': {},
+                'by_location': {},
                 'last_sync': 'Unknown'
             }
+    
+    @staticmethod
+    def invalidate():
+        """Drop cached lists, counts and stats after a write from this process."""
+        for cached in (SubscriberManager.get_subscribers, SubscriberManager.get_subscribers_count,
+                       SubscriberManager.get_subscriber_stats):
+            cached.invalidate()
+    
+    @staticmethod
+    def stats_version():
+        """Conditional-request version of /api/subscribers/stats: the subscribers change counter."""
+        version = subscribers_data_version()
+        return None if version is None else (version,)
+    
+    @staticmethod
+    def reconcile_stats():
+        """Recompute subscriber counters and report corrected drift."""
+        drift = db_reconcile_subscriber_counters()
+        SubscriberManager.invalidate()
+        return [{'dimension': d, 'value': v, 'stored': stored, 'actual': actual}
+                for (d, v), (stored, actual) in sorted(drift.items())]
 
 
 @subscribers_bp.route('/subscribers', methods=['GET'])
 @login_required
+@permission_required('subscribers')
 def subscribers():
     """Subscribers list view with pagination."""
     try:
@@ -83,8 +142,15 @@ def subscribers():
 
 @subscribers_bp.route('/api/subscribers', methods=['GET'])
 @login_required
+@permission_required('subscribers')
 def api_subscribers():
-    """API endpoint for subscriber list with pagination."""
+    """API endpoint for subscriber list with pagination (?format=objects|rows|columnar, ?fields=imsi,msisdn)."""
+    try:
+        fmt = requested_format()
+        fields = requested_fields()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
     try:
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 100, type=int)
@@ -96,13 +162,16 @@ def api_subscribers():
         
         return jsonify({
             'success': True,
-            'subscribers': [dict(sub) if hasattr(sub, 'keys') else sub for sub in subscribers_list],
+            'subscribers': subscribers_list.project(fields).to_json(fmt),
+            'format': fmt,
             'total_count': total_count,
             'page': page,
             'limit': limit,
             'total_pages': (total_count + limit - 1) // limit,
             'timestamp': datetime.now().strftime('%H:%M:%S')
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         logger.exception("Error in API subscribers")
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -110,6 +179,8 @@ def api_subscribers():
 
 @subscribers_bp.route('/api/subscribers/stats', methods=['GET'])
 @login_required
+@permission_required('subscribers')
+@conditional(SubscriberManager.stats_version)
 def api_subscriber_stats():
     """API endpoint for subscriber statistics."""
     try:
@@ -126,8 +197,28 @@ def api_subscriber_stats():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@subscribers_bp.route('/api/subscribers/stats/reconcile', methods=['POST'])
+@login_required
+@permission_required('subscribers')
+def api_subscriber_stats_reconcile():
+    """API endpoint to reconcile materialized subscriber counters."""
+    try:
+        drift = SubscriberManager.reconcile_stats()
+        
+        return jsonify({
+            'success': True,
+            'corrected': drift,
+            'stats': SubscriberManager.get_subscriber_stats(),
+            'timestamp': datetime.now().strftime('%H:%M:%S')
+        })
+    except Exception as e:
+        logger.exception("Error reconciling subscriber stats")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
 @subscribers_bp.route('/api/subscribers/count', methods=['GET'])
 @login_required
+@permission_required('subscribers')
 def api_subscriber_count():
     """API endpoint for getting subscriber count."""
     try:
@@ -141,4 +232,146 @@ def api_subscriber_count():
         })
     except Exception as e:
         logger.exception("Error in API subscriber count")
-        return jsonify({'success': False, 'message': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+def _parse_search_filters(args):
+    """Build search_subscribers() filters from request args, raising ValidationError on bad input."""
+    filters = {}
+    
+    for field, validate in (('imsi', DataValidator.validate_imsi), ('msisdn', DataValidator.validate_msisdn)):
+        value = args.get(field, '').strip()
+        if value:
+            filters[field] = validate(value)
+        prefix = args.get(f'{field}_prefix', '').strip()
+        if prefix:
+            if not prefix.isdigit() or len(prefix) > 15:
+                raise ValidationError(f"{field}_prefix must be 1-15 digits")
+            filters[f'{field}_prefix'] = prefix
+    
+    for field in ('status', 'network', 'location'):
+        value = args.get(field, '').strip()
+        if value:
+            filters[field] = value
+    
+    for field in ('seen_after', 'seen_before'):
+        value = args.get(field, '').strip()
+        if value:
+            try:
+                filters[field] = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValidationError(f"{field} must be an ISO-8601 datetime")
+    
+    return filters
+
+
+@subscribers_bp.route('/api/subscribers/search', methods=['GET'])
+@login_required
+@permission_required('subscribers')
+def api_subscriber_search():
+    """API endpoint for subscriber search by IMSI/MSISDN and attribute filters (?format=, ?fields= as /api/subscribers)."""
+    try:
+        filters = _parse_search_filters(request.args)
+        fmt = requested_format()
+        fields = requested_fields()
+    except (ValidationError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    try:
+        page = request.args.get('page', 1, type=int)
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        offset = (page - 1) * limit
+        
+        subscriber_manager = SubscriberManager()
+        subscribers_list = subscriber_manager.search_subscribers(limit=limit, offset=offset, **filters)
+        
+        return jsonify({
+            'success': True,
+            'subscribers': subscribers_list.project(fields).to_json(fmt),
+            'format': fmt,
+            'count': len(subscribers_list),
+            'filters': {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in filters.items()},
+            'page': page,
+            'limit': limit,
+            'timestamp': datetime.now().strftime('%H:%M:%S')
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error in API subscriber search")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@subscribers_bp.route('/api/subscribers/import', methods=['POST'])
+@login_required
+@permission_required('subscribers')
+def api_subscriber_import():
+    """API endpoint for bulk subscriber import/upsert from CSV or NDJSON.
+    
+    Accepts a multipart upload in the `file` field or a raw request body;
+    the format comes from `?format=`, the filename or the Content-Type.
+    """
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            stream = upload.stream
+            fmt = request.args.get('format') or SubscriberImporter.detect_format(upload.filename, upload.mimetype)
+        else:
+            stream = request.stream
+            fmt = request.args.get('format') or SubscriberImporter.detect_format(content_type=request.content_type)
+        
+        if fmt not in SubscriberImporter.FORMATS:
+            return jsonify({'success': False, 'message': f'Unsupported format: {fmt}'}), 400
+        
+        chunk_size = min(max(request.args.get('chunk_size', 5000, type=int), 1), 50000)
+        report = SubscriberImporter(chunk_size=chunk_size).import_bytes(stream, fmt)
+        SubscriberManager.invalidate()
+        
+        return jsonify({
+            'success': report['failed'] == 0,
+            'format': fmt,
+            **report,
+            'timestamp': datetime.now().strftime('%H:%M:%S')
+        })
+    except Exception as e:
+        logger.exception("Error in API subscriber import")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@subscribers_bp.route('/api/subscribers/presence', methods=['GET'])
+@login_required
+@permission_required('subscribers')
+def api_subscriber_presence():
+    """API endpoint for in-memory subscriber presence queries.
+    
+    `imsi` returns one subscriber, `cell_id` (and optional `lac`) lists
+    subscribers attached to a cell, `minutes` lists recently seen ones.
+    """
+    try:
+        limit = min(max(request.args.get('limit', 1000, type=int), 1), 10000)
+        imsi = request.args.get('imsi', '').strip()
+        cell_id = request.args.get('cell_id', '').strip()
+        minutes = request.args.get('minutes', type=float)
+        
+        if imsi:
+            presence = presence_tracker.get(imsi)
+            if presence is None:
+                return jsonify({'success': False, 'message': 'No presence recorded for IMSI'}), 404
+            result = {'presence': presence}
+        elif cell_id:
+            subscribers_list = presence_tracker.attached_to(cell_id, request.args.get('lac') or None, limit=limit)
+            result = {'cell_id': cell_id, 'subscribers': subscribers_list, 'count': len(subscribers_list)}
+        elif minutes is not None and minutes > 0:
+            subscribers_list = presence_tracker.seen_within(minutes, limit=limit)
+            result = {'minutes': minutes, 'subscribers': subscribers_list, 'count': len(subscribers_list)}
+        else:
+            result = {'stats': presence_tracker.stats()}
+        
+        return jsonify({
+            'success': True,
+            **result,
+            'timestamp': datetime.now().strftime('%H:%M:%S')
+        })
+    except Exception as e:
+        logger.exception("Error in API subscriber presence")
+        return jsonify({'success': False, 'message': str(e)}), 500
@@ -0,0 +1,192 @@
+"""
+User store for SIBERINDO BTS GUI
+Users live in the `users` table with per-user salted PBKDF2 hashes; lookups
+are cached per process and password checks run on a small bounded pool
+"""
+
+import base64
+import contextvars
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+from config import Config
+from modules.database import db
+from modules.metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_SCHEME = 'pbkdf2_sha256'
+SALT_BYTES = 16
+
+# Fixed salt of the SHA-256 hashes used before the users table existed
+LEGACY_SALT = 'siberindo-salt-2024'
+
+# Created on first use of an empty users table; change these passwords after the first login
+DEFAULT_USERS = (
+    {'username': 'admin', 'password': 'password123', 'role': 'administrator', 'full_name': 'System Administrator',
+     'email': 'admin@siberindo.com', 'permissions': ['all']},
+    {'username': 'operator', 'password': 'operator123', 'role': 'operator', 'full_name': 'System Operator',
+     'email': 'operator@siberindo.com', 'permissions': ['dashboard', 'subscribers', 'sms_manager']},
+)
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def hash_password(password, iterations=None, salt=None):
+    """'pbkdf2_sha256$<iterations>$<salt>$<hash>' with a random per-user salt"""
+    iterations = iterations or Config.PASSWORD_HASH_ITERATIONS
+    salt = salt or _b64(os.urandom(SALT_BYTES))
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('ascii'), iterations)
+    return f"{PASSWORD_SCHEME}${iterations}${salt}${_b64(digest)}"
+
+
+def check_password(password, stored):
+    """(matches, needs_rehash): rehash when the cost changed or the hash is a legacy SHA-256"""
+    if stored.startswith(PASSWORD_SCHEME + '$'):
+        try:
+            _, iterations, salt, _ = stored.split('$')
+            iterations = int(iterations)
+        except ValueError:
+            return False, False
+        matches = hmac.compare_digest(hash_password(password, iterations, salt), stored)
+        return matches, matches and iterations != Config.PASSWORD_HASH_ITERATIONS
+    # Legacy unsalted / fixed-salt SHA-256 hex digests
+    candidates = (hashlib.sha256(password.encode('utf-8')).hexdigest(),
+                  hashlib.sha256((password + LEGACY_SALT).encode('utf-8')).hexdigest())
+    matches = any(hmac.compare_digest(candidate, stored) for candidate in candidates)
+    return matches, matches
+
+
+class UserStore:
+    """Cached access to the users table.
+
+    Lookups (misses included, so probing unknown names doesn't hit SQLite)
+    are cached for `ttl` seconds in a bounded LRU. Changes made through the
+    store invalidate the entry at once in this process; other prefork workers
+    pick them up when their entry expires.
+    """
+
+    def __init__(self, database, ttl=30, max_size=1000):
+        self.db = database
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._seeded = False
+        self._dummy_hash = None
+
+    def _ensure_defaults(self):
+        if self._seeded:
+            return
+        if self.db.get_users_count() == 0:
+            self.db.add_users([{**{k: v for k, v in user.items() if k != 'password'},
+                                'password_hash': hash_password(user['password'])} for user in DEFAULT_USERS])
+            logger.warning("Created default users admin/operator; change their passwords")
+        self._seeded = True
+
+    def get(self, username):
+        """User dict (see BTSDatabase.get_user) or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(username)
+            if entry is not None and entry[1] > now:
+                self._cache.move_to_end(username)
+                cache_requests.inc(('users', 'hit'))
+                return entry[0]
+        cache_requests.inc(('users', 'miss'))
+        self._ensure_defaults()
+        user = self.db.get_user(username)
+        with self._lock:
+            self._cache[username] = (user, now + self.ttl)
+            self._cache.move_to_end(username)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return user
+
+    def invalidate(self, username=None):
+        with self._lock:
+            if username is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(username, None)
+
+    def authenticate(self, username, password):
+        """User dict if the credentials are valid, else None (upgrades outdated hashes)"""
+        user = self.get(username)
+        if user is None or not user['is_active']:
+            # Spend the same time as a real check so response times don't reveal valid names
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password(os.urandom(8).hex())
+            check_password(password, self._dummy_hash)
+            return None
+        matches, needs_rehash = check_password(password, user['password_hash'])
+        if not matches:
+            return None
+        if needs_rehash:
+            self.set_password(username, password)
+        return user
+
+    def set_password(self, username, password):
+        updated = self.db.update_user_password(username, hash_password(password))
+        self.invalidate(username)
+        return updated
+
+    def record_login(self, username):
+        when = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.db.update_user_last_login(username, when)
+        self.invalidate(username)
+
+
+class LoginBusy(Exception):
+    """Raised when the password-check pool is saturated"""
+
+
+class LoginVerifier:
+    """Run password checks on `workers` threads with at most `max_pending` waiting.
+
+    PBKDF2 releases the GIL, so the pool bounds how many cores a login burst
+    can take; anything beyond the queue is rejected at once instead of
+    tying up more request threads.
+    """
+
+    def __init__(self, store, workers=2, max_pending=16, timeout=10):
+        self.store = store
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login-verify')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self.rejected = 0
+
+    def verify(self, username, password):
+        """User dict or None; raises LoginBusy when the pool is saturated or the check times out"""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise LoginBusy("Too many logins in progress")
+        try:
+            # Carry the request id into the pool thread
+            future = self._executor.submit(contextvars.copy_context().run,
+                                           self.store.authenticate, username, password)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Still queued: drop it so a login flood cannot pile up work nobody waits for
+            # (a check already running finishes and frees its slot then)
+            future.cancel()
+            self.rejected += 1
+            raise LoginBusy("Login check timed out")
+
+
+# Global user store and login pool shared by the auth blueprint
+user_store = UserStore(db, ttl=Config.USER_CACHE_TTL)
+login_verifier = LoginVerifier(user_store, workers=Config.LOGIN_WORKERS, max_pending=Config.LOGIN_QUEUE_SIZE)
@@ -1,7 +1,7 @@
 """Data validation and sanitization utilities"""
 import re
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, g
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,6 +12,14 @@ class ValidationError(Exception):
     pass
 
 
+class SchemaErrors(ValidationError):
+    """Several field errors at once: [{'field': ..., 'error': ...}]"""
+    
+    def __init__(self, errors):
+        super().__init__(errors[0]['error'] if errors else 'Invalid data')
+        self.errors = errors
+
+
 class DataValidator:
     """Comprehensive data validation"""
     
@@ -33,7 +41,8 @@ class DataValidator:
         if not isinstance(imsi, str):
             raise ValidationError("IMSI must be string")
         
-        if not DataValidator.IMSI_PATTERN.match(imsi):
+        # Same as IMSI_PATTERN.fullmatch, without the regex engine
+        if len(imsi) != 15 or not imsi.isascii() or not imsi.isdigit():
             raise ValidationError("IMSI must be 15 digits")
         
         return imsi
@@ -44,7 +53,7 @@ class DataValidator:
         if not isinstance(msisdn, str):
             raise ValidationError("MSISDN must be string")
         
-        if not DataValidator.MSISDN_PATTERN.match(msisdn):
+        if not 10 <= len(msisdn) <= 15 or not msisdn.isascii() or not msisdn.isdigit():
             raise ValidationError("MSISDN must be 10-15 digits")
         
         return msisdn
@@ -119,89 +128,273 @@ class DataValidator:
         return value
 
 
-class RateLimiter:
-    """Rate limiting utility"""
+NO_ERRORS = ()
+
+# Errors returned in one 400 response (error_count still has the total)
+MAX_ERRORS = 50
+
+
+class Field:
+    """Declarative spec for one request field, compiled once by Schema.
     
-    _requests = {}
+    kind is one of 'string', 'integer', 'imsi', 'msisdn', 'email', 'username',
+    'list' (of `items`, another field dict or Schema) or 'custom' (`validator`
+    is called with the value and returns the cleaned value).
+    """
     
-    @classmethod
-    def check_rate_limit(cls, key, max_requests=100, window=60):
-        """Check if request exceeds rate limit"""
-        import time
-        
-        now = time.time()
-        
-        if key not in cls._requests:
-            cls._requests[key] = []
+    KINDS = ('string', 'integer', 'imsi', 'msisdn', 'email', 'username', 'list', 'custom')
+    
+    def __init__(self, kind='string', required=True, default=None, min_length=1, max_length=500,
+                 choices=None, upper=False, min_value=None, max_value=None, items=None, max_items=1000,
+                 validator=None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown field kind: {kind}")
+        self.kind = kind
+        self.required = required
+        self.default = default
+        self.min_length = min_length
+        self.max_length = max_length
+        self.choices = frozenset(choices) if choices else None
+        self.upper = upper
+        self.min_value = min_value
+        self.max_value = max_value
+        self.items = items if items is None or isinstance(items, Schema) else Schema(items)
+        self.max_items = max_items
+        self.validator = validator
+    
+    def compile(self):
+        """A function value -> cleaned value that raises ValidationError, specialised for this spec"""
+        kind = self.kind
+        if kind in ('imsi', 'msisdn'):
+            # Pasted numbers often carry surrounding whitespace; the cleaned value never does
+            validate_number = DataValidator.validate_imsi if kind == 'imsi' else DataValidator.validate_msisdn
+            return lambda value: validate_number(value.strip() if type(value) is str else value)
+        if kind == 'email':
+            return DataValidator.validate_email
+        if kind == 'username':
+            return DataValidator.validate_username
+        if kind == 'custom':
+            return self.validator
+        if kind == 'integer':
+            min_value, max_value = self.min_value, self.max_value
+            return lambda value: DataValidator.validate_integer(value, min_value, max_value)
+        if kind == 'list':
+            return self._compile_list()
+        return self._compile_string()
+    
+    def fast_path(self, namespace, i):
+        """Inline test (on `value`) that is true only for values the checker returns unchanged, or None"""
+        if self.kind in ('imsi', 'msisdn'):
+            low, high = (15, 15) if self.kind == 'imsi' else (10, 15)
+            return f"type(value) is str and {low} <= len(value) <= {high} and value.isascii() and value.isdigit()"
+        if self.kind != 'string':
+            return None
+        if self.choices is not None:
+            namespace[f'_choices{i}'] = self.choices
+            return f"type(value) is str and value in _choices{i}"
+        if self.min_length >= 1 and not self.upper:
+            return (f"type(value) is str and {self.min_length} <= len(value) <= {self.max_length}"
+                    " and not value[0].isspace() and not value[-1].isspace()")
+        return None
+    
+    def _compile_string(self):
+        min_length, max_length, choices, upper = self.min_length, self.max_length, self.choices, self.upper
         
-        # Remove old requests outside window
-        cls._requests[key] = [req_time for req_time in cls._requests[key] 
-                             if now - req_time < window]
+        def check(value):
+            if type(value) is not str:
+                raise ValidationError("Value must be string")
+            value = value.strip()
+            if upper:
+                value = value.upper()
+            if choices is not None:
+                if value not in choices:
+                    raise ValidationError(f"Value must be one of {', '.join(sorted(choices))}")
+            elif not min_length <= len(value) <= max_length:
+                if not value:
+                    raise ValidationError("Value cannot be empty")
+                raise ValidationError(f"Value length must be {min_length}-{max_length} characters")
+            return value
+        return check
+    
+    def _compile_list(self):
+        validate_many, max_items = self.items.validate_many, self.max_items
         
-        if len(cls._requests[key]) >= max_requests:
-            return False
+        def check(value):
+            if type(value) is not list:
+                raise ValidationError("Value must be a list")
+            if not value:
+                raise ValidationError("List cannot be empty")
+            if len(value) > max_items:
+                raise ValidationError(f"At most {max_items} items allowed")
+            cleaned, errors = validate_many(value)
+            if errors:
+                raise SchemaErrors(errors)
+            return cleaned
+        return check
+
+
+def _field_error(errors, name, error):
+    """Append the error for field `name` (None means missing) to errors, creating the list on first use"""
+    errors = errors or []
+    if error is None:
+        errors.append({'field': name, 'error': f'Missing field: {name}'})
+    elif isinstance(error, SchemaErrors):
+        errors.extend({'field': name + nested['field'], 'error': nested['error']} for nested in error.errors)
+    else:
+        errors.append({'field': name, 'error': str(error)})
+    return errors
+
+
+def _item_errors(errors, index, item_errors):
+    """Append the errors of list item `index` to errors as '[index].field' paths"""
+    errors = errors or []
+    for error in item_errors:
+        path = f"[{index}].{error['field']}" if error['field'] else f"[{index}]"
+        errors.append({'field': path, 'error': error['error']})
+    return errors
+
+class Schema:
+    """Field specs compiled into one validate(data) -> (clean dict, errors) function.
+    
+    Values in `fields` are Field specs or plain validator callables (the old
+    validate_request_json style). The function is generated with one unrolled
+    block per field, where values that are already clean are accepted by an
+    inline test and only the rest go through the field's checker. Every field
+    is checked and all errors are returned together, nested list items
+    included ('sms_list[3].receiver'). validate_many(items) runs the same
+    blocks inside one loop over a list of dicts, for list fields.
+    """
+    
+    def __init__(self, fields):
+        self.fields = tuple((name, spec if isinstance(spec, Field) else Field('custom', validator=spec))
+                            for name, spec in fields.items())
+        self.validate, self.validate_many = self._build(self.fields)
+    
+    @staticmethod
+    def _field_lines(fields, namespace, indent):
+        """Unrolled checks of `fields` on `get`, filling `clean` and `errors`"""
+        lines = []
+        for i, (name, field) in enumerate(fields):
+            namespace[f'_name{i}'] = name
+            namespace[f'_check{i}'] = field.compile()
+            namespace[f'_default{i}'] = field.default
+            lines += [f'value = get(_name{i})', 'if value is None:']
+            if field.required:
+                lines.append(f'    errors = _field_error(errors, _name{i}, None)')
+            else:
+                lines.append(f'    clean[_name{i}] = _default{i}')
+            fast_path = field.fast_path(namespace, i)
+            if fast_path:
+                lines += [f'elif {fast_path}:', f'    clean[_name{i}] = value']
+            lines += ['else:',
+                      '    try:',
+                      f'        clean[_name{i}] = _check{i}(value)',
+                      '    except ValidationError as e:',
+                      f'        errors = _field_error(errors, _name{i}, e)']
+        return [indent + line for line in lines]
+    
+    @staticmethod
+    def _build(fields):
+        namespace = {'ValidationError': ValidationError, 'NO_ERRORS': NO_ERRORS, '_field_error': _field_error,
+                     '_item_errors': _item_errors}
+        checks = Schema._field_lines(fields, namespace, '    ')
+        lines = ['def validate(data):', '    clean = {}', '    errors = None', '    get = data.get']
+        lines += checks
+        lines.append('    return clean, errors or NO_ERRORS')
         
-        cls._requests[key].append(now)
-        return True
+        # Same checks once per item; non-dict items are reported instead of any field errors
+        lines += ['def validate_many(items):',
+                  '    cleaned = []',
+                  '    append = cleaned.append',
+                  '    failed = None',
+                  '    not_objects = None',
+                  '    index = -1',
+                  '    for data in items:',
+                  '        index += 1',
+                  '        if type(data) is not dict:',
+                  "            not_objects = _item_errors(not_objects, index, [{'field': '', 'error': 'Item must be an object'}])",
+                  '            continue',
+                  '        clean = {}',
+                  '        errors = None',
+                  '        get = data.get']
+        lines += Schema._field_lines(fields, namespace, '        ')
+        lines += ['        if errors:',
+                  '            failed = _item_errors(failed, index, errors)',
+                  '        else:',
+                  '            append(clean)',
+                  '    return cleaned, not_objects or failed or NO_ERRORS']
+        exec(compile('\n'.join(lines), '<schema>', 'exec'), namespace)
+        return namespace['validate'], namespace['validate_many']
+
+
+def _as_schema(schema):
+    if schema is None or isinstance(schema, Schema):
+        return schema
+    return Schema(schema)
+
+
+def validation_error_response(errors):
+    """400 JSON with the first error as `error` and up to MAX_ERRORS in `errors`"""
+    return jsonify({
+        'success': False,
+        'error': errors[0]['error'],
+        'errors': errors[:MAX_ERRORS],
+        'error_count': len(errors)
+    }), 400
+
+
+class RateLimiter:
+    """Rate limiting utility (backed by the shared sliding-window limiter)"""
+    
+    @classmethod
+    def check_rate_limit(cls, key, max_requests=100, window=60):
+        """Check if request exceeds rate limit"""
+        from modules.rate_limit import rate_limiter
+        return rate_limiter.hit(key, max_requests, window)[0]
 
 
 def validate_request_json(schema=None):
-    """Decorator to validate JSON requests"""
+    """Decorator to validate JSON requests (cleaned fields go to g.validated)"""
+    compiled = _as_schema(schema)
+    
     def decorator(f):
         @wraps(f)
         def decorated(*args, **kwargs):
-            try:
-                if not request.is_json:
-                    return jsonify({'success': False, 'error': 'Content-Type must be application/json'}), 400
-                
-                data = request.get_json()
-                
-                if data is None:
-                    return jsonify({'success': False, 'error': 'Invalid JSON'}), 400
-                
-                if schema:
-                    for field, validator in schema.items():
-                        if field not in data:
-                            return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
-                        
-                        try:
-                            data[field] = validator(data[field])
-                        except ValidationError as e:
-                            return jsonify({'success': False, 'error': str(e)}), 400
-                
-                return f(*args, **kwargs)
+            if not request.is_json:
+                return jsonify({'success': False, 'error': 'Content-Type must be application/json'}), 400
+            
+            data = request.get_json(silent=True)
+            
+            if not isinstance(data, dict):
+                return jsonify({'success': False, 'error': 'Invalid JSON'}), 400
             
-            except Exception as e:
-                logger.exception("Validation error")
-                return jsonify({'success': False, 'error': 'Validation failed'}), 400
+            if compiled:
+                clean, errors = compiled.validate(data)
+                if errors:
+                    return validation_error_response(errors)
+                data.update(clean)
+                g.validated = clean
+            
+            return f(*args, **kwargs)
         
         return decorated
     return decorator
 
 
 def validate_request_form(schema=None):
-    """Decorator to validate form requests"""
+    """Decorator to validate form requests (cleaned fields go to g.validated)"""
+    compiled = _as_schema(schema)
+    
     def decorator(f):
         @wraps(f)
         def decorated(*args, **kwargs):
-            try:
-                if schema:
-                    for field, validator in schema.items():
-                        value = request.form.get(field)
-                        
-                        if value is None:
-                            return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
-                        
-                        try:
-                            validator(value)
-                        except ValidationError as e:
-                            return jsonify({'success': False, 'error': str(e)}), 400
-                
-                return f(*args, **kwargs)
+            if compiled:
+                clean, errors = compiled.validate(request.form)
+                if errors:
+                    return validation_error_response(errors)
+                g.validated = clean
             
-            except Exception as e:
-                logger.exception("Form validation error")
-                return jsonify({'success': False, 'error': 'Validation failed'}), 400
+            return f(*args, **kwargs)
         
         return decorated
     return decorator
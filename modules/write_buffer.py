@@ -0,0 +1,141 @@
+"""
+Write-behind buffering for SIBERINDO BTS GUI
+Batches high-volume inserts (system logs, network events) into single transactions
+"""
+
+import atexit
+import threading
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Bounded in-memory buffer flushed by count or time on a background thread.
+
+    Producers call put(); when `max_pending` rows are waiting they block for up
+    to `block_timeout` seconds (backpressure) and the row is dropped and counted
+    if the flusher still hasn't caught up. close() drains everything and is
+    registered with atexit so buffered rows survive a normal shutdown.
+    """
+
+    def __init__(self, name, flush_func, max_batch=500, flush_interval=1.0,
+                 max_pending=10000, block_timeout=0.5):
+        self.name = name
+        self.flush_func = flush_func
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.flushed = 0
+        self.batches = 0
+        self.dropped = 0
+        self.last_error = None
+        self.last_flush = None
+
+    def put(self, row):
+        """Queue one row; returns False if it had to be dropped"""
+        with self._cond:
+            if not self._closed and len(self._pending) >= self.max_pending:
+                deadline = time.monotonic() + self.block_timeout
+                self._cond.notify_all()
+                while len(self._pending) >= self.max_pending and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.dropped += 1
+                        if self.dropped == 1 or self.dropped % 1000 == 0:
+                            logger.warning(f"{self.name} buffer full, dropped {self.dropped} rows")
+                        return False
+                    self._cond.wait(remaining)
+            closed = self._closed
+            if not closed:
+                self._pending.append(row)
+                if len(self._pending) >= self.max_batch:
+                    self._cond.notify_all()
+        if closed:
+            # Late writers during shutdown go straight to the database, outside the lock
+            # so other producers and stats() are not held up by the write
+            self._write([row])
+            return True
+        self._ensure_thread()
+        return True
+
+    def flush(self):
+        """Synchronously write everything pending; returns rows written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    if not self._pending:
+                        break
+                    count = min(len(self._pending), self.max_batch)
+                    batch = [self._pending.popleft() for _ in range(count)]
+                    self._cond.notify_all()
+                written += self._write(batch)
+        return written
+
+    def _write(self, batch):
+        try:
+            self.flush_func(batch)
+            self.flushed += len(batch)
+            self.batches += 1
+            self.last_flush = time.time()
+            self.last_error = None
+            return len(batch)
+        except Exception as e:
+            self.last_error = str(e)
+            self.dropped += len(batch)
+            logger.error(f"{self.name} buffer flush failed, dropped {len(batch)} rows: {e}")
+            return 0
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._cond:
+                if self._thread is None and not self._closed:
+                    self._thread = threading.Thread(target=self._run, name=f'{self.name}-flusher', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                if len(self._pending) < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def pending(self):
+        """Number of rows waiting to be written"""
+        return len(self._pending)
+
+    def stats(self):
+        """Buffer counters for monitoring"""
+        return {
+            'pending': len(self._pending),
+            'max_pending': self.max_pending,
+            'flushed': self.flushed,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'last_error': self.last_error
+        }
+
+    def close(self):
+        """Stop the flusher and write everything still pending"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
@@ -20,8 +20,10 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"Database initialization error: {e}")
     
-    # Start application
+    # Start application (development server; use serve.py in production)
+    host = app.config.get('HOST', '0.0.0.0')
+    port = int(app.config.get('PORT', 5000))
     print("SIBERINDO BTS GUI Starting...")
-    print("Access URL: http://localhost:5000")
+    print(f"Access URL: http://localhost:{port}")
     print("Default login: admin / admin")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host=host, port=port, debug=bool(app.config.get('DEBUG', False)), threaded=True)
\ No newline at end of file
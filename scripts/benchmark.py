@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for SIBERINDO BTS GUI
+Runs micro-benchmarks against a throwaway database
+
+Usage:
+    python scripts/benchmark.py                 # run all benchmarks
+    python scripts/benchmark.py subscriber_search --rows 1000000
+    python scripts/benchmark.py serving --rows 5000
+    python scripts/benchmark.py startup --budget-ms 3000   # exit 1 if cold start is slower
+"""
+
+import sys
+import os
+import time
+import random
+import io
+import argparse
+import tempfile
+import socket
+import subprocess
+import threading
+import http.client
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.database import BTSDatabase
+from modules.subscriber_import import SubscriberImporter
+
+
+def timed(fn, repeat):
+    """Run fn `repeat` times and return the mean duration in seconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def make_database(tmpdir):
+    """Create an empty database in a temporary directory"""
+    return BTSDatabase(db_path=os.path.join(tmpdir, 'bench.db'))
+
+
+def seed_subscribers(database, rows):
+    """Insert `rows` synthetic subscribers in a single transaction"""
+    statuses = ['active', 'active', 'active', 'inactive', 'blocked']
+    networks = ['GSM', 'GSM', 'UMTS', 'LTE']
+    locations = ['Jakarta', 'Bandung', 'Surabaya', 'Medan', 'Makassar']
+    now = datetime.now()
+    conn = database.get_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO subscribers (imsi, msisdn, name, location, status, network, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (f'51010{i:010d}', f'628{i:09d}', f'Subscriber {i}',
+             random.choice(locations), random.choice(statuses), random.choice(networks),
+             now - timedelta(seconds=random.randint(0, 86400 * 30)))
+            for i in range(rows)
+        ))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def bench_subscriber_search(args):
+    """Exact and prefix IMSI/MSISDN lookups against a large subscribers table"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database = make_database(tmpdir)
+        start = time.perf_counter()
+        seed_subscribers(database, args.rows)
+        print(f"  seeded {args.rows} subscribers in {time.perf_counter() - start:.1f}s")
+
+        probe = args.rows // 2
+        cases = {
+            'imsi exact': dict(imsi=f'51010{probe:010d}'),
+            'imsi prefix': dict(imsi_prefix=f'51010{probe:010d}'[:12], limit=50),
+            'msisdn exact': dict(msisdn=f'628{probe:09d}'),
+            'msisdn prefix': dict(msisdn_prefix=f'628{probe:09d}'[:9], limit=50),
+            'status + seen': dict(status='blocked', seen_after=datetime.now() - timedelta(days=1), limit=50),
+        }
+        for name, filters in cases.items():
+            mean = timed(lambda: database.search_subscribers(**filters), args.repeat)
+            print(f"  {name:<16} {mean * 1e3:8.3f} ms/query")
+
+
+def bench_subscriber_import(args):
+    """Bulk CSV upsert throughput (fresh insert, then full update pass)"""
+    lines = ['imsi,msisdn,name,location,status,network']
+    lines += [f'51010{i:010d},628{i:09d},Subscriber {i},Jakarta,active,GSM' for i in range(args.rows)]
+    payload = '\n'.join(lines) + '\n'
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        importer = SubscriberImporter(make_database(tmpdir))
+        for label in ('insert', 'update'):
+            start = time.perf_counter()
+            report = importer.import_stream(io.StringIO(payload), 'csv')
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<8} {report['upserted']} rows in {elapsed:.2f}s ({report['upserted'] / elapsed:,.0f} rows/s)")
+
+
+def bench_event_logging(args):
+    """Network event logging: one transaction per row vs write-behind batches"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, buffered in (('direct', False), ('buffered', True)):
+            database = BTSDatabase(db_path=os.path.join(tmpdir, f'{label}.db'), buffered_logging=buffered)
+            start = time.perf_counter()
+            for i in range(args.rows):
+                database.log_network_event('location_update', imsi=f'51010{i:010d}', cell_id='1', lac='1001')
+            enqueued = time.perf_counter() - start
+            database.close()
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<8} {args.rows} events: caller {enqueued * 1e6 / args.rows:8.1f} us/event, "
+                  f"total {elapsed:.2f}s ({args.rows / elapsed:,.0f} events/s)")
+
+
+SERVING_ENDPOINTS = [
+    '/health',
+    '/subscribers/api/subscribers/count',
+    '/subscribers/api/subscribers?limit=20',
+    '/sms/api/sms/history?limit=20',
+    '/network/api/network/events?limit=50',
+]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(mode, workdir, port, env=None):
+    """Launch serve.py in `workdir` (fresh data/ and logs/) and wait until it answers"""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'serve.py'), '--mode', mode, '--host', '127.0.0.1', '--port', str(port)],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(os.environ, FLASK_ENV='production', **(env or {})))
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            response = conn.getresponse()
+            response.read()
+            return proc, response.getheader('Set-Cookie', '').split(';')[0]
+        except OSError:
+            time.sleep(0.01)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def _load(port, cookie, clients, total):
+    """Issue `total` GETs from `clients` keep-alive connections; returns (elapsed, latencies, errors)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client(count, offset):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        for i in range(count):
+            path = SERVING_ENDPOINTS[(offset + i) % len(SERVING_ENDPOINTS)]
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers={'Cookie': cookie})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[0] += 1
+            except (OSError, http.client.HTTPException):
+                errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(total // clients, n)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies), errors[0]
+
+
+def bench_serving(args):
+    """HTTP load against serve.py modes: read endpoints at increasing client concurrency"""
+    for mode in ('dev', 'threaded', 'prefork'):
+        with tempfile.TemporaryDirectory() as workdir:
+            os.makedirs(os.path.join(workdir, 'data'))
+            seed_subscribers(BTSDatabase(db_path=os.path.join(workdir, 'data', 'bts_database.db')), 10000)
+            port = _free_port()
+            proc, cookie = _start_server(mode, workdir, port)
+            try:
+                for clients in (1, 8, 32):
+                    elapsed, latencies, errors = _load(port, cookie, clients, args.rows)
+                    p50 = latencies[len(latencies) // 2] * 1e3
+                    p99 = latencies[int(len(latencies) * 0.99)] * 1e3
+                    print(f"  {mode:<8} clients={clients:<3} {len(latencies) / elapsed:8,.0f} req/s  "
+                          f"p50 {p50:6.1f} ms  p99 {p99:7.1f} ms  errors {errors}")
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+
+def _get(port, path, cookie=''):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('GET', path, headers={'Cookie': cookie})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response
+
+
+def import_profile(env, top=8):
+    """Run `import app` under -X importtime.
+
+    Returns (wall seconds, [(cumulative_us, module)]) for top-level packages and
+    the app's own modules, the units a startup change can actually move.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        code = f"import sys, time; sys.path.insert(0, {ROOT!r}); t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=workdir,
+                                capture_output=True, text=True, env=dict(os.environ, **env), timeout=120)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, module = line[len('import time:'):].split('|')
+        module = module.strip()
+        if module != 'app' and ('.' not in module or module.startswith('modules.')):
+            rows.append((int(cumulative_us), module))
+    rows.sort(reverse=True)
+    return float(result.stdout.strip().splitlines()[-1]), rows[:top]
+
+
+def bench_startup(args):
+    """Cold start per STARTUP_MODE: import profile, time to first answer and to first database read"""
+    worst = 0.0
+    for startup_mode in ('eager', 'lazy', 'warmup'):
+        env = {'STARTUP_MODE': startup_mode}
+        import_seconds, heaviest = import_profile(env)
+        print(f"  [{startup_mode}] import app {import_seconds * 1e3:.0f} ms; heaviest imports:")
+        for cumulative_us, module in heaviest:
+            print(f"      {cumulative_us / 1e3:7.1f} ms  {module}")
+
+        for run in range(args.repeat):
+            with tempfile.TemporaryDirectory() as workdir:
+                port = _free_port()
+                start = time.perf_counter()
+                proc, cookie = _start_server('threaded', workdir, port, env)
+                first_answer = time.perf_counter() - start
+                _get(port, '/subscribers/api/subscribers/count', cookie)
+                first_read = time.perf_counter() - start
+                proc.terminate()
+                proc.wait(timeout=10)
+            worst = max(worst, first_read)
+            print(f"  [{startup_mode}] cold start: first response {first_answer * 1e3:6.0f} ms, "
+                  f"first database read {first_read * 1e3:6.0f} ms")
+
+    if args.budget_ms is not None and worst * 1e3 > args.budget_ms:
+        print(f"  FAIL: cold start {worst * 1e3:.0f} ms exceeds budget {args.budget_ms} ms")
+        sys.exit(1)
+
+
+def bench_metrics(args):
+    """Metrics recording cost per request (one histogram observation), 1 and 8 threads"""
+    from modules.metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    latency = registry.histogram('bench_seconds', 'bench', ('endpoint', 'method', 'status'))
+    labels = [(f'bp.view_{i}', 'GET', 200) for i in range(20)]
+
+    def record(n):
+        for i in range(n):
+            latency.observe(0.004, labels[i % 20])
+
+    start = time.perf_counter()
+    for i in range(args.rows):
+        labels[i % 20]
+    baseline = time.perf_counter() - start
+    start = time.perf_counter()
+    record(args.rows)
+    elapsed = time.perf_counter() - start
+    print(f"  1 thread   {elapsed * 1e9 / args.rows:6.0f} ns/request "
+          f"({(elapsed - baseline) * 1e9 / args.rows:.0f} ns excluding the benchmark loop)")
+
+    threads = [threading.Thread(target=record, args=(args.rows // 8,)) for _ in range(8)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    counted = sum(latency.count(label) for label in labels)
+    print(f"  8 threads  {elapsed * 1e9 / (args.rows // 8 * 8):6.0f} ns/request, "
+          f"{counted} counted of {args.rows + args.rows // 8 * 8} recorded")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        registry.render()
+    print(f"  scrape     {(time.perf_counter() - start) * 1000 / args.repeat:6.2f} ms ({len(labels)} endpoints)")
+
+
+def bench_request_context(args):
+    """Request context cost: contextvar init/cleanup, request id lookup and log record tagging"""
+    import logging
+    from modules.middleware import (init_request_context, cleanup_request_context, get_request_id,
+                                    RequestIdFilter)
+
+    cycle = timed(lambda: (init_request_context(), cleanup_request_context()), args.rows)
+    init_request_context()
+    lookup = timed(get_request_id, args.rows)
+    record = logging.LogRecord('bench', logging.INFO, __file__, 0, 'message', None, None)
+    request_filter = RequestIdFilter()
+    tag = timed(lambda: request_filter.filter(record), args.rows)
+    cleanup_request_context()
+    print(f"  init+cleanup   {cycle * 1e9:6.0f} ns/request")
+    print(f"  request id     {lookup * 1e9:6.0f} ns/lookup")
+    print(f"  log record tag {tag * 1e9:6.0f} ns/record")
+
+
+def bench_logging(args):
+    """Caller-side latency of a log call, FileHandler vs the log pipeline, on a fast and a stalling disk"""
+    import logging
+    from modules.log_pipeline import LogPipeline, SizedTimedRotatingFileHandler, TEXT_FORMAT
+
+    class StallingHandler(SizedTimedRotatingFileHandler):
+        # Every write blocks for stall_ms, like a saturated disk or network filesystem
+        stall = 0.0
+
+        def emit(self, record):
+            if self.stall:
+                time.sleep(self.stall)
+            super().emit(record)
+
+    def measure(bench_logger, count):
+        latencies = []
+        for i in range(count):
+            start = time.perf_counter()
+            bench_logger.info("subscriber %s updated", i)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for stall_ms in (0, 0.5):
+            count = args.rows if not stall_ms else args.rows // 50
+            bench_logger = logging.getLogger(f'bench.logging.{stall_ms}')
+            bench_logger.propagate = False
+
+            direct = StallingHandler(os.path.join(tmp, 'direct.log'), max_bytes=1024 * 1024)
+            direct.stall = stall_ms / 1000
+            direct.setFormatter(logging.Formatter(TEXT_FORMAT.replace(' [%(request_id)s]', '')))
+            bench_logger.addHandler(direct)
+            bench_logger.setLevel(logging.INFO)
+            sync = measure(bench_logger, count)
+            bench_logger.removeHandler(direct)
+            direct.close()
+
+            queued_file = StallingHandler(os.path.join(tmp, 'queued.log'), max_bytes=1024 * 1024)
+            queued_file.stall = stall_ms / 1000
+            queued_file.setFormatter(logging.Formatter(TEXT_FORMAT))
+            pipeline = LogPipeline([queued_file], queue_size=count + 1).start(logging.INFO, bench_logger)
+            queued = measure(bench_logger, count)
+            started = time.perf_counter()
+            pipeline.stop()
+            drain = time.perf_counter() - started
+
+            print(f"  disk stall {stall_ms} ms/write, {count} calls:")
+            print(f"    FileHandler   p50 {sync[0] * 1e6:8.1f} µs   p99 {sync[1] * 1e6:8.1f} µs")
+            print(f"    log pipeline  p50 {queued[0] * 1e6:8.1f} µs   p99 {queued[1] * 1e6:8.1f} µs "
+                  f"(listener drained the rest in {drain * 1000:.0f} ms)")
+
+
+def bench_rate_limit(args):
+    """Rate limiter cost per check and memory per tracked key"""
+    import tracemalloc
+    from modules.rate_limit import SlidingWindowLimiter
+
+    limiter = SlidingWindowLimiter(max_keys=args.rows * 2)
+    per_hit = timed(lambda: limiter.hit_local('login:10.0.0.1', 1000000, 60), args.rows)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(args.rows):
+        limiter.hit_local(f"login:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 10, 60)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"  check          {per_hit * 1e9:6.0f} ns/hit (same key)")
+    print(f"  memory         {used / args.rows:6.0f} bytes/key ({args.rows} keys, key string included)")
+
+
+def bench_token_auth(args):
+    """Bearer token verification: jwt.decode vs the verified-token cache"""
+    import jwt
+    from modules import auth
+
+    token = auth.generate_token('operator')
+    decode = timed(lambda: jwt.decode(token, auth.JWT_SECRET, algorithms=[auth.JWT_ALGORITHM]), args.rows)
+    auth.token_cache.clear()
+    auth.verify_token(token)
+    cached = timed(lambda: auth.verify_token(token), args.rows)
+    print(f"  jwt.decode     {decode * 1e6:6.2f} µs/request")
+    print(f"  cached verify  {cached * 1e6:6.2f} µs/request")
+
+
+def bench_login(args):
+    """Login cost: user lookup (cold vs cached) and password check at PASSWORD_HASH_ITERATIONS"""
+    from config import Config
+    from modules.users import UserStore, hash_password, check_password
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = UserStore(make_database(tmpdir), ttl=3600)
+        store.get('admin')
+        cold = timed(lambda: (store.invalidate('admin'), store.get('admin')), args.rows)
+        cached = timed(lambda: store.get('admin'), args.rows)
+        stored = hash_password('admin')
+        check = timed(lambda: check_password('admin', stored), args.repeat)
+    print(f"  lookup (SQLite) {cold * 1e6:7.1f} µs")
+    print(f"  lookup (cached) {cached * 1e6:7.1f} µs")
+    print(f"  password check  {check * 1000:7.1f} ms ({Config.PASSWORD_HASH_ITERATIONS} iterations)")
+
+
+def bench_rbac(args):
+    """Route permission check: role list + permission list scan vs compiled bitmask test"""
+    from modules import rbac
+
+    roles = ['administrator', 'supervisor']
+    user = {'role': 'operator', 'permissions': ['dashboard', 'subscribers', 'sms_manager']}
+    scan = timed(lambda: user['role'] not in roles and 'all' not in user.get('permissions', []), args.rows)
+    required = rbac.role_mask(['administrator'])
+    mask = rbac.user_mask(user['role'], user['permissions'])
+    bitmask = timed(lambda: rbac.has_role(mask, required), args.rows)
+    print(f"  list scan      {scan * 1e9:6.0f} ns/check")
+    print(f"  bitmask        {bitmask * 1e9:6.0f} ns/check")
+
+
+def bench_validation(args):
+    """SMS batch validation: per-field validator loop vs compiled schema, items/second"""
+    import time
+    from modules.validators import DataValidator, Field, Schema, ValidationError
+    from modules.sms_manager import SMS_SCHEMA
+
+    items = [{'sender': 'SIBERINDO', 'receiver': f'62812{i:08d}', 'message': f'Test message {i}', 'type': 'STANDARD'}
+             for i in range(args.rows)]
+    validators = {
+        'sender': lambda v: DataValidator.validate_string(v, 1, 20),
+        'receiver': DataValidator.validate_msisdn,
+        'message': lambda v: DataValidator.validate_string(v, 1, 1600),
+    }
+
+    def loop():
+        cleaned = []
+        for item in items:
+            clean = {}
+            for field, validator in validators.items():
+                try:
+                    clean[field] = validator(item[field])
+                except (KeyError, ValidationError):
+                    break
+            else:
+                clean['type'] = item.get('type', 'STANDARD').upper()
+                cleaned.append(clean)
+        return cleaned
+
+    batch = Schema({'sms_list': Field('list', items=SMS_SCHEMA, max_items=len(items))})
+
+    for label, fn in (('validator loop', loop), ('compiled schema', lambda: batch.validate({'sms_list': items}))):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"  {label:16s} {args.rows / elapsed:10,.0f} items/s")
+
+
+def bench_result_set(args):
+    """Subscriber page to JSON: Row -> dict -> dict copies vs tuple ResultSet in each format"""
+    import json
+    from modules.result_set import ResultSet
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database = make_database(tmpdir)
+        seed_subscribers(database, args.rows)
+        query = 'SELECT * FROM subscribers ORDER BY last_seen DESC LIMIT ?'
+
+        def dict_rows():
+            conn = database.get_connection()
+            try:
+                rows = [dict(row) for row in conn.execute(query, (args.rows,)).fetchall()]
+            finally:
+                conn.close()
+            return json.dumps([dict(row) for row in rows], default=str)
+
+        def result_set(fmt):
+            conn = database.get_connection()
+            try:
+                rows = ResultSet.from_cursor(conn.execute(query, (args.rows,)))
+            finally:
+                conn.close()
+            return json.dumps(rows.to_json(fmt), default=str)
+
+        print(f"  dict rows      {timed(dict_rows, args.repeat) * 1e3:8.1f} ms/{args.rows} rows")
+        for fmt in ('objects', 'rows', 'columnar'):
+            mean = timed(lambda: result_set(fmt), args.repeat)
+            print(f"  {fmt:<14} {mean * 1e3:8.1f} ms/{args.rows} rows  ({len(result_set(fmt)) // 1024} KiB)")
+
+
+def bench_json(args):
+    """API response encoding: stdlib vs orjson provider, and pre-encoded snapshot fragments"""
+    from flask import Flask
+    from modules.json_provider import FastJSONProvider, EncodedCache
+    from modules.result_set import ResultSet
+
+    app = Flask(__name__)
+    app.config['JSON_SORT_KEYS'] = False
+    services = {f'service_{i}': {'status': 'running', 'pid': 1000 + i, 'uptime': '3 days, 4:05:06',
+                                 'memory_mb': 12.5 * i, 'restarts': i % 3} for i in range(12)}
+    system_stats = {'cpu': {'percent': 12.5, 'per_cpu': [10.0 + i for i in range(16)]},
+                    'memory': {'percent': 41.0, 'total': 16 << 30}, 'disk': {'percent': 63.2},
+                    'processes': [{'pid': i, 'name': f'proc{i}', 'cpu': 0.1 * i} for i in range(200)]}
+    snapshot = {'services': services, 'system_stats': system_stats}
+    rows = ResultSet(('id', 'imsi', 'msisdn', 'name', 'location', 'status', 'network', 'last_seen'),
+                     [(i, f'51010{i:010d}', f'628{i:09d}', f'Subscriber {i}', 'Jakarta', 'active', 'GSM',
+                       '2024-11-26 12:00:00') for i in range(args.rows)])
+
+    for encoder in ('stdlib', 'orjson'):
+        provider = FastJSONProvider(app, encoder=encoder)
+        cache = EncodedCache(provider)
+        with app.app_context():
+            snap = timed(lambda: provider.response({'success': True, **snapshot, 'timestamp': '12:00:00'}),
+                         args.repeat * 10)
+            cached = timed(lambda: provider.response({
+                'success': True, 'services': cache.get('services', services),
+                'system_stats': cache.get('system_stats', system_stats), 'timestamp': '12:00:00'}),
+                args.repeat * 10)
+            page = timed(lambda: provider.response({'subscribers': rows.to_json()}), args.repeat)
+        print(f"  {provider.encoder:<7} dashboard {snap * 1e6:7.0f} us  cached fragments {cached * 1e6:6.0f} us  "
+              f"{args.rows} rows {page * 1e3:6.1f} ms")
+
+
+def bench_conditional(args):
+    """Polled endpoints in-process: full 200 response vs 304 revalidation with the ETag"""
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, 'data'))
+        database = BTSDatabase(db_path=os.path.join(workdir, 'data', 'bts_database.db'))
+        seed_subscribers(database, 10000)
+        for i in range(500):
+            database.add_sms_message(f'51010{i:010d}', f'Message {i}', 'sent')
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            from config import Config
+            Config.PASSWORD_HASH_ITERATIONS = 1000
+            import app as app_module
+            from modules import auth
+
+            client = app_module.app.test_client()
+            headers = {'Authorization': f"Bearer {auth.generate_token('admin')}"}
+            for path in ('/subscribers/api/subscribers/stats', '/sms/api/sms/history?limit=200'):
+                etag = client.get(path, headers=headers).headers['ETag']
+                full = timed(lambda: client.get(path, headers=headers), args.repeat)
+                revalidated = timed(lambda: client.get(path, headers={**headers, 'If-None-Match': etag}), args.repeat)
+                print(f"  {path:<36} 200 {full * 1e3:6.2f} ms   304 {revalidated * 1e3:6.2f} ms")
+        finally:
+            os.chdir(cwd)
+
+
+def bench_compression(args):
+    """Subscriber page bytes and time: full vs fields= projection, identity vs gzip (and brotli when installed)"""
+    from flask import Flask, jsonify
+    from modules.compression import available_encodings, compress_response
+    from modules.result_set import ResultSet
+
+    app = Flask(__name__)
+    app.config['JSON_SORT_KEYS'] = False
+    rows = ResultSet(('id', 'imsi', 'msisdn', 'name', 'location', 'status', 'network', 'last_seen'),
+                     [(i, f'51010{i:010d}', f'628{i:09d}', f'Subscriber {i}', 'Jakarta', 'active', 'GSM',
+                       '2024-11-26 12:00:00') for i in range(args.rows)])
+
+    for label, fields in (('all columns', None), ('fields=imsi,msisdn', ('imsi', 'msisdn'))):
+        for encoding in ('identity',) + available_encodings():
+            with app.test_request_context('/', headers={'Accept-Encoding': encoding}):
+                response = compress_response(jsonify({'subscribers': rows.project(fields).to_json()}))
+                elapsed = timed(lambda: compress_response(jsonify({'subscribers': rows.project(fields).to_json()})),
+                                args.repeat)
+            print(f"  {label:<19} {encoding:<8} {len(response.get_data()) / 1024:8.1f} KiB  {elapsed * 1e3:6.1f} ms")
+
+
+BENCHMARKS = {
+    'subscriber_search': (bench_subscriber_search, {'rows': 100000, 'repeat': 200}),
+    'subscriber_import': (bench_subscriber_import, {'rows': 50000, 'repeat': 1}),
+    'event_logging': (bench_event_logging, {'rows': 5000, 'repeat': 1}),
+    'serving': (bench_serving, {'rows': 2000, 'repeat': 1}),
+    'startup': (bench_startup, {'rows': 0, 'repeat': 3}),
+    'metrics': (bench_metrics, {'rows': 1000000, 'repeat': 100}),
+    'request_context': (bench_request_context, {'rows': 200000, 'repeat': 1}),
+    'logging': (bench_logging, {'rows': 50000, 'repeat': 1}),
+    'rate_limit': (bench_rate_limit, {'rows': 100000, 'repeat': 1}),
+    'token_auth': (bench_token_auth, {'rows': 50000, 'repeat': 1}),
+    'login': (bench_login, {'rows': 2000, 'repeat': 5}),
+    'rbac': (bench_rbac, {'rows': 1000000, 'repeat': 1}),
+    'validation': (bench_validation, {'rows': 100000, 'repeat': 3}),
+    'result_set': (bench_result_set, {'rows': 10000, 'repeat': 10}),
+    'json': (bench_json, {'rows': 10000, 'repeat': 20}),
+    'conditional': (bench_conditional, {'rows': 0, 'repeat': 500}),
+    'compression': (bench_compression, {'rows': 1000, 'repeat': 20}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SIBERINDO BTS GUI benchmark suite')
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run ({', '.join(BENCHMARKS)})")
+    parser.add_argument('--rows', type=int, help='dataset size override')
+    parser.add_argument('--repeat', type=int, help='iterations per measurement override')
+    parser.add_argument('--budget-ms', type=float, help='startup: fail if a cold start exceeds this')
+    args = parser.parse_args()
+
+    for name in args.names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+        fn, defaults = BENCHMARKS[name]
+        bench_args = argparse.Namespace(budget_ms=args.budget_ms, **defaults)
+        for key in ('rows', 'repeat'):
+            if getattr(args, key) is not None:
+                setattr(bench_args, key, getattr(args, key))
+        print(f"[{name}] {fn.__doc__}")
+        fn(bench_args)
+
+
+if __name__ == '__main__':
+    main()
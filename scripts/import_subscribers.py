@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Bulk subscriber import for SIBERINDO BTS GUI
+Upserts subscribers from a CSV (with header row) or NDJSON file
+
+Usage:
+    python scripts/import_subscribers.py sims.csv
+    python scripts/import_subscribers.py sims.ndjson --chunk-size 10000
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.database import BTSDatabase
+from modules.subscriber_import import SubscriberImporter
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import subscribers from CSV or NDJSON')
+    parser.add_argument('path', help="input file, or '-' for stdin")
+    parser.add_argument('--format', choices=SubscriberImporter.FORMATS,
+                        help='input format (default: from file extension)')
+    parser.add_argument('--db', default='data/bts_database.db', help='database path')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='rows per transaction')
+    parser.add_argument('--errors', action='store_true', help='print every rejected row')
+    args = parser.parse_args()
+
+    fmt = args.format or SubscriberImporter.detect_format(args.path)
+    importer = SubscriberImporter(BTSDatabase(db_path=args.db), chunk_size=args.chunk_size)
+
+    start = time.perf_counter()
+    if args.path == '-':
+        report = importer.import_stream(sys.stdin, fmt)
+    else:
+        with open(args.path, encoding='utf-8', newline='') as stream:
+            report = importer.import_stream(stream, fmt)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ Processed {report['processed']} rows in {elapsed:.2f}s "
+          f"({report['processed'] / elapsed if elapsed else 0:.0f} rows/s)")
+    print(f"  upserted: {report['upserted']}  rejected: {report['failed']}")
+    if args.errors:
+        for error in report['errors']:
+            print(json.dumps(error))
+    elif report['errors']:
+        print("  (use --errors to list rejected rows)")
+
+    return 0 if report['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Server launcher for SIBERINDO BTS GUI
+Runs the Flask app on the Werkzeug dev server, a production thread-pool WSGI
+server, or several pre-forked copies of it sharing one listening socket
+
+Usage:
+    python serve.py                          # SERVER_MODE from config (default: threaded)
+    python serve.py --mode dev               # Werkzeug dev server, DEBUG from config
+    python serve.py --threads 16 --port 8000
+    python serve.py --mode prefork --workers 4
+"""
+
+import sys
+import os
+import time
+import signal
+import socket
+import argparse
+import logging
+
+# Add current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+
+logger = logging.getLogger('serve')
+
+
+def load_app():
+    from app import app
+    return app
+
+
+def serve_dev(options):
+    """Werkzeug development server: one thread per connection, reloader in debug"""
+    app = load_app()
+    app.run(host=options.host, port=options.port, debug=bool(app.config.get('DEBUG', False)),
+            threaded=True)
+
+
+def serve_threaded(options, sockets=None):
+    """Waitress: fixed worker thread pool behind an async I/O loop.
+
+    At most `threads` requests run application code at once. Up to
+    `connection_limit` connections are accepted and parked in the I/O loop
+    (slow clients and keep-alives cost no thread); requests beyond the pool
+    queue until a thread frees up.
+    """
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.error("Threaded mode requires waitress: pip install -r requirements.txt")
+        sys.exit(1)
+
+    app = load_app()
+    listen = {'sockets': sockets} if sockets else {'host': options.host, 'port': options.port}
+    logger.info(f"Serving on http://{options.host}:{options.port} "
+                f"(threads={options.threads}, connection_limit={options.connection_limit})")
+    serve(app, **listen,
+          threads=options.threads,
+          connection_limit=options.connection_limit,
+          channel_timeout=options.channel_timeout,
+          backlog=options.backlog,
+          ident='SIBERINDO-BTS')
+
+
+def serve_prefork(options):
+    """Bind once, fork `workers` processes that each run the threaded server on that socket.
+
+    The app is imported after the fork, so every worker has its own database
+    connections and threads. One worker wins the owner election (see
+    modules.coordinator) and runs the singletons; the master only restarts
+    workers that die and forwards SIGTERM/SIGINT to them.
+    """
+    # Every worker rotates its own file: a shared file renamed by one worker is lost to the others
+    from modules.log_pipeline import per_process_log_file
+    if Config.LOG_FILE and '{pid}' not in Config.LOG_FILE:
+        Config.LOG_FILE = per_process_log_file(Config.LOG_FILE)
+        logger.warning(f"LOG_FILE has no {{pid}} placeholder; prefork workers log to {Config.LOG_FILE}")
+
+    listener = socket.create_server((options.host, options.port), backlog=options.backlog)
+    listener.set_inheritable(True)
+    logger.info(f"Master {os.getpid()} listening on http://{options.host}:{options.port} "
+                f"with {options.workers} workers x {options.threads} threads")
+
+    workers = {}
+    stopping = []
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, _graceful_exit)
+            # Returns only by raising SystemExit, which unwinds out of the master's
+            # frames and runs this worker's atexit flushes on the way out
+            serve_threaded(options, sockets=[listener])
+            sys.exit(0)
+        workers[pid] = slot
+
+    def shutdown(signum, frame):
+        stopping.append(signum)
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for slot in range(options.workers):
+        spawn(slot)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = workers.pop(pid, None)
+        if slot is not None and not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(1)
+            spawn(slot)
+    listener.close()
+
+
+SERVING_MODES = {
+    'dev': serve_dev,
+    'threaded': serve_threaded,
+    'prefork': serve_prefork,
+}
+
+
+def _graceful_exit(signum, frame):
+    # Turn SIGTERM (docker stop) into a normal exit so atexit flushes buffered writes;
+    # ignore repeats (group-wide signal plus the master's forward) so the flush is not interrupted
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    sys.exit(0)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='SIBERINDO BTS GUI server')
+    parser.add_argument('--mode', choices=sorted(SERVING_MODES), default=Config.SERVER_MODE)
+    parser.add_argument('--host', default=Config.HOST)
+    parser.add_argument('--port', type=int, default=Config.PORT)
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS,
+                        help='worker processes (prefork mode)')
+    parser.add_argument('--threads', type=int, default=Config.SERVER_THREADS,
+                        help='worker threads per process (threaded/prefork mode)')
+    parser.add_argument('--connection-limit', type=int, default=Config.SERVER_CONNECTION_LIMIT,
+                        help='maximum open connections (threaded/prefork mode)')
+    parser.add_argument('--channel-timeout', type=int, default=Config.SERVER_CHANNEL_TIMEOUT,
+                        help='seconds before an idle connection is closed (threaded/prefork mode)')
+    parser.add_argument('--backlog', type=int, default=Config.SERVER_BACKLOG,
+                        help='listen socket backlog (threaded/prefork mode)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    signal.signal(signal.SIGTERM, _graceful_exit)
+
+    logger.info(f"Starting SIBERINDO BTS GUI in {options.mode} mode")
+    SERVING_MODES[options.mode](options)
+
+
+if __name__ == '__main__':
+    main()
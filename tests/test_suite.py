@@ -2,15 +2,42 @@
 import unittest
 import sys
 import os
+import io
+import json
+import shutil
+import tempfile
+import time
 from datetime import datetime
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Cheap password hashing so login tests don't spend seconds in PBKDF2
+os.environ.setdefault('PASSWORD_HASH_ITERATIONS', '1000')
+
 import app as app_module
 from modules import database, sms_manager, subscribers
 from modules.validators import DataValidator, ValidationError, RateLimiter
 from modules.middleware import APIResponse
+from modules import middleware
+from modules.subscriber_import import SubscriberImporter
+from modules.presence import PresenceTracker
+from modules.write_buffer import WriteBehindBuffer
+from modules.retention import RetentionManager, RetentionPolicy
+from modules.network_events import NetworkEventAggregator, encode_cursor, decode_cursor, parse_time
+from modules.shared_state import OwnerLock, SharedSnapshot
+from modules.coordinator import Coordinator
+from modules.startup import StartupSequence
+from modules.health import HealthMonitor, InFlightCounter, queue_check, requests_check
+from modules.metrics import MetricsRegistry
+from modules.query_profiler import QueryProfiler, query_profiler, fingerprint
+from modules import sampling_profiler
+from modules.rate_limit import SlidingWindowLimiter, rate_limiter
+from modules import auth
+from modules.metrics import cache_requests
+from modules import users
+from modules.log_pipeline import (NonBlockingQueueHandler, DuplicateFilter, SizedTimedRotatingFileHandler,
+                                  JsonFormatter, per_process_log_file)
 
 
 class TestDatabaseOperations(unittest.TestCase):
@@ -247,6 +274,1296 @@ class TestSubscriberManager(unittest.TestCase):
         self.assertIn('active_subscribers', stats)
 
 
+class TestSubscriberSearch(unittest.TestCase):
+    """Test indexed subscriber search"""
+    
+    def setUp(self):
+        """Setup isolated database"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = database.BTSDatabase(db_path=os.path.join(self.tmpdir, 'test.db'))
+        self.db.add_subscriber('510101234500001', msisdn='6281200000001', location='Jakarta')
+        self.db.add_subscriber('510101234500002', msisdn='6281200000002', location='Bandung')
+        self.db.add_subscriber('510109999900003', msisdn='6285500000003', location='Jakarta')
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_imsi_prefix_search(self):
+        """Test IMSI prefix lookup"""
+        results = self.db.search_subscribers(imsi_prefix='5101012345')
+        self.assertEqual([r['imsi'] for r in results], ['510101234500001', '510101234500002'])
+    
+    def test_msisdn_exact_with_location(self):
+        """Test exact MSISDN lookup combined with a location filter"""
+        self.assertEqual(len(self.db.search_subscribers(msisdn='6285500000003', location='Jakarta')), 1)
+        self.assertEqual(len(self.db.search_subscribers(msisdn='6285500000003', location='Bandung')), 0)
+    
+    def test_search_uses_index(self):
+        """Test prefix lookup is served by an index rather than a table scan"""
+        conn = self.db.get_connection()
+        try:
+            plan = ' '.join(row[3] for row in conn.execute(
+                'EXPLAIN QUERY PLAN SELECT * FROM subscribers WHERE msisdn >= ? AND msisdn < ? ORDER BY msisdn',
+                ('62812', '62813')))
+        finally:
+            conn.close()
+        self.assertIn('idx_subscribers_msisdn', plan)
+    
+    def test_search_endpoint_rejects_bad_imsi(self):
+        """Test search endpoint validation"""
+        client = app_module.app.test_client()
+        with client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['username'] = 'operator'
+            sess['role'] = 'operator'
+        response = client.get('/subscribers/api/subscribers/search?imsi=123')
+        self.assertEqual(response.status_code, 400)
+
+
+class TestSubscriberImport(unittest.TestCase):
+    """Test bulk subscriber import/upsert"""
+    
+    def setUp(self):
+        """Setup isolated database"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = database.BTSDatabase(db_path=os.path.join(self.tmpdir, 'test.db'))
+        self.importer = SubscriberImporter(self.db, chunk_size=2)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_csv_upsert_and_error_report(self):
+        """Test CSV import inserts, updates and reports bad rows"""
+        self.db.add_subscriber('510100000000001', msisdn='6281000000001', name='Old Name')
+        payload = (
+            'imsi,msisdn,name,location\n'
+            '510100000000001,,New Name,Jakarta\n'
+            '510100000000002,6281000000002,Second,Bandung\n'
+            '12345,6281000000003,Bad IMSI,Medan\n'
+            '510100000000004,12,Bad MSISDN,Medan\n'
+        )
+        report = self.importer.import_stream(io.StringIO(payload), 'csv')
+        self.assertEqual(report['processed'], 4)
+        self.assertEqual(report['upserted'], 2)
+        self.assertEqual([e['row'] for e in report['errors']], [3, 4])
+        
+        updated = self.db.search_subscribers(imsi='510100000000001')[0]
+        self.assertEqual(updated['name'], 'New Name')
+        self.assertEqual(updated['msisdn'], '6281000000001')
+        self.assertEqual(self.db.get_subscribers_count(), 2)
+    
+    def test_ndjson_import(self):
+        """Test NDJSON import including malformed lines"""
+        payload = '{"imsi": "510100000000009", "status": "inactive"}\nnot json\n'
+        report = self.importer.import_bytes(io.BytesIO(payload.encode()), 'ndjson')
+        self.assertEqual(report['upserted'], 1)
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(self.db.search_subscribers(imsi='510100000000009')[0]['status'], 'inactive')
+    
+    def test_detect_format(self):
+        """Test import format detection"""
+        self.assertEqual(SubscriberImporter.detect_format('sims.ndjson'), 'ndjson')
+        self.assertEqual(SubscriberImporter.detect_format(content_type='application/x-ndjson'), 'ndjson')
+        self.assertEqual(SubscriberImporter.detect_format('sims.csv'), 'csv')
+
+
+class TestSubscriberCounters(unittest.TestCase):
+    """Test materialized subscriber counters"""
+    
+    def setUp(self):
+        """Setup isolated database"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = database.BTSDatabase(db_path=os.path.join(self.tmpdir, 'test.db'))
+        self.db.add_subscriber('510100000000001', location='Jakarta')
+        self.db.add_subscriber('510100000000002', location='Jakarta', network='LTE')
+        self.db.add_subscriber('510100000000003')
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_counters_follow_writes(self):
+        """Test insert, update, upsert and delete keep counters in sync"""
+        self.db.update_subscriber_status('510100000000001', 'inactive')
+        self.db.upsert_subscribers([('510100000000002', None, None, 'Bandung', None, None),
+                                    ('510100000000004', None, None, None, 'blocked', None)])
+        counters = self.db.get_subscriber_counters()
+        self.assertEqual(counters['total'], 4)
+        self.assertEqual(counters['status'], {'active': 2, 'inactive': 1, 'blocked': 1})
+        self.assertEqual(counters['network'], {'GSM': 3, 'LTE': 1})
+        self.assertEqual(counters['location'], {'Jakarta': 1, 'Bandung': 1, 'unknown': 2})
+        
+        conn = self.db.get_connection()
+        conn.execute("DELETE FROM subscribers WHERE imsi = '510100000000004'")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.db.get_subscriber_counters()['status'].get('blocked'), None)
+        self.assertEqual(self.db.reconcile_subscriber_counters(), {})
+    
+    def test_reconcile_fixes_drift(self):
+        """Test reconciliation repairs corrupted counters"""
+        conn = self.db.get_connection()
+        conn.execute("UPDATE subscriber_counters SET count = 99 WHERE dimension = 'status' AND value = 'active'")
+        conn.commit()
+        conn.close()
+        drift = self.db.reconcile_subscriber_counters()
+        self.assertEqual(drift[('status', 'active')], (99, 3))
+        self.assertEqual(self.db.get_subscriber_counters()['total'], 3)
+
+
+class TestPresenceTracker(unittest.TestCase):
+    """Test in-memory subscriber presence tracking"""
+    
+    def setUp(self):
+        """Setup isolated database with a tracker listening to network events"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = database.BTSDatabase(db_path=os.path.join(self.tmpdir, 'test.db'))
+        self.tracker = PresenceTracker(self.db)
+        self.db.add_network_event_listener(self.tracker.on_network_event)
+        self.db.add_subscriber('510100000000001')
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_cell_attachment_follows_events(self):
+        """Test attach, handover and detach update the cell index"""
+        self.db.log_network_event('attach', imsi='510100000000001', cell_id='10', lac='1001')
+        self.db.log_network_event('attach', imsi='510100000000002', cell_id='10', lac='1001')
+        self.assertEqual(len(self.tracker.attached_to('10')), 2)
+        
+        self.db.log_network_event('location_update', imsi='510100000000001', cell_id='11', lac='1001')
+        self.db.log_network_event('detach', imsi='510100000000002', cell_id='10', lac='1001')
+        self.assertEqual(self.tracker.attached_to('10'), [])
+        self.assertEqual([p['imsi'] for p in self.tracker.attached_to('11')], ['510100000000001'])
+    
+    def test_seen_within(self):
+        """Test recent-sighting queries only walk recent entries"""
+        import time
+        self.tracker.record('510100000000003', '12', seen_at=time.time() - 3600)
+        self.tracker.record('510100000000001', '12')
+        self.assertEqual([p['imsi'] for p in self.tracker.seen_within(5)], ['510100000000001'])
+    
+    def test_flush_writes_behind(self):
+        """Test batched flush persists presence and last_seen"""
+        self.tracker.record('510100000000001', '12', '1001')
+        self.assertEqual(self.tracker.flush(), 1)
+        self.assertEqual(self.tracker.flush(), 0)
+        
+        reloaded = PresenceTracker(self.db)
+        self.assertEqual(reloaded.load(), 1)
+        self.assertEqual(reloaded.get('510100000000001')['cell_id'], '12')
+
+
+class TestWriteBehindBuffer(unittest.TestCase):
+    """Test write-behind buffering of log inserts"""
+    
+    def test_batches_by_count(self):
+        """Test rows are written in batches of max_batch"""
+        batches = []
+        buffer = WriteBehindBuffer('test', batches.append, max_batch=3, flush_interval=60)
+        for i in range(7):
+            buffer.put(i)
+        buffer.close()
+        self.assertEqual(sum(batches, []), list(range(7)))
+        self.assertTrue(all(len(b) <= 3 for b in batches))
+    
+    def test_backpressure_drops_when_full(self):
+        """Test bounded memory: a stalled flusher makes put() drop after block_timeout"""
+        import threading
+        release = threading.Event()
+        buffer = WriteBehindBuffer('test', lambda rows: release.wait(5), max_batch=1,
+                                   max_pending=2, block_timeout=0.05)
+        results = [buffer.put(i) for i in range(5)]
+        self.assertIn(False, results)
+        self.assertLessEqual(buffer.pending(), 2)
+        self.assertGreater(buffer.stats()['dropped'], 0)
+        release.set()
+        buffer.close()
+    
+    def test_late_put_writes_outside_the_lock(self):
+        """Test a direct write after close() does not block other producers"""
+        import threading
+        release = threading.Event()
+        written = []
+        
+        def slow_write(rows):
+            if rows == ['late']:
+                release.wait(5)
+            written.extend(rows)
+        
+        buffer = WriteBehindBuffer('test', slow_write, flush_interval=60)
+        buffer.close()
+        late = threading.Thread(target=buffer.put, args=('late',))
+        late.start()
+        time.sleep(0.05)
+        started = time.monotonic()
+        self.assertTrue(buffer.put('other'))
+        self.assertLess(time.monotonic() - started, 1)
+        release.set()
+        late.join()
+        self.assertEqual(sorted(written), ['late', 'other'])
+    
+    def test_buffered_database_logging(self):
+        """Test buffered logs are visible to readers and flushed on close"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            db = database.BTSDatabase(db_path=os.path.join(tmpdir, 'test.db'), buffered_logging=True,
+                                      log_buffer_options={'flush_interval': 60})
+            db.log_system_event('INFO', 'test', 'hello')
+            db.log_network_event('attach', imsi='510100000000001')
+            self.assertEqual(len(db.get_system_logs()), 1)
+            db.log_network_event('detach', imsi='510100000000001')
+            db.close()
+            self.assertEqual(len(database.BTSDatabase(db_path=db.db_path).get_network_events()), 2)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+class TestRetention(unittest.TestCase):
+    """Test event retention, rollup and archival"""
+    
+    def setUp(self):
+        """Setup isolated database with old and recent network events"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = database.BTSDatabase(db_path=os.path.join(self.tmpdir, 'test.db'))
+        rows = [('attach', '510100000000001', '10', '1001', None, '2020-01-01 10:15:00'),
+                ('attach', '510100000000002', '10', '1001', None, '2020-01-01 10:45:00'),
+                ('detach', '510100000000001', '10', '1001', None, '2020-01-02 08:00:00')]
+        self.db._insert_network_events(rows)
+        self.db.log_network_event('attach', imsi='510100000000003', cell_id='11')
+        self.manager = RetentionManager(self.db, batch_size=2, pause=0, policies={
+            'network_events': RetentionPolicy('network_events', 7, ('event_type', 'cell_id'))})
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_old_rows_are_archived_and_rolled_up(self):
+        """Test old rows leave the live table in batches with hourly rollups kept"""
+        self.assertEqual(self.manager.run_once(), {'network_events': 3})
+        self.assertEqual(len(self.db.get_network_events()), 1)
+        rollups = self.db.get_event_rollups('network_events')
+        self.assertEqual(rollups[0], {'bucket': '2020-01-01 10:00:00', 'dimensions': ['attach', '10'], 'count': 2})
+        self.assertEqual(self.manager.archive.days('network_events'), ['2020-01-02', '2020-01-01'])
+    
+    def test_queries_reach_archive_when_asked(self):
+        """Test existing query API transparently merges archived ranges"""
+        self.manager.run_once()
+        events = self.db.get_network_events(limit=10, include_archive=True)
+        self.assertEqual(len(events), 4)
+        self.assertEqual(events[-1]['timestamp'], '2020-01-01 10:15:00')
+        
+        attaches = self.db.get_network_events(event_type='attach', since='2020-01-01 10:30:00',
+                                              until='2020-01-02', include_archive=True)
+        self.assertEqual([e['imsi'] for e in attaches], ['510100000000002'])
+    
+    def test_failed_delete_is_not_archived_twice(self):
+        """Test a batch whose delete fails is archived again on re-run without duplicate events"""
+        conn = self.db.get_connection()
+        conn.execute("CREATE TRIGGER fail_delete BEFORE DELETE ON network_events "
+                     "BEGIN SELECT RAISE(ABORT, 'disk I/O error'); END")
+        conn.commit()
+        self.assertEqual(self.manager.run_once(), {'network_events': None})
+        self.assertEqual(len(self.db.get_network_events()), 4)
+        self.assertEqual(len(self.db.get_network_events(limit=10, include_archive=True)), 4)
+        self.assertEqual(self.db.get_event_rollups('network_events'), [])
+        conn.execute('DROP TRIGGER fail_delete')
+        conn.commit()
+        conn.close()
+        
+        self.assertEqual(self.manager.run_once(), {'network_events': 3})
+        archived = self.manager.archive.read('network_events', limit=10)
+        self.assertEqual(sorted(row['id'] for row in archived), sorted({row['id'] for row in archived}))
+        self.assertEqual(len(archived), 3)
+        self.assertEqual(len(self.db.get_network_events(limit=10, include_archive=True)), 4)
+        self.assertEqual(sum(r['count'] for r in self.db.get_event_rollups('network_events')), 3)
+
+
+class TestNetworkEvents(unittest.TestCase):
+    """Test network event pagination and bucketed aggregations"""
+    
+    def setUp(self):
+        """Setup isolated database with events across two minutes"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = database.BTSDatabase(db_path=os.path.join(self.tmpdir, 'test.db'))
+        self.db._insert_network_events([
+            ('attach', '510100000000001', '10', '1001', None, '2024-01-01 10:00:05'),
+            ('attach', '510100000000002', '10', '1001', None, '2024-01-01 10:00:30'),
+            ('location_update', '510100000000001', '11', '1001', None, '2024-01-01 10:00:30'),
+            ('detach', '510100000000002', '10', '1001', None, '2024-01-01 10:01:10'),
+        ])
+        self.aggregator = NetworkEventAggregator(self.db)
+        self.since = datetime(2024, 1, 1, 10, 0)
+        self.until = datetime(2024, 1, 1, 10, 2)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_cursor_pagination(self):
+        """Test keyset pages cover every event once, newest first"""
+        seen = []
+        before = None
+        while True:
+            page = self.db.query_network_events(before=before, limit=2)
+            if not page:
+                break
+            seen.extend(e['id'] for e in page)
+            before = decode_cursor(encode_cursor(page[-1]))
+        self.assertEqual(seen, [4, 3, 2, 1])
+        self.assertEqual(len(self.db.query_network_events(imsi='510100000000001', cell_id='11')), 1)
+    
+    def test_aggregations(self):
+        """Test per-minute, top IMSI and attach/detach aggregations"""
+        per_minute = self.aggregator.events_per_minute(self.since, self.until)['series']
+        self.assertIn({'minute': '2024-01-01 10:00', 'cell_id': '10', 'count': 2}, per_minute)
+        
+        top = self.aggregator.top_imsis(self.since, self.until)['top']
+        self.assertEqual(top[0]['count'], 2)
+        
+        rates = self.aggregator.attach_detach_rates(self.since, self.until)
+        self.assertEqual(rates['totals'], {'attach': 3, 'detach': 1})
+    
+    def test_closed_buckets_are_cached(self):
+        """Test closed buckets are served from cache while open buckets recompute"""
+        self.aggregator.events_per_minute(self.since, self.until)
+        self.db._insert_network_events([('attach', '510100000000003', '10', '1001', None, '2024-01-01 10:00:40')])
+        series = self.aggregator.events_per_minute(self.since, self.until)['series']
+        self.assertIn({'minute': '2024-01-01 10:00', 'cell_id': '10', 'count': 2}, series)
+        
+        open_now = datetime(2024, 1, 1, 10, 0, 50)
+        _, _, buckets = self.aggregator.counts('open', 'minute', 'cell_id', self.since, self.until, now=open_now)
+        self.assertEqual(buckets['2024-01-01 10:00']['10'], 3)
+    
+    def test_offset_times_are_converted_to_utc(self):
+        """Test times with a UTC offset filter the same window as their UTC equivalent"""
+        self.assertEqual(parse_time('2024-01-01T17:00:20+07:00'), datetime(2024, 1, 1, 10, 0, 20))
+        self.assertEqual(parse_time('2024-01-01 17:00:20 07:00'), datetime(2024, 1, 1, 10, 0, 20))
+        self.assertEqual(parse_time('2024-01-01T10:00:20Z'), datetime(2024, 1, 1, 10, 0, 20))
+        self.assertEqual(parse_time('2024-01-01 10:00'), datetime(2024, 1, 1, 10, 0))
+        events = self.db.query_network_events(since=parse_time('2024-01-01T17:00:20+07:00'),
+                                              until=parse_time('2024-01-01T05:01:00-05:00'))
+        self.assertEqual(sorted(e['event_type'] for e in events), ['attach', 'location_update'])
+
+
+class TestProcessCoordination(unittest.TestCase):
+    """Test owner election, shared snapshot and command routing"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_owner_lock_is_exclusive(self):
+        """Test only one holder of the owner lock at a time"""
+        path = os.path.join(self.tmpdir, 'owner.lock')
+        first, second = OwnerLock(path), OwnerLock(path)
+        self.assertTrue(first.try_acquire())
+        self.assertFalse(second.try_acquire())
+        first.release()
+        self.assertTrue(second.try_acquire())
+        second.release()
+    
+    def test_snapshot_round_trip(self):
+        """Test readers see the latest complete document"""
+        path = os.path.join(self.tmpdir, 'state.mmap')
+        reader = SharedSnapshot(path)
+        self.assertIsNone(reader.read())
+        writer = SharedSnapshot(path, size=4096).open_writer()
+        writer.write({'cpu': 10})
+        self.assertEqual(reader.read(), {'cpu': 10})
+        writer.write({'cpu': 20, 'scan': {'progress': 50}})
+        self.assertEqual(reader.read()['scan']['progress'], 50)
+        with self.assertRaises(ValueError):
+            writer.write({'blob': 'x' * 8192})
+        writer.close()
+        reader.close()
+    
+    def test_worker_reads_state_and_calls_owner(self):
+        """Test a worker reads owner-published state and routes commands to the owner"""
+        owner = Coordinator(self.tmpdir)
+        worker = Coordinator(self.tmpdir, poll_interval=60)
+        for coordinator in (owner, worker):
+            coordinator.register_state('counter', lambda: {'pid': os.getpid(), 'owner': True}, interval=0.1)
+            coordinator.register_command('add', lambda a, b: a + b)
+        owner.start()
+        worker.start()
+        try:
+            self.assertTrue(owner.is_owner)
+            self.assertFalse(worker.is_owner)
+            for _ in range(50):
+                if worker.get_state('counter'):
+                    break
+                time.sleep(0.05)
+            self.assertEqual(worker.get_state('counter'), {'pid': os.getpid(), 'owner': True})
+            self.assertEqual(worker.call('add', a=2, b=3), 5)
+            self.assertEqual(worker.status()['role'], 'worker')
+        finally:
+            worker.stop()
+            owner.stop()
+
+
+class TestStartup(unittest.TestCase):
+    """Test deferred startup work"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_deferred_schema_created_on_first_use(self):
+        """Test a deferred database creates its schema on first connection"""
+        path = os.path.join(self.tmpdir, 'data', 'test.db')
+        test_db = database.BTSDatabase(db_path=path, defer_schema=True)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(test_db.get_subscribers_count(), 0)
+        self.assertTrue(os.path.exists(path))
+    
+    def test_startup_modes(self):
+        """Test eager runs steps inline, warmup in the background and lazy not at all"""
+        for mode, expected in (('eager', ['a', 'b']), ('warmup', ['a', 'b']), ('lazy', [])):
+            ran = []
+            startup = StartupSequence(mode)
+            startup.add('a', lambda: ran.append('a'))
+            startup.add('b', lambda: ran.append('b'))
+            startup.start()
+            self.assertTrue(startup.wait(5))
+            self.assertEqual(ran, expected)
+        with self.assertRaises(ValueError):
+            StartupSequence('sometimes')
+    
+    def test_presence_load_keeps_newer_sightings(self):
+        """Test a late presence load never overrides a live sighting"""
+        test_db = database.BTSDatabase(db_path=os.path.join(self.tmpdir, 'test.db'))
+        test_db.save_presence([('510100000000001', '10', '1001', datetime.now(), 1)])
+        tracker = PresenceTracker(test_db)
+        tracker.record('510100000000001', cell_id='20', lac='1002')
+        tracker.ensure_loaded()
+        self.assertEqual(tracker.get('510100000000001')['cell_id'], '20')
+        self.assertEqual(tracker.stats()['pending_flush'], 1)
+
+
+class TestHealthProbes(unittest.TestCase):
+    """Test liveness/readiness probes"""
+    
+    def setUp(self):
+        self.app = app_module.app
+        self.client = self.app.test_client()
+    
+    def test_probe_endpoints(self):
+        """Test /livez and /readyz answer without a session"""
+        response = self.client.get('/livez')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/readyz')
+        self.assertIn(response.status_code, (200, 503))
+        data = response.get_json()
+        self.assertIn('database', data['checks'])
+        self.assertIn('queues', data['checks'])
+    
+    def test_checks_are_cached(self):
+        """Test a check runs once per ttl and only gating checks affect readiness"""
+        calls = []
+        monitor = HealthMonitor()
+        monitor.register('slow', lambda: calls.append(1) or {'status': 'ok'}, ttl=60)
+        monitor.register('info', lambda: {'status': 'fail'}, readiness=False)
+        for _ in range(5):
+            ready, checks = monitor.readiness()
+        self.assertTrue(ready)
+        self.assertEqual(len(calls), 1)
+        monitor.register('broken', lambda: 1 / 0)
+        ready, checks = monitor.readiness()
+        self.assertFalse(ready)
+        self.assertEqual(checks['broken']['status'], 'fail')
+    
+    def test_saturation_fails_readiness(self):
+        """Test full write buffers and a busy thread pool report failure"""
+        buffer = WriteBehindBuffer('test', lambda rows: None, max_pending=10)
+        for i in range(9):
+            buffer._pending.append({'i': i})
+        self.assertEqual(queue_check([buffer], high_water=0.8)['status'], 'fail')
+        self.assertEqual(queue_check([buffer], high_water=0.95)['status'], 'ok')
+        
+        counter = InFlightCounter()
+        for _ in range(4):
+            counter.enter()
+        self.assertEqual(requests_check(counter, capacity=8)['status'], 'ok')
+        for _ in range(4):
+            counter.enter()
+        self.assertEqual(requests_check(counter, capacity=8)['status'], 'fail')
+
+
+class TestMetrics(unittest.TestCase):
+    """Test metrics recording and Prometheus exposition"""
+    
+    def setUp(self):
+        self.app = app_module.app
+        self.client = self.app.test_client()
+    
+    def test_histogram_and_counter_render(self):
+        """Test cumulative buckets, sums and counters in text format"""
+        registry = MetricsRegistry(prefix='test_')
+        latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+        hits = registry.counter('hits_total', 'Hits', ('cache',))
+        for value in (0.05, 0.5, 5.0):
+            latency.observe(value, ('/a',))
+        hits.inc(('x',))
+        hits.inc(('x',), 2)
+        text = registry.render()
+        self.assertIn('test_latency_seconds_bucket{route="/a",le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{route="/a",le="1"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{route="/a",le="+Inf"} 3', text)
+        self.assertIn('test_latency_seconds_count{route="/a"} 3', text)
+        self.assertIn('test_hits_total{cache="x"} 3', text)
+    
+    def test_concurrent_updates_are_not_lost(self):
+        """Test per-thread shards count every update without locks"""
+        import threading
+        registry = MetricsRegistry(prefix='test_')
+        counter = registry.counter('events_total', 'Events')
+        threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(10000)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.value(), 80000)
+    
+    def test_metrics_endpoint(self):
+        """Test /metrics exposes request and query metrics"""
+        self.client.get('/livez')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/plain', response.content_type)
+        text = response.get_data(as_text=True)
+        self.assertIn('bts_http_request_duration_seconds_count{endpoint="health.livez",method="GET",status="200"}', text)
+        self.assertIn('bts_http_requests_in_flight', text)
+
+
+class TestQueryProfiler(unittest.TestCase):
+    """Test SQL query profiling and the slow-query log"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.client = app_module.app.test_client()
+    
+    def tearDown(self):
+        query_profiler.configure(enabled=False, slow_ms=100)
+        query_profiler.reset()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_fingerprint_normalizes_literals(self):
+        """Test literals and lists collapse to one fingerprint"""
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE a = 5 AND b = 'x'"),
+                         fingerprint("SELECT *  FROM t\n WHERE a = 17 AND b = 'it''s'"))
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (?, ?, ?)'),
+                         'SELECT * FROM t WHERE id IN (...)')
+        self.assertEqual(fingerprint('SELECT * FROM cell_2g'), 'SELECT * FROM cell_2g')
+    
+    def test_profiled_queries_and_slow_log(self):
+        """Test statements aggregate by fingerprint with rows, and slow ones capture a plan"""
+        test_db = database.BTSDatabase(db_path=os.path.join(self.tmpdir, 'test.db'))
+        query_profiler.reset()
+        query_profiler.configure(enabled=True, slow_ms=0)
+        for i in range(3):
+            test_db.add_subscriber(f'51010000000000{i}', f'62812000000{i}')
+        self.assertEqual(len(test_db.get_subscribers()), 3)
+        report = query_profiler.report()
+        inserts = [row for row in report['fingerprints'] if row['fingerprint'].startswith('INSERT INTO subscribers')]
+        self.assertEqual(inserts[0]['count'], 3)
+        selects = [row for row in report['fingerprints'] if row['fingerprint'].startswith('SELECT * FROM subscribers')]
+        self.assertEqual(selects[0]['rows'], 3)
+        self.assertTrue(any(entry['plan'] for entry in report['slow_queries']))
+    
+    def test_debug_queries_requires_admin(self):
+        """Test the report is administrator-only"""
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['username'] = 'operator'
+            sess['role'] = 'operator'
+        self.assertEqual(self.client.get('/debug/queries').status_code, 302)
+        with self.client.session_transaction() as sess:
+            sess['username'] = 'admin'
+            sess['role'] = 'administrator'
+        response = self.client.get('/debug/queries?sort=count')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('fingerprints', response.get_json())
+        self.assertEqual(self.client.get('/debug/queries?sort=bogus').status_code, 400)
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test on-demand sampling profiles"""
+    
+    def _busy_route(self, route, stop):
+        sampling_profiler.tag_request(route)
+        try:
+            while not stop.is_set():
+                sum(range(1000))
+        finally:
+            sampling_profiler.untag_request()
+    
+    def test_samples_are_tagged_by_route(self):
+        """Test only tagged request threads are sampled and can be filtered by route"""
+        import threading
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._busy_route, args=(route, stop))
+                   for route in ('/a', '/b')]
+        for thread in threads:
+            thread.start()
+        try:
+            profiler = sampling_profiler.SamplingProfiler()
+            stacks, info = profiler.capture(0.3, interval=0.01)
+            self.assertEqual(set(sampling_profiler.routes_summary(stacks)), {'/a', '/b'})
+            stacks, info = profiler.capture(0.3, interval=0.01, route='/a')
+            self.assertGreater(info['samples'], 0)
+            self.assertTrue(all(stack.startswith('/a;') for stack in stacks))
+            self.assertIn('_busy_route', sampling_profiler.collapsed(stacks))
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+    
+    def test_flamegraph_svg(self):
+        """Test the flame graph is well-formed SVG with a background plus one box per frame"""
+        from xml.dom import minidom
+        from collections import Counter
+        stacks = Counter({'/a;main;work': 3, '/a;main;idle <x>': 1})
+        svg = sampling_profiler.flamegraph_svg(stacks, title='test')
+        document = minidom.parseString(svg)
+        self.assertEqual(len(document.getElementsByTagName('rect')), 1 + 5)
+    
+    def test_profile_endpoint_requires_admin(self):
+        """Test the profile endpoint rejects non-admins and bad formats"""
+        client = app_module.app.test_client()
+        with client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['username'] = 'operator'
+            sess['role'] = 'operator'
+        self.assertEqual(client.get('/debug/profile?seconds=0.1').status_code, 302)
+        with client.session_transaction() as sess:
+            sess['username'] = 'admin'
+            sess['role'] = 'administrator'
+        self.assertEqual(client.get('/debug/profile?format=pdf').status_code, 400)
+        response = client.get('/debug/profile?seconds=0.1&format=collapsed')
+        self.assertEqual(response.status_code, 200)
+
+
+class TestRequestContext(unittest.TestCase):
+    """Test per-request context isolation and request id propagation"""
+    
+    def tearDown(self):
+        middleware.cleanup_request_context()
+    
+    def test_contexts_are_isolated_between_threads(self):
+        """Test concurrent requests never see each other's context"""
+        import threading
+        barrier = threading.Barrier(2)
+        seen = {}
+        
+        def handle(name):
+            middleware.init_request_context(name)
+            barrier.wait()
+            seen[name] = middleware.get_request_id()
+            middleware.cleanup_request_context()
+        
+        threads = [threading.Thread(target=handle, args=(name,)) for name in ('req-a', 'req-b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(seen, {'req-a': 'req-a', 'req-b': 'req-b'})
+    
+    def test_spawned_threads_and_log_records_carry_request_id(self):
+        """Test background threads inherit the id and log records are tagged"""
+        import logging
+        middleware.init_request_context('parent-1')
+        seen = []
+        middleware.spawn_thread(lambda: seen.append(middleware.get_request_id())).join()
+        self.assertEqual(seen, ['parent-1'])
+        record = logging.LogRecord('test', logging.INFO, __file__, 0, 'message', None, None)
+        middleware.RequestIdFilter().filter(record)
+        self.assertEqual(record.request_id, 'parent-1')
+        middleware.cleanup_request_context()
+        middleware.RequestIdFilter().filter(record)
+        self.assertEqual(record.request_id, '-')
+    
+    def test_request_id_header(self):
+        """Test a valid incoming X-Request-ID is echoed and an invalid one replaced"""
+        client = app_module.app.test_client()
+        response = client.get('/livez', headers={'X-Request-ID': 'abc-123'})
+        self.assertEqual(response.headers['X-Request-ID'], 'abc-123')
+        response = client.get('/livez', headers={'X-Request-ID': 'bad id; drop'})
+        self.assertRegex(response.headers['X-Request-ID'], r'^[0-9a-f]{16}$')
+
+
+class TestLogPipeline(unittest.TestCase):
+    """Test the queued logging pipeline"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        middleware.cleanup_request_context()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def make_record(self, msg, args=None, lineno=1, exc_info=None):
+        import logging
+        return logging.LogRecord('test', logging.WARNING, __file__, lineno, msg, args, exc_info)
+    
+    def test_queue_handler_never_blocks(self):
+        """Test records are prepared on the caller, tagged with the request id, and dropped when full"""
+        import queue
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+        handler.addFilter(middleware.RequestIdFilter())
+        middleware.init_request_context('log-req-1')
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            handler.handle(self.make_record('failed %s', ('op',), exc_info=sys.exc_info()))
+        for _ in range(3):
+            handler.handle(self.make_record('filler'))
+        self.assertEqual(handler.dropped, 2)
+        record = handler.queue.get_nowait()
+        self.assertEqual((record.msg, record.args), ('failed op', None))
+        self.assertEqual(record.request_id, 'log-req-1')
+        self.assertIsNone(record.exc_info)
+        self.assertIn('ValueError: boom', record.exc_text)
+    
+    def test_duplicate_filter(self):
+        """Test only exact repeats beyond the burst are suppressed and counted once the window ends"""
+        duplicate_filter = DuplicateFilter(window=0.05, burst=2)
+        passed = [duplicate_filter.filter(self.make_record('same')) for _ in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+        distinct = [duplicate_filter.filter(self.make_record(f'GET /page/{i} - IP: 10.0.0.{i}')) for i in range(8)]
+        self.assertEqual(distinct, [True] * 8)
+        time.sleep(0.06)
+        record = self.make_record('same')
+        self.assertTrue(duplicate_filter.filter(record))
+        self.assertIn('suppressed 3 identical messages', record.getMessage())
+        self.assertEqual(duplicate_filter.suppressed, 3)
+    
+    def test_per_process_log_file(self):
+        """Test prefork log paths get a {pid} placeholder unless they have one or log to the console"""
+        self.assertEqual(per_process_log_file('logs/bts_system.log'), 'logs/bts_system_{pid}.log')
+        self.assertEqual(per_process_log_file('logs/w{pid}.log'), 'logs/w{pid}.log')
+        self.assertEqual(per_process_log_file(''), '')
+    
+    def test_rotation_and_json_output(self):
+        """Test the file handler rotates on size and on its interval, writing JSON lines"""
+        import json
+        path = os.path.join(self.tmpdir, 'app.log')
+        handler = SizedTimedRotatingFileHandler(path, max_bytes=300, backup_count=2, interval=3600)
+        handler.setFormatter(JsonFormatter())
+        for _ in range(6):
+            handler.handle(self.make_record('x' * 60))
+        self.assertTrue(os.path.exists(path + '.1'))
+        self.assertFalse(os.path.exists(path + '.3'))
+        handler.rollover_at = time.time() - 1
+        handler.handle(self.make_record('after interval'))
+        handler.close()
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        entry = json.loads(lines[0])
+        self.assertEqual((entry['level'], entry['message']), ('WARNING', 'after interval'))
+
+
+class TestSlidingWindowLimiter(unittest.TestCase):
+    """Test the sliding-window rate limiter and its decorator"""
+    
+    def setUp(self):
+        self.now = [1000.0]
+        self.limiter = SlidingWindowLimiter(max_keys=3, clock=lambda: self.now[0])
+    
+    def tearDown(self):
+        rate_limiter.reset()
+    
+    def test_sliding_window_weights_previous_window(self):
+        """Test the previous window's count fades out as the window slides"""
+        results = [self.limiter.hit_local('k', 4, 10)[0] for _ in range(5)]
+        self.assertEqual(results, [True, True, True, True, False])
+        self.now[0] = 1011.0   # previous window's 4 hits still count 90%
+        allowed, retry_after = self.limiter.hit_local('k', 4, 10)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 1.5)
+        self.now[0] = 1015.0   # 50% -> 2 weighted hits, room for 2 more
+        self.assertEqual([self.limiter.hit_local('k', 4, 10)[0] for _ in range(3)], [True, True, False])
+        self.assertEqual(self.limiter.remaining('k', 4, 10), 0)
+    
+    def test_idle_keys_are_evicted(self):
+        """Test keys are evicted after two idle windows and capped at max_keys"""
+        for key in ('a', 'b', 'c', 'd'):
+            self.limiter.hit_local(key, 5, 10)
+        self.assertEqual(self.limiter.stats()['keys'], 3)
+        self.now[0] = 1030.0
+        self.limiter.hit_local('e', 5, 10)
+        self.assertEqual(self.limiter.stats()['keys'], 1)
+        self.assertEqual(self.limiter.evicted, 4)
+    
+    def test_login_api_is_limited(self):
+        """Test the login API answers 429 with Retry-After once the limit is reached"""
+        import threading
+        client = app_module.app.test_client()
+        statuses = []
+        lock = threading.Lock()
+        
+        def attempt():
+            response = client.post('/auth/api/auth/login', json={'username': 'nobody', 'password': 'x'})
+            with lock:
+                statuses.append(response)
+        
+        threads = [threading.Thread(target=attempt) for _ in range(app_module.app.config['LOGIN_RATE_LIMIT'] + 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        codes = sorted(response.status_code for response in statuses)
+        self.assertEqual(codes.count(401), app_module.app.config['LOGIN_RATE_LIMIT'])
+        self.assertEqual(codes.count(429), 2)
+        limited = next(response for response in statuses if response.status_code == 429)
+        self.assertGreaterEqual(int(limited.headers['Retry-After']), 1)
+
+
+class TestTokenCache(unittest.TestCase):
+    """Test the verified-token cache and stateless Bearer authentication"""
+    
+    def setUp(self):
+        self.now = [1000.0]
+        self.cache = auth.TokenCache(max_size=2, clock=lambda: self.now[0])
+    
+    def tearDown(self):
+        auth.token_cache.clear()
+    
+    def test_entries_expire_with_the_token(self):
+        """Test a cached payload is served until its exp claim, then dropped"""
+        self.cache.put('token-a', {'username': 'admin', 'exp': 1010})
+        self.assertEqual(self.cache.get('token-a')['username'], 'admin')
+        self.assertIsNone(self.cache.get('token-b'))
+        self.now[0] = 1010.0
+        self.assertIsNone(self.cache.get('token-a'))
+        self.assertEqual(len(self.cache), 0)
+    
+    def test_bounded_with_expiry_sweep(self):
+        """Test the cache drops expired entries first and least recently used ones when full"""
+        self.cache.put('short', {'exp': 1005})
+        self.cache.put('long-1', {'exp': 2000})
+        self.now[0] = 1006.0
+        self.cache.put('long-2', {'exp': 2000})
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNotNone(self.cache.get('long-1'))
+        self.cache.put('long-3', {'exp': 2000})
+        self.assertIsNone(self.cache.get('long-2'))
+        self.assertIsNotNone(self.cache.get('long-1'))
+    
+    def test_bearer_requests_are_stateless(self):
+        """Test Bearer clients are verified once, never get a session cookie, and bad tokens get 401"""
+        client = app_module.app.test_client()
+        headers = {'Authorization': f"Bearer {auth.generate_token('operator')}"}
+        hits = cache_requests.value(('jwt', 'hit'))
+        for _ in range(3):
+            response = client.get('/sms/api/sms/history?limit=1', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Set-Cookie', response.headers)
+        self.assertEqual(cache_requests.value(('jwt', 'hit')) - hits, 2)
+        response = client.get('/sms/api/sms/history', headers={'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(response.status_code, 401)
+
+
+class TestUserStore(unittest.TestCase):
+    """Test the database-backed user store and login verification"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = database.BTSDatabase(db_path=os.path.join(self.tmpdir, 'users.db'))
+        self.store = users.UserStore(self.db, ttl=60)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_salted_hashes_and_legacy_upgrade(self):
+        """Test hashes are salted per user and legacy SHA-256 hashes are upgraded on login"""
+        first, second = users.hash_password('secret'), users.hash_password('secret')
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith('pbkdf2_sha256$'))
+        self.assertEqual(users.check_password('secret', first), (True, False))
+        self.assertEqual(users.check_password('wrong', first), (False, False))
+        import hashlib
+        self.db.add_users([{'username': 'legacy', 'password_hash': hashlib.sha256(b'old-pass').hexdigest(),
+                            'role': 'operator', 'full_name': 'Legacy', 'email': None}])
+        self.assertIsNotNone(self.store.authenticate('legacy', 'old-pass'))
+        self.assertTrue(self.db.get_user('legacy')['password_hash'].startswith('pbkdf2_sha256$'))
+        self.assertIsNotNone(self.store.authenticate('legacy', 'old-pass'))
+        self.assertIsNone(self.store.authenticate('legacy', 'wrong'))
+    
+    def test_lookup_cache_invalidated_on_change(self):
+        """Test lookups are cached and a password change is visible at once"""
+        admin = self.store.get('admin')
+        self.assertEqual((admin['role'], admin['permissions']), ('administrator', ['all']))
+        self.assertIs(self.store.get('admin'), admin)
+        self.assertIsNone(self.store.get('ghost'))
+        self.store.set_password('admin', 'n3w-password')
+        self.assertIsNone(self.store.authenticate('admin', 'password123'))
+        self.assertIsNotNone(self.store.authenticate('admin', 'n3w-password'))
+    
+    def test_login_pool_rejects_when_saturated(self):
+        """Test logins beyond the pool and its queue fail fast, and the API login works"""
+        import threading
+        release = threading.Event()
+        
+        class SlowStore:
+            def authenticate(self, username, password):
+                release.wait(5)
+                return {'username': username}
+        
+        verifier = users.LoginVerifier(SlowStore(), workers=1, max_pending=0)
+        worker = threading.Thread(target=verifier.verify, args=('a', 'b'))
+        worker.start()
+        time.sleep(0.05)
+        with self.assertRaises(users.LoginBusy):
+            verifier.verify('c', 'd')
+        release.set()
+        worker.join()
+        self.assertEqual(verifier.verify('e', 'f'), {'username': 'e'})
+        
+        client = app_module.app.test_client()
+        response = client.post('/auth/api/auth/login', json={'username': 'admin', 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['token'])
+    
+    def test_login_timeout_is_busy_and_cancels_queued_check(self):
+        """Test a check still queued at the timeout raises LoginBusy and never runs"""
+        import threading
+        release = threading.Event()
+        calls = []
+        
+        class SlowStore:
+            def authenticate(self, username, password):
+                calls.append(username)
+                release.wait(5)
+                return {'username': username}
+        
+        verifier = users.LoginVerifier(SlowStore(), workers=1, max_pending=1, timeout=0.1)
+        worker = threading.Thread(target=lambda: self.assertRaises(users.LoginBusy, verifier.verify, 'a', 'b'))
+        worker.start()
+        time.sleep(0.02)
+        with self.assertRaises(users.LoginBusy):
+            verifier.verify('c', 'd')
+        worker.join()
+        release.set()
+        self.assertEqual(verifier.verify('e', 'f'), {'username': 'e'})
+        self.assertEqual(calls, ['a', 'e'])
+        self.assertEqual(verifier.rejected, 2)
+
+
+class TestRBAC(unittest.TestCase):
+    """Test the compiled permission masks and access decorators"""
+    
+    def test_masks(self):
+        """Test role defaults, per-user permissions and the 'all' permission compile to the right bits"""
+        from modules import rbac
+        viewer = rbac.user_mask('viewer')
+        self.assertTrue(rbac.has_permissions(viewer, rbac.permission_mask(['dashboard'])))
+        self.assertFalse(rbac.has_permissions(viewer, rbac.permission_mask(['dashboard', 'subscribers'])))
+        extended = rbac.user_mask('viewer', ['subscribers'])
+        self.assertTrue(rbac.has_permissions(extended, rbac.permission_mask(['dashboard', 'subscribers'])))
+        admins = rbac.role_mask(['administrator'])
+        self.assertFalse(rbac.has_role(rbac.user_mask('operator'), admins))
+        self.assertTrue(rbac.has_role(rbac.user_mask('operator', ['all']), admins))
+        self.assertIs(rbac.user_mask('viewer', ['subscribers']), extended)
+        self.assertEqual(rbac.describe(viewer)['permissions'], ['dashboard', 'network'])
+        with self.assertRaises(ValueError):
+            rbac.role_mask(['root'])
+    
+    def test_page_and_api_routes_checked_uniformly(self):
+        """Test a viewer is redirected from pages and gets 403 from APIs of modules it lacks"""
+        client = app_module.app.test_client()
+        with client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['username'] = 'viewer1'
+            sess['role'] = 'viewer'
+        self.assertEqual(client.get('/subscribers/subscribers').status_code, 302)
+        response = client.get('/subscribers/api/subscribers/count')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(client.get('/network/api/network/events').status_code, 200)
+    
+    def test_bearer_token_uses_stored_permissions(self):
+        """Test a Bearer client gets its stored user's mask and anonymous API calls get 401"""
+        client = app_module.app.test_client()
+        headers = {'Authorization': f"Bearer {auth.generate_token('operator')}"}
+        self.assertEqual(client.get('/subscribers/api/subscribers/count', headers=headers).status_code, 200)
+        self.assertEqual(client.get('/debug/queries', headers=headers).status_code, 302)
+        with app_module.app.test_request_context('/subscribers/api/subscribers/count'):
+            self.assertEqual(auth.current_mask(), 0)
+            self.assertEqual(auth._access_denied()[1], 401)
+
+
+class TestSchemaValidation(unittest.TestCase):
+    """Test compiled request schemas and the SMS endpoints that use them"""
+    
+    def test_schema_cleans_and_collects_all_errors(self):
+        """Test values are normalized and every failing field is reported at once"""
+        from modules.sms_manager import SMS_SCHEMA
+        clean, errors = SMS_SCHEMA.validate({'sender': ' BTS ', 'receiver': '6281234567890', 'message': 'hi',
+                                             'type': 'silent'})
+        self.assertEqual(errors, ())
+        self.assertEqual(clean, {'sender': 'BTS', 'receiver': '6281234567890', 'message': 'hi', 'type': 'SILENT'})
+        clean, errors = SMS_SCHEMA.validate({'sender': 'BTS', 'receiver': ' 6281234567890 ', 'message': 'hi'})
+        self.assertEqual((clean['receiver'], errors), ('6281234567890', ()))
+        _, errors = SMS_SCHEMA.validate({'receiver': '62812345\n', 'message': 'hi', 'type': 'FAX'})
+        self.assertEqual([e['field'] for e in errors], ['sender', 'receiver', 'type'])
+        with self.assertRaises(ValidationError):
+            DataValidator.validate_imsi('123456789012345\n')
+    
+    def test_batch_errors_are_indexed(self):
+        """Test list items are validated one by one with the item index in the field path"""
+        from modules.validators import Field, Schema
+        from modules.sms_manager import SMS_SCHEMA
+        batch = Schema({'sms_list': Field('list', items=SMS_SCHEMA, max_items=3)})
+        good = {'sender': 'BTS', 'receiver': '6281234567890', 'message': 'hi'}
+        clean, errors = batch.validate({'sms_list': [good, dict(good, receiver='abc'), 'x']})
+        self.assertEqual([e['field'] for e in errors], ['sms_list[2]'])
+        clean, errors = batch.validate({'sms_list': [good, dict(good, receiver='abc'), dict(good, message='')]})
+        self.assertEqual([e['field'] for e in errors], ['sms_list[1].receiver', 'sms_list[2].message'])
+        clean, errors = batch.validate({'sms_list': [good] * 2})
+        self.assertEqual(clean['sms_list'][0]['type'], 'STANDARD')
+        _, errors = batch.validate({'sms_list': [good] * 4})
+        self.assertEqual(errors[0]['error'], 'At most 3 items allowed')
+    
+    def test_sms_api_rejects_invalid_items(self):
+        """Test the SMS APIs answer 400 with per-field errors instead of saving bad rows"""
+        client = app_module.app.test_client()
+        headers = {'Authorization': f"Bearer {auth.generate_token('operator')}"}
+        response = client.post('/sms/api/sms/batch', headers=headers, json={'sms_list': [
+            {'sender': 'BTS', 'receiver': '6281234567890', 'message': 'hi'},
+            {'sender': 'BTS', 'receiver': '62812', 'message': 'hi'}]})
+        self.assertEqual(response.status_code, 400)
+        data = response.get_json()
+        self.assertEqual(data['errors'], [{'field': 'sms_list[1].receiver', 'error': 'MSISDN must be 10-15 digits'}])
+        response = client.post('/sms/api/sms/send', headers=headers, json={'sender': 'BTS', 'message': 'hi'})
+        self.assertEqual(response.get_json()['error'], 'Missing field: receiver')
+        response = client.post('/sms/api/sms/send', headers=headers, data='x', content_type='text/plain')
+        self.assertEqual(response.status_code, 400)
+
+
+class TestResultSet(unittest.TestCase):
+    """Test tuple-backed result sets and their JSON formats"""
+    
+    def setUp(self):
+        from modules.result_set import ResultSet
+        self.rows = ResultSet(('id', 'imsi', 'status'), [(1, '510100000000001', 'active'),
+                                                        (2, '510100000000002', 'blocked')])
+    
+    def test_records_read_like_dicts(self):
+        """Test records support name and position access, dict() and slicing"""
+        first = self.rows[0]
+        self.assertEqual(first['imsi'], '510100000000001')
+        self.assertEqual(first[2], 'active')
+        self.assertEqual(first.get('missing', 'x'), 'x')
+        self.assertEqual(dict(first), {'id': 1, 'imsi': '510100000000001', 'status': 'active'})
+        self.assertIsInstance(self.rows, list)
+        self.assertEqual(self.rows[1:].columns, self.rows.columns)
+        self.assertIs(type(self.rows[0]), type(self.rows[1]))
+    
+    def test_json_formats(self):
+        """Test objects, rows and columnar output carry the same data"""
+        self.assertEqual(self.rows.to_json()[1], {'id': 2, 'imsi': '510100000000002', 'status': 'blocked'})
+        self.assertEqual(json.loads(json.dumps(self.rows.to_json('rows'))),
+                         {'columns': ['id', 'imsi', 'status'],
+                          'rows': [[1, '510100000000001', 'active'], [2, '510100000000002', 'blocked']]})
+        self.assertEqual(json.loads(json.dumps(self.rows.to_json('columnar')))['status'], ['active', 'blocked'])
+        self.assertEqual(self.rows[:0].to_json('columnar'), {'id': [], 'imsi': [], 'status': []})
+        with self.assertRaises(ValueError):
+            self.rows.to_json('xml')
+    
+    def test_api_format_parameter(self):
+        """Test list endpoints honour ?format= and reject unknown formats"""
+        client = app_module.app.test_client()
+        headers = {'Authorization': f"Bearer {auth.generate_token('operator')}"}
+        data = client.get('/subscribers/api/subscribers/search?limit=5&format=columnar', headers=headers).get_json()
+        self.assertEqual(data['format'], 'columnar')
+        self.assertIn('imsi', data['subscribers'])
+        data = client.get('/network/api/network/events?limit=5&format=rows', headers=headers).get_json()
+        self.assertIn('id', data['events']['columns'])
+        response = client.get('/subscribers/api/subscribers?format=xml', headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class TestJSONProvider(unittest.TestCase):
+    """Test the fast JSON provider and pre-encoded fragments"""
+    
+    def test_encoders_agree(self):
+        """Test the orjson and stdlib paths produce the same data for app types"""
+        from modules.json_provider import FastJSONProvider
+        from modules.result_set import ResultSet
+        rows = ResultSet(('id', 'imsi'), [(1, '510100000000001')])
+        payload = {'rows': rows.to_json('rows'), 1: 'int key', 'when': datetime(2024, 11, 26, 12, 0),
+                   'big': 2 ** 70, 'text': 'Sinyal kuat'}
+        fast = FastJSONProvider(app_module.app)
+        stdlib = FastJSONProvider(app_module.app, encoder='stdlib')
+        self.assertEqual(stdlib.encoder, 'stdlib')
+        decoded = json.loads(fast.dumps_bytes(payload))
+        self.assertEqual(decoded, json.loads(stdlib.dumps_bytes(payload)))
+        self.assertEqual(decoded['rows']['rows'], [[1, '510100000000001']])
+        self.assertEqual(decoded['when'], 'Tue, 26 Nov 2024 12:00:00 GMT')
+        self.assertEqual(decoded['1'], 'int key')
+    
+    def test_raw_fragments_are_spliced(self):
+        """Test RawJSON values are sent as-is and the cache re-encodes only replaced objects"""
+        from flask import jsonify
+        from modules.json_provider import EncodedCache, RawJSON
+        cache = EncodedCache(app_module.app.json)
+        state = {'cpu': {'percent': 12.5}}
+        first = cache.get('stats', state)
+        self.assertIs(cache.get('stats', state), first)
+        self.assertIsNot(cache.get('stats', dict(state)), first)
+        with app_module.app.test_request_context():
+            response = jsonify({'success': True, 'stats': first, 'raw': RawJSON(b'[1,2]')})
+        self.assertEqual(json.loads(response.get_data()), {'success': True, 'stats': state, 'raw': [1, 2]})
+    
+    def test_request_parsing(self):
+        """Test JSON bodies still parse and malformed ones are rejected cleanly"""
+        client = app_module.app.test_client()
+        headers = {'Authorization': f"Bearer {auth.generate_token('operator')}"}
+        response = client.post('/sms/api/sms/send', headers=headers, data='{"sender": ',
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        data = client.get('/dashboard/api/dashboard/refresh', headers=headers).get_json()
+        self.assertTrue(data['success'])
+        self.assertIn('services', data)
+
+
+class TestConditionalRequests(unittest.TestCase):
+    """Test ETag/Last-Modified handling on polled endpoints"""
+    
+    def setUp(self):
+        self.client = app_module.app.test_client()
+        self.headers = {'Authorization': f"Bearer {auth.generate_token('operator')}"}
+    
+    def test_conditional_decorator(self):
+        """Test If-None-Match gets 304 only for the same path, query and version"""
+        from modules.http_cache import conditional
+        calls = []
+        view = conditional(lambda: (7, 'a1b2'))(lambda: calls.append(1) or 'body')
+        with app_module.app.test_request_context('/poll'):
+            response = view()
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+        self.assertNotIn('Last-Modified', response.headers)
+        with app_module.app.test_request_context('/poll', headers={'If-None-Match': etag}):
+            self.assertEqual(view().status_code, 304)
+        with app_module.app.test_request_context('/poll', headers={'If-Modified-Since': 'Sun, 01 Jan 2090 00:00:00 GMT'}):
+            self.assertEqual(view().status_code, 200)
+        with app_module.app.test_request_context('/poll?page=2', headers={'If-None-Match': etag}):
+            self.assertEqual(view().status_code, 200)
+        self.assertEqual(len(calls), 3)
+    
+    def test_subscriber_stats_revalidation(self):
+        """Test the stats ETag survives cache refreshes and no-op reconciles but moves on a write"""
+        first = self.client.get('/subscribers/api/subscribers/stats', headers=self.headers)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        subscribers.SubscriberManager.invalidate()
+        self.client.post('/subscribers/api/subscribers/stats/reconcile', headers=self.headers)
+        again = self.client.get('/subscribers/api/subscribers/stats', headers={**self.headers, 'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.get_data(), b'')
+        database.add_subscriber(f'51010{int(time.time() * 1000) % 10**10:010d}', '628999000111')
+        changed = self.client.get('/subscribers/api/subscribers/stats', headers={**self.headers, 'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertEqual(changed.get_json()['stats']['total_subscribers'],
+                         first.get_json()['stats']['total_subscribers'] + 1)
+    
+    def test_state_version_follows_content(self):
+        """Test a published key keeps its version across resamples until its value changes"""
+        tmpdir = tempfile.mkdtemp()
+        owner = Coordinator(tmpdir)
+        value = {'progress': 0}
+        owner.register_state('scan', lambda: dict(value), interval=0.05)
+        owner.start()
+        try:
+            for _ in range(50):
+                if owner.state_version('scan'):
+                    break
+                time.sleep(0.02)
+            first = owner.state_version('scan')
+            self.assertIsNotNone(first)
+            time.sleep(0.2)
+            self.assertEqual(owner.state_version('scan'), first)
+            value['progress'] = 50
+            for _ in range(50):
+                if owner.state_version('scan') != first:
+                    break
+                time.sleep(0.02)
+            self.assertNotEqual(owner.state_version('scan'), first)
+        finally:
+            owner.stop()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+    
+    def test_sms_history_and_scan_status(self):
+        """Test SMS history is tagged per page and scan status still answers without a published sample"""
+        first = self.client.get('/sms/api/sms/history?limit=5', headers=self.headers)
+        etag = first.headers['ETag']
+        self.assertEqual(self.client.get('/sms/api/sms/history?limit=5',
+                                         headers={**self.headers, 'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.client.get('/sms/api/sms/history?limit=6',
+                                         headers={**self.headers, 'If-None-Match': etag}).status_code, 200)
+        response = self.client.get('/scanner/api/bts_scan/status', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('scan_results', response.get_json())
+
+
+class TestCompression(unittest.TestCase):
+    """Test negotiated response compression and fields= projection"""
+    
+    def setUp(self):
+        self.client = app_module.app.test_client()
+        self.headers = {'Authorization': f"Bearer {auth.generate_token('operator')}"}
+    
+    def test_projection(self):
+        """Test ResultSet.project and project_rows keep only the requested columns, in order"""
+        from modules.result_set import ResultSet, project_rows
+        result = ResultSet(('id', 'imsi', 'msisdn'), [(1, '510100000000001', '628111'), (2, '510100000000002', '628222')])
+        projected = result.project(('msisdn', 'id'))
+        self.assertEqual(projected.columns, ('msisdn', 'id'))
+        self.assertEqual(projected.to_json('objects'), [{'msisdn': '628111', 'id': 1}, {'msisdn': '628222', 'id': 2}])
+        self.assertIs(result.project(None), result)
+        with self.assertRaises(ValueError):
+            result.project(('imsi', 'password'))
+        rows = [{'arfcn': 1, 'signal': -60, 'band': 'GSM900'}, {'arfcn': 2}]
+        self.assertEqual(project_rows(rows, ('arfcn', 'signal')), [{'arfcn': 1, 'signal': -60}, {'arfcn': 2}])
+    
+    def test_fields_parameter(self):
+        """Test list endpoints honour ?fields= and reject unknown names with 400"""
+        response = self.client.get('/subscribers/api/subscribers?format=rows&fields=msisdn,imsi,msisdn',
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['subscribers']['columns'], ['msisdn', 'imsi'])
+        self.assertEqual(self.client.get('/subscribers/api/subscribers/search?fields=password',
+                                         headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.get('/sms/api/sms/history?fields=imsi,password',
+                                         headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.get('/sms/api/sms/history?fields=imsi,message',
+                                         headers=self.headers).status_code, 200)
+    
+    def test_compress_response(self):
+        """Test large JSON is gzipped only when accepted, small bodies are sent as-is"""
+        import gzip
+        from flask import jsonify
+        from modules.compression import compress_response
+        payload = {'rows': [{'imsi': f'5101000000{i:05d}', 'status': 'active'} for i in range(200)]}
+        with app_module.app.test_request_context('/', headers={'Accept-Encoding': 'gzip'}):
+            response = compress_response(jsonify(payload))
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response.vary)
+            self.assertEqual(json.loads(gzip.decompress(response.get_data())), payload)
+            self.assertEqual(int(response.headers['Content-Length']), len(response.get_data()))
+            small = compress_response(jsonify({'success': True}))
+            self.assertNotIn('Content-Encoding', small.headers)
+        with app_module.app.test_request_context('/'):
+            response = compress_response(jsonify(payload))
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertIn('Accept-Encoding', response.vary)
+
+
 def run_tests():
     """Run all tests"""
     # Create test suite
@@ -261,6 +1578,30 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestFlaskRoutes))
     suite.addTests(loader.loadTestsFromTestCase(TestSMSManager))
     suite.addTests(loader.loadTestsFromTestCase(TestSubscriberManager))
+    suite.addTests(loader.loadTestsFromTestCase(TestSubscriberSearch))
+    suite.addTests(loader.loadTestsFromTestCase(TestSubscriberImport))
+    suite.addTests(loader.loadTestsFromTestCase(TestSubscriberCounters))
+    suite.addTests(loader.loadTestsFromTestCase(TestPresenceTracker))
+    suite.addTests(loader.loadTestsFromTestCase(TestWriteBehindBuffer))
+    suite.addTests(loader.loadTestsFromTestCase(TestRetention))
+    suite.addTests(loader.loadTestsFromTestCase(TestNetworkEvents))
+    suite.addTests(loader.loadTestsFromTestCase(TestProcessCoordination))
+    suite.addTests(loader.loadTestsFromTestCase(TestStartup))
+    suite.addTests(loader.loadTestsFromTestCase(TestHealthProbes))
+    suite.addTests(loader.loadTestsFromTestCase(TestMetrics))
+    suite.addTests(loader.loadTestsFromTestCase(TestQueryProfiler))
+    suite.addTests(loader.loadTestsFromTestCase(TestSamplingProfiler))
+    suite.addTests(loader.loadTestsFromTestCase(TestRequestContext))
+    suite.addTests(loader.loadTestsFromTestCase(TestLogPipeline))
+    suite.addTests(loader.loadTestsFromTestCase(TestSlidingWindowLimiter))
+    suite.addTests(loader.loadTestsFromTestCase(TestTokenCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestUserStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestRBAC))
+    suite.addTests(loader.loadTestsFromTestCase(TestSchemaValidation))
+    suite.addTests(loader.loadTestsFromTestCase(TestResultSet))
+    suite.addTests(loader.loadTestsFromTestCase(TestJSONProvider))
+    suite.addTests(loader.loadTestsFromTestCase(TestConditionalRequests))
+    suite.addTests(loader.loadTestsFromTestCase(TestCompression))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)